@@ -1,3 +1,19 @@
-from agents.agents import DEFAULT_AGENT, get_agent, get_all_agent_info, all_agents
+from agents.agents import (
+    DEFAULT_AGENT,
+    all_agents,
+    get_agent,
+    get_agent_limits,
+    get_all_agent_info,
+    load_all_agents,
+    set_checkpointer,
+)
 
-__all__ = ["get_agent", "get_all_agent_info", "DEFAULT_AGENT", "all_agents"]
+__all__ = [
+    "get_agent",
+    "get_agent_limits",
+    "get_all_agent_info",
+    "load_all_agents",
+    "set_checkpointer",
+    "DEFAULT_AGENT",
+    "all_agents",
+]
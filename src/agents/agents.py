@@ -1,49 +1,88 @@
-from dataclasses import dataclass
-from typing import Literal, Union, Callable
+from dataclasses import dataclass, field
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Literal, Union, Callable
 
-from langgraph.graph.state import CompiledStateGraph
-
-from agents.college_finder_agent.team_roster_agent import team_roster_agent
-from agents.college_finder_agent.college_agent import college_finder_agent
-from agents.marketing_agent.marketing_agent import marketing_agent
-# from agents.privateagents.private.bargpt_agent.bargpt_trending_flow import BarGPTTrendingPostFlow
 from api_schema import AgentInfo
-from core.crew_agent import CrewAgent
-from crew_agents.vacation_house_agent.vacation_house_agent import VacationHouseAgent
+
+# Only for annotations: agent modules (and crewai, browser_use, the provider SDKs...)
+# are imported the first time an agent is used, see Agent.graph
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+    from core.crew_agent import CrewAgent
 
 DEFAULT_AGENT = "marketing-agent"
 
+# Checkpointer given to every LangGraph agent when it is loaded (see set_checkpointer)
+_checkpointer: Any = None
+
 
 @dataclass
 class Agent:
     description: str
     type: Literal["LANGGRAPH", "CREW"]
-    graph: Union[CompiledStateGraph, CrewAgent, Callable[[], CrewAgent]] | None = None
-
+    # "module:attribute" of the compiled graph, or of the CrewAgent class for crew
+    # agents (one instance per run)
+    path: str
+    # Runs of this agent executing at the same time / waiting for a slot, on each worker.
+    # None leaves only the global AGENT_MAX_CONCURRENCY / AGENT_MAX_QUEUE limits.
+    max_concurrency: int | None = None
+    max_queue: int | None = None
+    _graph: Union["CompiledStateGraph", Callable[[], "CrewAgent"], None] = field(
+        default=None, init=False, repr=False
+    )
 
-def get_vacation_house_agent():
-    return VacationHouseAgent()
+    @property
+    def graph(self) -> Union["CompiledStateGraph", Callable[[], "CrewAgent"]]:
+        """The compiled graph or crew agent factory, imported on first access."""
+        if self._graph is None:
+            module_name, attribute = self.path.split(":")
+            graph = getattr(import_module(module_name), attribute)
+            if self.type == "LANGGRAPH" and _checkpointer is not None:
+                graph.checkpointer = _checkpointer
+            self._graph = graph
+        return self._graph
 
-# def get_bargpt_trending_agent():
-#     return BarGPTTrendingPostFlow()
+    @property
+    def is_loaded(self) -> bool:
+        return self._graph is not None
 
 
 all_agents: dict[str, Agent] = {
     #ADD Agents HERE
-   "marketing-agent": Agent(description="A marketing agent.", graph=marketing_agent, type="LANGGRAPH"),
-   "college-agent": Agent(description="A college agent.", graph=college_finder_agent, type="LANGGRAPH"),
-   "team-roster-agent": Agent(description="A team roster agent.", graph=team_roster_agent, type="LANGGRAPH"),
-   "vacation-house-agent": Agent(description="An agent to help find vacation houses.", graph=get_vacation_house_agent(), type="CREW"),
+   "marketing-agent": Agent(description="A marketing agent.", path="agents.marketing_agent.marketing_agent:marketing_agent", type="LANGGRAPH"),
+   "college-agent": Agent(description="A college agent.", path="agents.college_finder_agent.college_agent:college_finder_agent", type="LANGGRAPH"),
+   "team-roster-agent": Agent(description="A team roster agent.", path="agents.college_finder_agent.team_roster_agent:team_roster_agent", type="LANGGRAPH"),
+   "vacation-house-agent": Agent(description="An agent to help find vacation houses.", path="crew_agents.vacation_house_agent.vacation_house_agent:VacationHouseAgent", type="CREW", max_concurrency=2, max_queue=8),
    ## Private Agents comment out when not in use
-   # "bargpt-trending-agent": Agent(description="An agent to help find trending topics.", graph=get_bargpt_trending_agent(), type="CREW"),
+   # "bargpt-trending-agent": Agent(description="An agent to help find trending topics.", path="agents.privateagents.private.bargpt_agent.bargpt_trending_flow:BarGPTTrendingPostFlow", type="CREW"),
 }
 
 
-def get_agent(agent_id: str) -> Union[CompiledStateGraph, CrewAgent]:
-    agent = all_agents[agent_id].graph
-    if callable(agent):
-        return agent()
-    return agent
+def get_agent(agent_id: str) -> Union["CompiledStateGraph", "CrewAgent"]:
+    agent = all_agents[agent_id]
+    if agent.type == "CREW":
+        return agent.graph()
+    return agent.graph
+
+
+def set_checkpointer(checkpointer: Any) -> None:
+    """Use this checkpointer for every LangGraph agent, loaded now or later."""
+    global _checkpointer
+    _checkpointer = checkpointer
+    for agent in all_agents.values():
+        if agent.type == "LANGGRAPH" and agent.is_loaded:
+            agent.graph.checkpointer = checkpointer
+
+
+def load_all_agents() -> None:
+    """Import every agent now instead of on first use."""
+    for agent in all_agents.values():
+        agent.graph
+
+
+def get_agent_limits() -> dict[str, tuple[int | None, int | None]]:
+    return {agent_id: (agent.max_concurrency, agent.max_queue) for agent_id, agent in all_agents.items()}
 
 
 def get_all_agent_info() -> list[AgentInfo]:
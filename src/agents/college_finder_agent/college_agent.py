@@ -1,18 +1,27 @@
-from typing import Annotated, Sequence, TypeVar, List, Union, Literal
+import logging
+from typing import Annotated, Any, Sequence, TypeVar, List, Union, Literal
 from typing_extensions import TypedDict
 from langgraph.graph import Graph, StateGraph, START, END
 from agents.llmtools import get_llm
-from agents.college_finder_agent.college_agent_schema import College, CollegeFinderInput, CollegeFinderState
+from agents.college_finder_agent.college_agent_schema import GATHERED_FIELDS, College, CollegeFinderInput, CollegeFinderState, colleges_reducer, same_college
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.checkpoint.memory import MemorySaver
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, create_model
 from langgraph.prebuilt import ToolNode
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langchain_core.tools import tool
-from agents.tools.searchweb import search_web_get_answer, search_web_with_query, SearchResult
-from agents.tools.wikisearch import search_wikipedia_with_query
+from langchain_core.runnables import RunnableConfig
+from agents.tools.searchweb import asearch_web_get_answer, asearch_web_with_query, reduce_content, SearchResult
+from agents.tools.wikisearch import asearch_wikipedia_with_query
 from langgraph.constants import Send
 from operator import add
+from functools import lru_cache
+from agents.college_finder_agent.college_ranking import matches_criteria, rank_colleges
+from agents.college_finder_agent.college_store import get_college_store
+from core.executor import run_blocking
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
 
 class CollegeList(BaseModel):
     colleges: List[College]
@@ -20,43 +29,74 @@ class CollegeList(BaseModel):
 class RecommendationList(BaseModel):
     recommendations: List[str]
 
+
+@lru_cache(maxsize=None)
+def _missing_fields_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """Output schema asking the LLM for just these College fields."""
+    return create_model(
+        "CollegeMissingInfo",
+        **{field: (College.model_fields[field].annotation, Field(default=None, description=College.model_fields[field].description)) for field in fields},
+    )
+
+
+async def _use_college_store(operation: str, *args: Any) -> Any:
+    """
+    Call a college store method off the event loop. The store only saves lookups: when
+    it is disabled or fails, this returns None (with a warning) and the run goes on.
+    """
+    try:
+        store = get_college_store()
+        if store is None:
+            return None
+        return await run_blocking(getattr(store, operation), *args)
+    except Exception as e:
+        logger.warning(f"College knowledge base {operation} failed: {e}")
+        return None
+
+
 # Define tools using the @tool decorator
 @tool
-def search_web_for_colleges(query: str) -> List[SearchResult]:
+async def search_web_for_colleges(query: str) -> List[SearchResult]:
     """Search the web for college information using a search engine."""
     print(f"Searching the web for: {query}")
-    results = search_web_with_query(query, max_results=5)
+    results = await asearch_web_with_query(query, max_results=5)
     print(f"Found {len(results)} results from the web")
     return [AIMessage(content=str(result)) for result in results]
 
 @tool
-def search_wikipedia_for_colleges(query: str) -> List[str]:
+async def search_wikipedia_for_colleges(query: str) -> List[str]:
     """Search Wikipedia for college information."""
     print(f"Searching Wikipedia for: {query}")
-    results = search_wikipedia_with_query(query, max_results=3)
+    results = await asearch_wikipedia_with_query(query, max_results=3)
     print(f"Found {len(results)} results from Wikipedia")
     #print("Wikipedia results: ", results)
     return [AIMessage(content=str(results))]
 
 @tool
-def get_web_answer(query: str) -> str:
+async def get_web_answer(query: str) -> str:
     """Get a direct answer from web search for a specific question about colleges."""
     print(f"Getting web answer for: {query}")
-    answer = search_web_get_answer(query)
+    answer = await asearch_web_get_answer(query)
     #print(f"Found answer: {answer}")
     return AIMessage(content=answer)
 
 @tool
-def ask_llm_for_colleges(query: str,exclude_colleges: str=None) -> List[College]:
+async def ask_llm_for_colleges(query: str,exclude_colleges: str=None) -> List[College]:
     """Ask the LLM to find colleges from a text query."""
     print(f"Asking LLM to extract colleges from: {query} and exclude: {exclude_colleges}")
+    # Enough matching colleges in the local knowledge base make the LLM call unnecessary
+    exclude = [name.strip() for name in (exclude_colleges or "").split(",") if name.strip()]
+    known = await _use_college_store("search", query, settings.COLLEGE_STORE_MIN_MATCHES, exclude) or []
+    if len(known) >= settings.COLLEGE_STORE_MIN_MATCHES:
+        print(f"Found {len(known)} matching colleges in the college knowledge base")
+        return [AIMessage(content=str(known))]
     llm = get_llm()
     prompt = f"""
         Find colleges (the more the better) that match this query: {query}
         Order them by relevance to the query and their prestige
         Do not include these colleges: {exclude_colleges}
     """
-    response = llm.invoke(prompt)
+    response = await llm.ainvoke(prompt)
     #print(f"LLM response: {response.content}")
     return [AIMessage(content=str(response.content))]
 
@@ -69,8 +109,6 @@ def create_college_finder_graph() -> CompiledStateGraph:
     # Create tool executor node
     tool_node = ToolNode(tools)
 
-    # Create the model node
-    model = get_llm().bind_tools(tools)
 
     def should_continue(state: CollegeFinderState) -> Union[Literal["continue"], Literal["end"]]:
         """Determine if we should continue running the agent."""
@@ -122,7 +160,7 @@ def create_college_finder_graph() -> CompiledStateGraph:
         
         return initialized_state
 
-    def call_model(state: CollegeFinderState) -> CollegeFinderState:
+    async def call_model(state: CollegeFinderState) -> CollegeFinderState:
         """Call the model to get the next action."""
         print("\nQuerying AI model for next action...")
         
@@ -152,13 +190,14 @@ def create_college_finder_graph() -> CompiledStateGraph:
 
         messages = [HumanMessage(content=context)]
         
-        # Get model response
-        response = model.invoke([HumanMessage(content=context)])
+        # Get model response, from the model configured for the run
+        model = get_llm().bind_tools(tools)
+        response = await model.ainvoke([HumanMessage(content=context)])
         
         # Update state with new message while preserving other state values
         return {**state, "messages": [response], "status_updates": ["Asking LLM for colleges..."]}
 
-    def process_tool_results(state: CollegeFinderState) -> CollegeFinderState:
+    async def process_tool_results(state: CollegeFinderState, config: RunnableConfig) -> CollegeFinderState:
         """Process tool results and extract college information."""
         print("\nProcessing search results...")
         messages = state.get("messages", [])
@@ -182,10 +221,9 @@ def create_college_finder_graph() -> CompiledStateGraph:
             
         print(f"Found {len(tool_outputs)} tool ouptputs to process")
         
-        # Process all tool outputs
-        new_colleges = []
+        # Extract college information from all tool outputs at the same time
+        prompts = []
         for output in tool_outputs:
-            # Extract college information from tool results
             prompt = f"""Extract college information from this content:
             - Look for colleges that offer programs in {state['major']}
             - For each college, extract:
@@ -201,27 +239,42 @@ def create_college_finder_graph() -> CompiledStateGraph:
               - Website URL
             
             Content:
-            {output}
+            {reduce_content(str(output.content))}
             """
-            print("Calling LLM to extract colleges from tool output")
-            llm = get_llm()
-            structured_llm = llm.with_structured_output(CollegeList)
-            response = structured_llm.invoke(prompt)
+            prompts.append(prompt)
+
+        concurrency = (config.get("configurable") or {}).get(
+            "extraction_concurrency", settings.COLLEGE_EXTRACTION_CONCURRENCY
+        )
+        print(f"Calling LLM to extract colleges from {len(prompts)} tool outputs, {concurrency} at a time")
+        llm = get_llm()
+        structured_llm = llm.with_structured_output(CollegeList)
+        responses = await structured_llm.abatch(
+            prompts, config={"max_concurrency": concurrency}, return_exceptions=True
+        )
+
+        new_colleges = []
+        for response in responses:
+            if isinstance(response, Exception):
+                # One bad extraction should not lose the colleges found in the others
+                print(f"Error extracting colleges from tool output: {response}")
+                continue
             print(f"Colleges Found: {len(response.colleges)}")
             new_colleges.extend(response.colleges)
         
-        # Filter colleges based on criteria
-        filtered_colleges = []
-        for college in new_colleges:
-            # manually remove colleges that don't match the criteria 
-            # Not using for now
-            filtered_colleges.append(college)
+        # Colleges found in several outputs are merged first
+        new_colleges = colleges_reducer([], new_colleges)
+        # Drop the colleges whose known numbers break the criteria, best fits first
+        filtered_colleges = rank_colleges(new_colleges, state)
+        print(f"{len(filtered_colleges)} of {len(new_colleges)} extracted colleges match the criteria")
         
         # Add unique colleges
         current_colleges = state.get("colleges", [])
-        existing_names = {c.name for c in current_colleges}
-        unique_new_colleges = [c for c in filtered_colleges if c.name not in existing_names]
+        unique_new_colleges = [
+            c for c in filtered_colleges if not any(same_college(c.name, e.name) for e in current_colleges)
+        ]
         updated_colleges = current_colleges + unique_new_colleges[:state["max_colleges"] - len(current_colleges)]
+        await _use_college_store("save_many", new_colleges, "extraction")
         
         # After processing colleges
         print(f"Added {len(unique_new_colleges)} new unique colleges to the list")
@@ -232,109 +285,91 @@ def create_college_finder_graph() -> CompiledStateGraph:
         
         return {**state, "colleges": updated_colleges, "messages": [AIMessage(content=summary, name="process_results")], "status_updates": [summary]}
     
-    def gather_college_info(state: dict) -> dict:
-        """Gather more information about a college."""
+    async def gather_college_info(state: dict) -> dict:
+        """Gather the missing information about a college."""
         # Convert dict to College model if needed
         college = state["college"] if isinstance(state["college"], College) else College(**state["college"])
         
-        #print(f"Gathering more information about: {college.name}")
-        # Build query based on missing fields
-        query_parts = []
-        if not college.tuition or college.tuition is None:
-            query_parts.append("tuition cost")
-        if not college.acceptance_rate or college.acceptance_rate is None:
-            query_parts.append("acceptance rate")
-        if not college.dorm_percentage or college.dorm_percentage is None:
-            query_parts.append("percentage of students living on campus")
-        if not college.sat_scores or college.sat_scores is None:
-            query_parts.append("average SAT scores")
-        if not college.programs or college.programs is None:
-            query_parts.append(f"notable programs and majors")
-        if not college.url or college.url is None:
-            query_parts.append("official website url")
-        if not college.enrollment or college.enrollment is None:
-            query_parts.append("undergraduate enrollment")
-        
-        if query_parts:
-            query = f"What is the {', '.join(query_parts)} for {college.name} college?"
-            print(f"Query: {query}")
-            answer = search_web_get_answer(query)
-            #print(f"Additional info for {college.name}: {answer}")
-        if query_parts and answer:
-            # Map the search results back to the College object using LLM
+        # Fresh values from the local knowledge base first
+        if known := await _use_college_store("get", college.name):
+            college = college.model_copy(
+                update={field: getattr(known, field) for field in college.missing_fields() if getattr(known, field)}
+            )
+            if not college.missing_fields():
+                print(f"Found {college.name} in the college knowledge base")
+                college.has_missing_fields = False
+                return {
+                    "colleges": [college],
+                    "status_updates": [f"Found information about college {college.name} locally"]
+                }
+
+        # Only ask for the fields earlier rounds did not find
+        missing = college.missing_fields()
+        query = f"What is the {', '.join(GATHERED_FIELDS[field] for field in missing)} for {college.name} college?"
+        print(f"Query: {query}")
+        answer = await asearch_web_get_answer(query)
+        #print(f"Additional info for {college.name}: {answer}")
+        if answer:
+            # Map the search results back to the missing fields using LLM
             prompt = f"""
             Based on this information about {college.name}:
             {answer}
             
-            Update only the following fields if the information is present:
-            - tuition
-            - acceptance_rate 
-            - dorm_percentage
-            - sat_scores
-            - programs
-            - url
-            - enrollment
-            Keep any existing values if no new information is found.
-            Existing info:
-            {college}
+            Fill in the following fields only if the information is present, leave the others empty:
+            {chr(10).join(f"- {field}" for field in missing)}
             """
             
             llm = get_llm()
-            structured_llm = llm.with_structured_output(College)
-            updated_college = structured_llm.invoke(
+            structured_llm = llm.with_structured_output(_missing_fields_model(tuple(missing)))
+            found = await structured_llm.ainvoke(
                 prompt,
                 config={"temperature": 0.1}
             )
             
-            # Preserve existing values if new ones weren't found
-            if not updated_college.tuition and college.tuition:
-                updated_college.tuition = college.tuition
-            if not updated_college.acceptance_rate and college.acceptance_rate:
-                updated_college.acceptance_rate = college.acceptance_rate
-            if not updated_college.dorm_percentage and college.dorm_percentage:
-                updated_college.dorm_percentage = college.dorm_percentage
-            if not updated_college.sat_scores and college.sat_scores:
-                updated_college.sat_scores = college.sat_scores
-            if not updated_college.url and college.url:
-                updated_college.url = college.url
-            if not updated_college.enrollment and college.enrollment:
-                updated_college.enrollment = college.enrollment
-            if not updated_college.programs and college.programs:
-                updated_college.programs = college.programs
-            elif not updated_college.programs:
+            # Existing values are kept, only the fields that were found are set
+            updated_college = college.model_copy(
+                update={field: value for field, value in found.model_dump().items() if value}
+            )
+            if not updated_college.programs:
                 updated_college.programs = []  # Ensure programs is never None
                
             print("Updated college info", updated_college)
 
-            updated_college.has_missing_fields = any([
-                    not updated_college.tuition or updated_college.tuition is None,
-                    not updated_college.acceptance_rate or updated_college.acceptance_rate is None,
-                    not updated_college.dorm_percentage or updated_college.dorm_percentage is None,
-                    not updated_college.sat_scores or updated_college.sat_scores is None,
-                    not updated_college.programs or updated_college.programs is None,
-                    not updated_college.url or updated_college.url is None,
-                    not updated_college.enrollment or updated_college.enrollment is None
-            ])
+            updated_college.has_missing_fields = bool(updated_college.missing_fields())
+            await _use_college_store("save", updated_college, "web_answer")
 
             # Return state with updated college and has_missing_fields flag
             return {
-                "colleges": [updated_college],  # This will be properly merged due to the Annotated[List[College], operator.add]
+                "colleges": [updated_college],  # Merged by name by colleges_reducer
                 "status_updates": [f"Gathering more information about college {college.name}"]
             }
         
         # If no answer was found, return original college with empty programs list if needed
         if not college.programs:
             college.programs = []
+        college.has_missing_fields = bool(college.missing_fields())
         return {
             "colleges": [college],
         }
 
+    def eligible_colleges(state: CollegeFinderState) -> List[College]:
+        """The colleges of the state that still match the criteria, as far as is known."""
+        colleges = state.get("colleges", [])
+        if not colleges:
+            return []
+        return [c for c, eligible in zip(colleges, matches_criteria(colleges, state)) if eligible]
+
     def gather_all_college_data(state: CollegeFinderState):
         print("Gathering all college data...")
         # Initialize data_gathering_attempts if not present
         if "data_gathering_attempts" not in state:
             state["data_gathering_attempts"] = 0
-        return [Send("gather_college_info", {"college": c}) for c in state["colleges"]]
+        # Complete colleges are not searched again, nor the ones that turned out off-criteria
+        incomplete = [c for c in eligible_colleges(state) if c.missing_fields()]
+        print(f"{len(incomplete)} of {len(state['colleges'])} colleges are missing fields")
+        if not incomplete:
+            return "generate_recommendations"
+        return [Send("gather_college_info", {"college": c}) for c in incomplete]
     
     def data_gathering(state: CollegeFinderState):
         # Increment attempt counter
@@ -348,7 +383,7 @@ def create_college_finder_graph() -> CompiledStateGraph:
     def should_continue_gathering(state: CollegeFinderState) -> Union[Literal["continue_gathering"], Literal["finish"]]:
         """Determine if we should continue gathering data or move to recommendations."""
         attempts = state.get("data_gathering_attempts", 0)
-        has_missing_fields = any(college_state.has_missing_fields == True for college_state in state.get("colleges", []))
+        has_missing_fields = any(college.missing_fields() for college in eligible_colleges(state))
         
         if attempts < 3 and has_missing_fields:
             print(f"Some fields still missing after attempt {attempts}, continuing data gathering...")
@@ -360,12 +395,17 @@ def create_college_finder_graph() -> CompiledStateGraph:
                 print("All fields gathered successfully, moving to recommendations...")
             return "finish"
 
-    def generate_recommendations(state: CollegeFinderState) -> CollegeFinderState:
+    async def generate_recommendations(state: CollegeFinderState) -> CollegeFinderState:
         """Generate final recommendations based on found colleges."""
         print("\nGenerating final recommendations...")
         if not state.get("colleges"):
             return state
-            
+        # Only the best fits are worth the tokens
+        colleges = rank_colleges(state["colleges"], state, top_k=state["max_colleges"])
+        if not colleges:
+            return {"status_updates": ["None of the colleges found match the criteria"]}
+        print(f"Recommending from the top {len(colleges)} of {len(state['colleges'])} colleges")
+
         prompt = f"""Based on these colleges and criteria, provide 5-10 specific recommendations:
         
         Student's interests:
@@ -375,7 +415,7 @@ def create_college_finder_graph() -> CompiledStateGraph:
         - Minimum acceptance rate: {f"{state['min_acceptance_rate']}%" if state.get('min_acceptance_rate') else 'Not specified'}
         
         Found colleges:
-        {state['colleges']}
+        {colleges}
         
         Provide specific recommendations about:
         1. Which colleges might be the best fit and why
@@ -390,7 +430,7 @@ def create_college_finder_graph() -> CompiledStateGraph:
         
         llm = get_llm()
         structured_llm = llm.with_structured_output(RecommendationList)
-        response = structured_llm.invoke(prompt)
+        response = await structured_llm.ainvoke(prompt)
         
         return {**state, "recommendations": response.recommendations, "messages": [AIMessage(content="\n".join(response.recommendations))]}
 
@@ -424,7 +464,7 @@ def create_college_finder_graph() -> CompiledStateGraph:
     workflow.add_conditional_edges(
         "data_gathering",
         gather_all_college_data,
-        ["gather_college_info"]
+        ["gather_college_info", "generate_recommendations"]
     )
     workflow.add_edge("gather_college_info", "debug_state")
     workflow.add_conditional_edges(
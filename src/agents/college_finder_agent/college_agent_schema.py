@@ -1,4 +1,6 @@
-from typing import Any, Callable, List, Optional, Annotated
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Annotated
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 import operator
@@ -40,36 +42,201 @@ class College(BaseModel):
     )
     has_missing_fields: bool = False
 
+    def missing_fields(self) -> List[str]:
+        """The fields gather_college_info looks up that have no value yet."""
+        return [field for field in GATHERED_FIELDS if not getattr(self, field)]
+
+# Fields the data gathering rounds try to fill, with how to ask a web search for them
+GATHERED_FIELDS = {
+    "tuition": "tuition cost",
+    "acceptance_rate": "acceptance rate",
+    "dorm_percentage": "percentage of students living on campus",
+    "sat_scores": "average SAT scores",
+    "programs": "notable programs and majors",
+    "url": "official website url",
+    "enrollment": "undergraduate enrollment",
+}
+
+# Common short names, mapped to the normalized full name (see college_name_keys). Only
+# names that point to one college: "USC", "Penn" or "Berkeley" are shared by several
+COLLEGE_ALIASES = {
+    "uva": "university of virginia",
+    "mit": "massachusetts institute of technology",
+    "caltech": "california institute of technology",
+    "nyu": "new york university",
+    "ucla": "university of california los angeles",
+    "uc berkeley": "university of california berkeley",
+    "ucsd": "university of california san diego",
+    "uc san diego": "university of california san diego",
+    "unc chapel hill": "university of north carolina at chapel hill",
+    "university of north carolina chapel hill": "university of north carolina at chapel hill",
+    "upenn": "university of pennsylvania",
+    "georgia tech": "georgia institute of technology",
+    "umich": "university of michigan",
+    "university of michigan ann arbor": "university of michigan",
+    "uiuc": "university of illinois urbana champaign",
+    "university of illinois at urbana champaign": "university of illinois urbana champaign",
+    "ut austin": "university of texas at austin",
+    "university of texas austin": "university of texas at austin",
+    "byu": "brigham young university",
+    "tcu": "texas christian university",
+    "vanderbilt": "vanderbilt university",
+    "wustl": "washington university in st louis",
+}
+
+# US state codes and names, college locations are usually "City, ST"
+US_STATES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california",
+    "co": "colorado", "ct": "connecticut", "de": "delaware", "dc": "district of columbia",
+    "fl": "florida", "ga": "georgia", "hi": "hawaii", "id": "idaho", "il": "illinois",
+    "in": "indiana", "ia": "iowa", "ks": "kansas", "ky": "kentucky", "la": "louisiana",
+    "me": "maine", "md": "maryland", "ma": "massachusetts", "mi": "michigan", "mn": "minnesota",
+    "ms": "mississippi", "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada",
+    "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico", "ny": "new york",
+    "nc": "north carolina", "nd": "north dakota", "oh": "ohio", "ok": "oklahoma", "or": "oregon",
+    "pa": "pennsylvania", "ri": "rhode island", "sc": "south carolina", "sd": "south dakota",
+    "tn": "tennessee", "tx": "texas", "ut": "utah", "vt": "vermont", "va": "virginia",
+    "wa": "washington", "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming",
+}
+
+_PARENTHESES = re.compile(r"\(([^)]*)\)")
+# Words left out of the initials of a name, "Texas A&M University" is "TAMU"
+_MINOR_WORDS = {"of", "the", "at", "and", "in", "for"}
+
+
+def _clean_name(name: str) -> str:
+    name = name.casefold().replace("&", " and ").replace("-", " ").replace(",", " ")
+    name = re.sub(r"[^\w\s]", "", name)
+    name = " ".join(name.split())
+    return name.removeprefix("the ")
+
+
+def _normalize_name(name: str) -> str:
+    name = _clean_name(name)
+    return COLLEGE_ALIASES.get(name, name)
+
+
+def _acronym_key(alias: str, name: str) -> Optional[str]:
+    """
+    The key of a name in parentheses when it is the acronym of the name it follows,
+    "Rensselaer Polytechnic Institute (RPI)". Anything else ("Ohio", "OH", "Georgia
+    Tech") could as well be a place or another college, it is not a key.
+    """
+    acronym = _clean_name(alias)
+    words = _clean_name(name).split()
+    if len(acronym) < 2 or " " in acronym:
+        return None
+    initials = (
+        "".join(word[0] for word in words),
+        "".join(word[0] for word in words if word not in _MINOR_WORDS),
+    )
+    return acronym if acronym in initials else None
+
+
+@lru_cache(maxsize=4096)
+def _name_keys(name: str) -> tuple[str, Optional[str]]:
+    full_name = _PARENTHESES.sub(" ", name)
+    acronyms = [key for alias in _PARENTHESES.findall(name) if (key := _acronym_key(alias, full_name))]
+    return _normalize_name(full_name), acronyms[0] if acronyms else None
+
+
+def college_name_key(name: str) -> str:
+    """
+    The key identifying a college: its normalized name (lowercase, no punctuation, the
+    "the" prefix and parentheses dropped, a short name resolved through COLLEGE_ALIASES).
+    """
+    return _name_keys(name)[0]
+
+
+def college_name_keys(name: str) -> List[str]:
+    """
+    The key of a college (see college_name_key), followed by its acronym when given in
+    parentheses after the name, e.g. "Rensselaer Polytechnic Institute (RPI)". Several
+    colleges share acronyms, see same_college.
+    """
+    keys = [key for key in _name_keys(name) if key]
+    return list(dict.fromkeys(keys))
+
+
+def same_college(name: str, other: str) -> bool:
+    """
+    Whether two names are the same college: same key, or one of them is just the
+    acronym the other gives in parentheses. Two full names are never matched by a
+    shared acronym, "Michigan State University (MSU)" is not "Mississippi State
+    University (MSU)".
+    """
+    key, acronym = _name_keys(name)
+    other_key, other_acronym = _name_keys(other)
+    if not key or not other_key:
+        return False
+    return key in (other_key, other_acronym) or other_key == acronym
+
+
+def merge_college(existing: College, update: College) -> College:
+    """The update's values win, except where it has none. Programs are combined."""
+    merged = existing.model_copy(
+        update={
+            field: value
+            for field, value in update
+            if value and field not in ("name", "programs", "has_missing_fields")
+        }
+    )
+    programs = list(existing.programs or [])
+    programs += [p for p in update.programs or [] if p not in programs]
+    merged.programs = programs if programs or existing.programs is not None else update.programs
+    # Keep the full name over a short one, "University of Virginia" over "UVA"
+    if len(update.name) > len(existing.name):
+        merged.name = update.name
+    merged.has_missing_fields = bool(merged.missing_fields())
+    return merged
+
+
 def colleges_reducer(current: List[College], update: List[College] | None) -> List[College]:
-    #print("REDUCER Called")
+    """
+    Merge colleges into the list by name, field by field, keeping the list order. Names
+    are matched by same_college, so "UVA" and "University of Virginia" are merged.
+    """
     if update is None:
         return current
-    
-    result = current.copy()
-    
-    # Process each college in the update
+
+    result = list(current)
+    # Position of each college by key, and by the acronym it gives in parentheses
+    by_key: Dict[str, int] = {}
+    by_acronym: Dict[str, int] = {}
+
+    def add_keys(position: int) -> None:
+        key, acronym = _name_keys(result[position].name)
+        by_key.setdefault(key, position)
+        if acronym:
+            by_acronym.setdefault(acronym, position)
+
+    for i in range(len(result)):
+        add_keys(i)
+
     for new_college in update:
-        # Check if college with same name exists
-        found = False
-        for i, existing_college in enumerate(result):
-            if existing_college.name == new_college.name:
-                # Replace existing college
-                result[i] = new_college
-                found = True
-                break
-        
-        # Add new college if not found
-        if not found:
+        key, acronym = _name_keys(new_college.name)
+        position = by_key.get(key, by_acronym.get(key)) if key else None
+        if position is None and acronym:
+            # A college only known by its acronym so far
+            position = by_key.get(acronym)
+        if position is None:
             result.append(new_college)
+            add_keys(len(result) - 1)
+            continue
+        old_key = _name_keys(result[position].name)[0]
+        result[position] = merge_college(result[position], new_college)
+        if _name_keys(result[position].name)[0] != old_key and by_key.get(old_key) == position:
+            # It is now known by its full name, its acronym alone may be another college
+            del by_key[old_key]
+        add_keys(position)
     return result
-        
 
 
 class CollegeFinderInput(TypedDict):
     major: Optional[str] = "any"  # Desired major/field of study
     location_preference: Optional[str] = "any"  # Preferred location/region
     max_tuition: Optional[int] = None  # Maximum tuition budget
-    min_acceptance_rate: Optional[float] = None  # Minimum acceptance rate
+    min_acceptance_rate: Optional[float] = None  # Minimum acceptance rate, in percent (20 for 20%)
     max_colleges: int = 5  # Number of colleges to find
     search_query: Optional[str] = None  # Constructed search query
     sat_score: Optional[int] = None  # average SAT score
@@ -78,7 +245,7 @@ class CollegeFinderState(TypedDict):
     major: Optional[str]  # Desired major/field of study
     location_preference: Optional[str]  # Preferred location/region
     max_tuition: Optional[int] = None  # Maximum tuition budget
-    min_acceptance_rate: Optional[float] = None  # Minimum acceptance rate
+    min_acceptance_rate: Optional[float] = None  # Minimum acceptance rate, in percent (20 for 20%)
     max_colleges: int = 5  # Number of colleges to find
     search_query: Optional[str] = None  # Constructed search query
     sat_score: Optional[int] = None  # average SAT score
@@ -0,0 +1,255 @@
+"""
+Filtering and ranking of colleges against the search criteria, without the LLM.
+
+College numbers are free-form strings ("$57,986 per year", "19%", "1400-1550"), they
+are parsed once into numeric columns (NaN when unknown) and the criteria are applied
+to all the colleges at once with NumPy. A college is off-criteria only when a known
+value breaks a criterion, missing values never exclude it.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from agents.college_finder_agent.college_agent_schema import GATHERED_FIELDS, US_STATES, College
+
+# How far a college's average SAT may be from the student's to still be a match
+SAT_SCORE_TOLERANCE = 150
+
+# Weight of each criterion in the score, a criterion scores from 0 to 1 (0.5 when unknown)
+SCORE_WEIGHTS = {
+    "major": 3.0,
+    "location": 2.0,
+    "sat": 2.0,
+    "tuition": 1.0,
+    "acceptance_rate": 1.0,
+    "completeness": 0.5,
+}
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_MONEY = re.compile(rf"\$\s*({_NUMBER})\s*(k|thousand)?\b", re.IGNORECASE)
+_AMOUNT = re.compile(rf"({_NUMBER})\s*(k|thousand)?\b", re.IGNORECASE)
+_PERCENT = re.compile(rf"({_NUMBER})\s*(?:%|percent)", re.IGNORECASE)
+_RANGE = re.compile(rf"({_NUMBER})\s*(?:-|–|—|\bto\b)\s*({_NUMBER})", re.IGNORECASE)
+_RATIO = re.compile(r"\b(\d+) (?:in|out of) (\d+)\b", re.IGNORECASE)
+_YEAR = re.compile(r"^(19|20)\d\d$")
+_WORDS = re.compile(r"[a-z]+")
+_LOCATION_STOPWORDS = {"any", "the", "of", "in", "near", "area", "state", "region", "not", "specified"}
+
+def _to_float(number: str) -> float:
+    return float(number.replace(",", ""))
+
+
+def _amounts(text: str, pattern: re.Pattern) -> List[float]:
+    amounts = []
+    for number, thousands in pattern.findall(text):
+        # Bare four digit numbers are more likely years ("2023-2024") than amounts
+        if pattern is _AMOUNT and not thousands and _YEAR.match(number):
+            continue
+        amounts.append(_to_float(number) * (1000 if thousands else 1))
+    return amounts
+
+
+@lru_cache(maxsize=4096)
+def parse_money(text: Optional[str]) -> float:
+    """
+    Dollars in a tuition string, NaN when there are none. With several amounts
+    (in-state and out-of-state) the lowest one.
+    """
+    if not text:
+        return np.nan
+    amounts = _amounts(text, _MONEY) or [a for a in _amounts(text, _AMOUNT) if a >= 1000]
+    return min(amounts) if amounts else np.nan
+
+
+@lru_cache(maxsize=4096)
+def parse_percentage(text: Optional[str]) -> float:
+    """
+    A percentage from 0 to 100 ("19%", "19.2 percent", "0.19", "1 in 5"), NaN when
+    there is none.
+    """
+    if not text:
+        return np.nan
+    if match := _PERCENT.search(text):
+        return _to_float(match.group(1))
+    if (match := _RATIO.search(text)) and int(match.group(2)):
+        return 100 * int(match.group(1)) / int(match.group(2))
+    amounts = [a for a in _amounts(text, _AMOUNT) if a <= 100]
+    if not amounts:
+        return np.nan
+    return amounts[0] * 100 if amounts[0] < 1 else amounts[0]
+
+
+@lru_cache(maxsize=4096)
+def parse_count(text: Optional[str]) -> float:
+    """A head count ("17,000 undergraduates", "17k"), NaN when there is none."""
+    if not text:
+        return np.nan
+    amounts = _amounts(text, _AMOUNT)
+    return amounts[0] if amounts else np.nan
+
+
+@lru_cache(maxsize=4096)
+def parse_sat_certainty(text: Optional[str]) -> tuple[float, bool]:
+    """
+    The average total SAT score and whether the text states it plainly: one total
+    ("1480", "Average SAT: 1510 (Math 770, Reading 740)") or one range of totals
+    ("1400-1550", "1400 to 1550", its middle). Several totals are averaged and section
+    scores ("Math 680-780, EBRW 650-740") added up, those are only estimates.
+    """
+    if not text:
+        return np.nan, False
+    ranges = [(_to_float(low), _to_float(high)) for low, high in _RANGE.findall(text)]
+    numbers = [a for a in _amounts(_RANGE.sub(" ", text), _AMOUNT) if 200 <= a <= 1600]
+    total_ranges = [(low + high) / 2 for low, high in ranges if 800 <= low <= high <= 1600]
+    if total_ranges:
+        return total_ranges[0], len(total_ranges) == 1
+    # A section scores at most 800, a total at least 400: above 800 it is a total
+    totals = [a for a in numbers if a > 800]
+    if totals:
+        return sum(totals[:2]) / len(totals[:2]), len(totals) == 1
+    sections = [(low + high) / 2 for low, high in ranges if 200 <= low <= high <= 800] + numbers
+    if len(sections) >= 2:
+        return sections[0] + sections[1], False
+    return np.nan, False
+
+
+def parse_sat(text: Optional[str]) -> float:
+    """The average total SAT score, NaN when there is none (see parse_sat_certainty)."""
+    return parse_sat_certainty(text)[0]
+
+
+def criterion_number(value: Any) -> Optional[float]:
+    """A numeric criterion from the agent input, None when not given ("Not specified", "any")."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return _to_float(str(value).strip().lstrip("$").rstrip("%"))
+    except ValueError:
+        return None
+
+
+@dataclass
+class CollegeColumns:
+    """Numeric columns of a list of colleges, in the same order, NaN where unknown."""
+
+    tuition: np.ndarray
+    acceptance_rate: np.ndarray
+    enrollment: np.ndarray
+    sat: np.ndarray
+    # Whether the SAT score is stated plainly rather than estimated, only those filter
+    sat_certain: np.ndarray
+    completeness: np.ndarray
+
+    @classmethod
+    def from_colleges(cls, colleges: Sequence[College]) -> "CollegeColumns":
+        sat = [parse_sat_certainty(c.sat_scores) for c in colleges]
+        return cls(
+            tuition=np.array([parse_money(c.tuition) for c in colleges], dtype=float),
+            acceptance_rate=np.array([parse_percentage(c.acceptance_rate) for c in colleges], dtype=float),
+            enrollment=np.array([parse_count(c.enrollment) for c in colleges], dtype=float),
+            sat=np.array([score for score, _ in sat], dtype=float),
+            sat_certain=np.array([certain for _, certain in sat], dtype=bool),
+            completeness=np.array(
+                [1 - len(c.missing_fields()) / len(GATHERED_FIELDS) for c in colleges], dtype=float
+            ),
+        )
+
+
+def _matches(columns: CollegeColumns, criteria: Mapping[str, Any]) -> np.ndarray:
+    mask = np.ones(len(columns.tuition), dtype=bool)
+    # Comparisons with NaN are False, so unknown values are kept
+    with np.errstate(invalid="ignore"):
+        if (max_tuition := criterion_number(criteria.get("max_tuition"))) is not None:
+            mask &= ~(columns.tuition > max_tuition)
+        if (min_rate := criterion_number(criteria.get("min_acceptance_rate"))) is not None:
+            mask &= ~(columns.acceptance_rate < min_rate)
+        if (sat_score := criterion_number(criteria.get("sat_score"))) is not None:
+            # An estimated SAT score only weighs on the score, see _scores
+            mask &= ~(columns.sat_certain & (np.abs(columns.sat - sat_score) > SAT_SCORE_TOLERANCE))
+    return mask
+
+
+def matches_criteria(colleges: Sequence[College], criteria: Mapping[str, Any]) -> np.ndarray:
+    """
+    Boolean mask of the colleges that fit max_tuition, min_acceptance_rate (a percentage)
+    and sat_score of the criteria (the agent state or input), as far as their known
+    values tell.
+    """
+    return _matches(CollegeColumns.from_colleges(colleges), criteria)
+
+
+def _words(text: Optional[str]) -> set[str]:
+    return set(_WORDS.findall((text or "").casefold()))
+
+
+def _location_words(location: str) -> set[str]:
+    # Only the part after the last comma is taken as a state code, "Lafayette, IN"
+    words = _words(location)
+    state = location.rpartition(",")[2].strip().casefold()
+    if state in US_STATES:
+        words |= _words(US_STATES[state])
+    return words
+
+
+def _text_scores(colleges: Sequence[College], criteria: Mapping[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+    """Major and location scores, from the programs, description and location text."""
+    major = str(criteria.get("major") or "").casefold().strip()
+    location_words = _words(str(criteria.get("location_preference") or "")) - _LOCATION_STOPWORDS
+    major_scores = np.full(len(colleges), 0.5)
+    location_scores = np.full(len(colleges), 0.5)
+    for i, college in enumerate(colleges):
+        if major and major != "any":
+            programs = " ".join(college.programs or []).casefold()
+            if major in programs or major in college.description.casefold():
+                major_scores[i] = 1.0
+            elif programs:
+                major_scores[i] = 0.0
+        if location_words and college.location:
+            location_scores[i] = len(location_words & _location_words(college.location)) / len(location_words)
+    return major_scores, location_scores
+
+
+def _scores(colleges: Sequence[College], columns: CollegeColumns, criteria: Mapping[str, Any]) -> np.ndarray:
+    scores = {}
+    scores["major"], scores["location"] = _text_scores(colleges, criteria)
+    scores["completeness"] = columns.completeness
+    with np.errstate(invalid="ignore"):
+        # Cheaper relative to the budget, easier to get into, SAT nearer the student's
+        if (max_tuition := criterion_number(criteria.get("max_tuition"))) is not None and max_tuition > 0:
+            scores["tuition"] = np.clip(1 - columns.tuition / max_tuition, 0, 1)
+        if (min_rate := criterion_number(criteria.get("min_acceptance_rate"))) is not None and min_rate < 100:
+            scores["acceptance_rate"] = np.clip((columns.acceptance_rate - min_rate) / (100 - min_rate), 0, 1)
+        if (sat_score := criterion_number(criteria.get("sat_score"))) is not None:
+            scores["sat"] = np.clip(1 - np.abs(columns.sat - sat_score) / SAT_SCORE_TOLERANCE, 0, 1)
+    total = np.zeros(len(colleges))
+    for criterion, weight in SCORE_WEIGHTS.items():
+        if criterion in scores:
+            total += weight * np.nan_to_num(scores[criterion], nan=0.5)
+    return total
+
+
+def score_colleges(colleges: Sequence[College], criteria: Mapping[str, Any]) -> np.ndarray:
+    """Weighted score of each college against the criteria, higher is a better fit."""
+    return _scores(colleges, CollegeColumns.from_colleges(colleges), criteria)
+
+
+def rank_colleges(
+    colleges: Sequence[College], criteria: Mapping[str, Any], top_k: Optional[int] = None
+) -> List[College]:
+    """
+    The colleges matching the criteria, best score first (ties keep the given order), at
+    most top_k of them.
+    """
+    if not colleges:
+        return []
+    columns = CollegeColumns.from_colleges(colleges)
+    scores = _scores(colleges, columns, criteria)
+    eligible = np.flatnonzero(_matches(columns, criteria))
+    order = eligible[np.argsort(-scores[eligible], kind="stable")]
+    return [colleges[i] for i in order[:top_k]]
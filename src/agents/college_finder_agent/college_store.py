@@ -0,0 +1,237 @@
+"""
+Local knowledge base of colleges, so facts that rarely change are not searched again.
+
+Every College the agent produces is saved here with a timestamp per field, in SQLite
+(WAL mode) with an FTS5 index over name, location, description and programs. A stored
+value is used instead of a web lookup while it is fresh: younger than the max age of
+its field (FIELD_MAX_AGES, else COLLEGE_STORE_MAX_AGE). Datasets can be bulk imported
+from CSV or Parquet, see run_college_import.py.
+"""
+
+import csv
+import json
+import re
+import sqlite3
+import threading
+import time
+from functools import cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from agents.college_finder_agent.college_agent_schema import US_STATES, College, college_name_key, merge_college, same_college
+from core.settings import settings
+
+DAY = 60 * 60 * 24
+
+# Fields that change more often than COLLEGE_STORE_MAX_AGE allows
+FIELD_MAX_AGES = {
+    "tuition": 180 * DAY,
+    "acceptance_rate": 365 * DAY,
+    "enrollment": 365 * DAY,
+    "sat_scores": 365 * DAY,
+}
+
+# College fields kept per field, with a timestamp (name is the record itself)
+STORED_FIELDS = [field for field in College.model_fields if field not in ("name", "has_missing_fields")]
+
+# Words of a query that say nothing about the college, all the others must match
+_FTS_STOPWORDS = {
+    "a", "affordable", "an", "and", "are", "at", "best", "college", "colleges", "find", "for",
+    "good", "great", "in", "known", "list", "located", "near", "of", "offer", "offering", "or",
+    "program", "programs", "school", "schools", "strong", "that", "the", "to", "top",
+    "universities", "university", "with",
+}
+
+
+class CollegeStore:
+    def __init__(self, path: str, max_age: int):
+        self._path = path
+        self._max_age = max_age
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS colleges (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS college_fields (
+                key TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                source TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (key, field)
+            ) WITHOUT ROWID;
+            CREATE VIRTUAL TABLE IF NOT EXISTS college_fts USING fts5(
+                key UNINDEXED, name, location, description, programs
+            );
+            """
+        )
+        self._drop_alias_keys(conn)
+
+    @staticmethod
+    def _drop_alias_keys(conn: sqlite3.Connection) -> None:
+        # Stores written before records were keyed by their full name only resolved
+        # acronyms and aliases through college_names, which merged colleges sharing
+        # one. Their records may mix two colleges, they are dropped.
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'college_names'").fetchone():
+            conn.executescript(
+                """
+                BEGIN IMMEDIATE;
+                DELETE FROM colleges;
+                DELETE FROM college_fields;
+                DELETE FROM college_fts;
+                DROP TABLE college_names;
+                COMMIT;
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, the agent calls in from executor threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def max_age(self, field: str) -> int:
+        return FIELD_MAX_AGES.get(field, self._max_age)
+
+    def _load(self, conn: sqlite3.Connection, key: str, fresh_only: bool) -> Optional[College]:
+        row = conn.execute("SELECT name FROM colleges WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        values: Dict[str, Any] = {field: None for field in STORED_FIELDS}
+        values["location"] = values["description"] = ""
+        for field, value, updated_at in conn.execute(
+            "SELECT field, value, updated_at FROM college_fields WHERE key = ?", (key,)
+        ):
+            if field in values and (not fresh_only or now - updated_at < self.max_age(field)):
+                values[field] = json.loads(value)
+        college = College(name=row[0], **values)
+        college.has_missing_fields = bool(college.missing_fields())
+        return college
+
+    def get(self, name: str, fresh_only: bool = True) -> Optional[College]:
+        """
+        The stored college with this name (see college_name_key), with only the fields
+        that are still fresh unless fresh_only is False.
+        """
+        key = college_name_key(name)
+        return self._load(self._connection(), key, fresh_only) if key else None
+
+    def save(self, college: College, source: str = "agent") -> bool:
+        """
+        Store the non-empty fields of college, merged into what is known about it. Records
+        are keyed by the full name only (see college_name_key), an acronym shared by two
+        colleges never merges them. A college without a usable name is skipped, returns
+        whether it was stored.
+        """
+        key = college_name_key(college.name)
+        if not key:
+            return False
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = self._load(conn, key, fresh_only=False)
+            merged = merge_college(stored, college) if stored else college
+            conn.execute("INSERT OR REPLACE INTO colleges VALUES (?, ?, ?)", (key, merged.name, now))
+            conn.executemany(
+                "INSERT OR REPLACE INTO college_fields VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, field, json.dumps(value), source, now)
+                    for field, value in college
+                    if field in STORED_FIELDS and value
+                ],
+            )
+            conn.execute("DELETE FROM college_fts WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO college_fts VALUES (?, ?, ?, ?, ?)",
+                (key, merged.name, _searchable_location(merged.location), merged.description, " ".join(merged.programs or [])),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def save_many(self, colleges: Iterable[College], source: str = "agent") -> int:
+        return sum(self.save(college, source) for college in colleges)
+
+    def search(self, query: str, limit: int = 10, exclude: Iterable[str] = ()) -> List[College]:
+        """
+        Stored colleges matching all the words of query (full-text, ranked by bm25). A
+        college sharing only some of the words ("science") is not a match.
+        """
+        words = [w for w in re.findall(r"\w+", query.casefold()) if len(w) > 1 and w not in _FTS_STOPWORDS]
+        if not words:
+            return []
+        excluded = list(exclude)
+        conn = self._connection()
+        colleges = []
+        for (key,) in conn.execute(
+            "SELECT key FROM college_fts WHERE college_fts MATCH ? ORDER BY bm25(college_fts) LIMIT ?",
+            (" ".join(f'"{w}"' for w in words), limit + len(excluded)),
+        ):
+            college = self._load(conn, key, fresh_only=True)
+            if college and not any(same_college(college.name, name) for name in excluded):
+                colleges.append(college)
+            if len(colleges) == limit:
+                break
+        return colleges
+
+    def import_file(self, path: str, source: str | None = None) -> int:
+        """Import colleges from a CSV or Parquet file whose columns are College fields."""
+        return self.save_many(_read_colleges(Path(path)), source or f"import:{Path(path).name}")
+
+
+def _searchable_location(location: str) -> str:
+    """The location with its state code spelled out, so "Portland, OR" matches "oregon"."""
+    state = location.rpartition(",")[2].strip().casefold()
+    return f"{location} {US_STATES[state]}" if state in US_STATES else location
+
+
+def _read_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    if path.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        yield from pq.read_table(path).to_pylist()
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def _read_colleges(path: Path) -> Iterator[College]:
+    for row in _read_rows(path):
+        row = {k.strip().lower(): v for k, v in row.items() if k}
+        if not row.get("name"):
+            continue
+        programs = row.get("programs")
+        if isinstance(programs, str):
+            # JSON list, or names separated by ; or |
+            programs = json.loads(programs) if programs.startswith("[") else [
+                p.strip() for p in re.split(r"[;|]", programs) if p.strip()
+            ]
+        values = {
+            field: (str(row[field]) if row.get(field) not in (None, "") else None)
+            for field in STORED_FIELDS
+            if field != "programs"
+        }
+        values["location"] = values["location"] or ""
+        values["description"] = values["description"] or ""
+        yield College(name=str(row["name"]), programs=programs or None, **values)
+
+
+@cache
+def get_college_store() -> CollegeStore | None:
+    """The college store configured by the COLLEGE_STORE settings, None when disabled."""
+    if not settings.COLLEGE_STORE:
+        return None
+    return CollegeStore(settings.COLLEGE_STORE_PATH, max_age=settings.COLLEGE_STORE_MAX_AGE)
@@ -7,7 +7,7 @@ from pydantic import BaseModel, Field
 from langgraph.prebuilt import ToolNode
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langchain_core.tools import tool
-from agents.tools.searchweb import search_web_get_answer, search_web_with_query, SearchResult, scrape_web_agent
+from agents.tools.searchweb import asearch_web_with_query, search_web_get_answer, search_web_with_query, SearchResult, scrape_web_agent
 from langgraph.constants import Send
 
 
@@ -30,7 +30,7 @@ class PlayerState(TypedDict):
     player: Player
 
 
-def find_player_links(state: PlayerState) -> PlayerState:
+async def find_player_links(state: PlayerState) -> PlayerState:
     """Find the player links for the roster."""
     VALID_SITES = [
         "perfectgame.org",
@@ -40,7 +40,7 @@ def find_player_links(state: PlayerState) -> PlayerState:
     print(f"Finding player links for: {state['player'].name}")
     query = f"{state['player'].name} baseball"
 
-    results = search_web_with_query(query,max_results=10)
+    results = await asearch_web_with_query(query,max_results=10)
     #print("\nDirect Search Results:")
     for result in results:
         if any(site.lower() in result.link.lower() for site in VALID_SITES):
@@ -59,11 +59,16 @@ async def extract_player_info(state: PlayerState) -> TeamRosterState:
         # Only check velocity if player is a pitcher
         if state["player"].position and state["player"].position.lower() in ["p", "lhp", "rhp", "pitcher"]:
             # Extract roster information using scrape_web_agent
-            velo = await scrape_web_agent(
-                link,
-                """From the data provided find the top fastball velocity of the player""",
-                FastballVelocity
-            )
+            try:
+                velo = await scrape_web_agent(
+                    link,
+                    """From the data provided find the top fastball velocity of the player""",
+                    FastballVelocity
+                )
+            except Exception as e:
+                # One unreachable page should not fail the whole roster
+                print(f"Error processing {link}: {str(e)}")
+                continue
             if velo.velocity:
                 state["player"].velocity = velo.velocity
                 break
@@ -79,17 +84,14 @@ def processPlayers(state: TeamRosterState):
 def create_team_roster_graph():
     """Create the team roster agent graph."""
 
-    # Create the model node
-    model = get_llm()
-
-    def find_roster_url(state: RosterAgentInput) -> TeamRosterState:
+    async def find_roster_url(state: RosterAgentInput) -> TeamRosterState:
 
         college_name = state.college_name
         class RosterURL(BaseModel):
             url: str = Field(description="The official roster URL for the college baseball team")
 
 
-        results = search_web_with_query(f"What is the offical .edu url of the {college_name} baseball team 2024 or 2025 roster",max_results=5)
+        results = await asearch_web_with_query(f"What is the offical .edu url of the {college_name} baseball team 2024 or 2025 roster",max_results=5)
         #print("\nDirect Search Results:")
         for result in results:
             print(f"\nURL: {result.link}")
@@ -99,7 +101,7 @@ def create_team_roster_graph():
 
         llm = get_llm()
         structured_llm = llm.with_structured_output(RosterURL)
-        roster_info = structured_llm.invoke(
+        roster_info = await structured_llm.ainvoke(
             [f"Based on the following search results, what is the official roster URL for {college_name} baseball team? "
             "Look for .edu domains and official athletics pages. Provide your confidence level and reasoning.\n\n"
             f"{context}"],
@@ -142,7 +144,7 @@ def create_team_roster_graph():
             print(f"Error extracting roster: {e}")
             return state
 
-    def summarize_roster(state: TeamRosterState) -> TeamRosterState:
+    async def summarize_roster(state: TeamRosterState) -> TeamRosterState:
         """Summarize the roster information."""
         print(f"Summarizing roster information for: {state['team'].team_name}")
         if not state.get("team"):
@@ -160,7 +162,7 @@ def create_team_roster_graph():
         {state['team'].model_dump_json(indent=2)}
         """
 
-        summary = llm.invoke(prompt, config={"temperature": 0.7})
+        summary = await llm.ainvoke(prompt, config={"temperature": 0.7})
         
         return {"summary": summary.content}
      
@@ -1,15 +1,40 @@
+from functools import cache
 
-from langchain_groq import ChatGroq
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig, ensure_config
 from langchain_openai import ChatOpenAI
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3) 
-# groq_llm = ChatGroq(model="deepseek-r1-distill-llama-70b", temperature=0.2)
+from core.llm import get_model
+from core.llm_cache import get_llm_cache
 
-def get_llm():
-    return llm
+
+@cache
+def _default_llm() -> ChatOpenAI:
+    # Created on first use rather than at import, so importing an agent stays cheap
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0.3, cache=get_llm_cache())
+
+
+def get_llm(config: RunnableConfig | None = None, node: str | None = None) -> BaseChatModel:
+    """
+    The model to use for a step of a run.
+
+    `configurable["node_models"][node]` wins over `configurable["model"]`, which wins
+    over the default gpt-4o-mini. Inside a graph both arguments can be left out: the
+    config of the run and the name of the current node are picked up from the context.
+    """
+    config = config or ensure_config()
+    configurable = config.get("configurable") or {}
+    node = node or (config.get("metadata") or {}).get("langgraph_node")
+    node_models = configurable.get("node_models") or {}
+    model_name = node_models.get(node) or configurable.get("model")
+    if model_name is None:
+        return _default_llm()
+    return get_model(model_name)
 
 ## Too many limitations right now
 def get_groq_llm():
     # Initialize Groq LLM only when needed
+    from langchain_groq import ChatGroq
+
     groq_llm = ChatGroq(model="deepseek-r1-distill-llama-70b", temperature=0.2)
     return groq_llm
@@ -1,3 +1,4 @@
+import asyncio
 import subprocess
 import sys
 from typing import Annotated, Sequence, TypeVar, List
@@ -9,7 +10,7 @@ from langgraph.graph.state import CompiledStateGraph
 from langgraph.checkpoint.memory import MemorySaver
 from pydantic import BaseModel, Field
 
-from agents.tools.searchweb import scrape_web, scrape_web_agent, search_web, search_web_with_query, use_browser
+from agents.tools.searchweb import asearch_web, asearch_web_with_query, extract_from_content, scrape_web, scrape_web_agent, use_browser
 from agents.tools.wikisearch import search_wikipedia_with_query
 
 class PersonaList(BaseModel):
@@ -48,7 +49,7 @@ def create_marketing_graph() -> CompiledStateGraph:
     #     sys.exit(1)
 
     # Create personas node
-    def create_personas(state: workflow_state) -> workflow_state:
+    async def create_personas(state: workflow_state) -> workflow_state:
         prompt = f"""
         Create {state['max_personas']} buyer personas for {state['appName']}.
         App description: {state['appDescription']}
@@ -62,7 +63,7 @@ def create_marketing_graph() -> CompiledStateGraph:
         
         llm = get_llm()
         structured_llm = llm.with_structured_output(PersonaList)
-        response = structured_llm.invoke(prompt)
+        response = await structured_llm.ainvoke(prompt)
         
         # Take only up to max_personas
         max_personas = int(state['max_personas'])  # Ensure integer type
@@ -71,13 +72,13 @@ def create_marketing_graph() -> CompiledStateGraph:
         return {"personas": response.personas[:max_personas]}
     
     async def search_web_for_competitors(state: workflow_state):
-        results = search_web(f"Find website with a similar value proposition: {state['value_proposition']}")
+        results = await asearch_web(f"Find website with a similar value proposition: {state['value_proposition']}")
         #print("SEARCH RESULTS", results)
         return {"search_results": results}
     
     async def search_web_for_competitors_by_hint(state: workflow_state):
         if state['competitor_hint']:
-            results = search_web_with_query(f"Find website similar to {state['competitor_hint']}")
+            results = await asearch_web_with_query(f"Find website similar to {state['competitor_hint']}")
             #print("SEARCH RESULTS", results)
             return {"search_results": results}
         else:
@@ -133,7 +134,7 @@ def create_marketing_graph() -> CompiledStateGraph:
         """
         llm = get_llm()
         structured_llm = llm.with_structured_output(KeywordList)
-        response = structured_llm.invoke(prompt)
+        response = await structured_llm.ainvoke(prompt)
         return {"keywords": response.keywords}
     
     # Get human feedback node
@@ -155,8 +156,7 @@ def create_marketing_graph() -> CompiledStateGraph:
         """
         llm = get_llm()
 
-        results = []
-        for search_result in state["search_results"]:
+        async def competitors_from(search_result):
             try:
                 doc = await scrape_web(search_result.link)
                 prompt = f"""Extract the following information from this web page content:
@@ -164,15 +164,18 @@ def create_marketing_graph() -> CompiledStateGraph:
                 - For each competitor also map their name and a brief description if available.
                 
                 Content:
-                {doc.page_content}
                 """
                 
-                structured_llm = llm.with_structured_output(CompetitorList)
-                competitors = structured_llm.invoke(prompt)
-                results.extend(competitors.competitors)
+                competitors = await extract_from_content(prompt, doc.page_content, CompetitorList)
+                return competitors.competitors
             except Exception as e:
                 print(f"Error processing {search_result.link}: {str(e)}")
-                continue
+                return []
+
+        # The fetcher keeps the requests to each host within its limits
+        results = []
+        for competitors in await asyncio.gather(*map(competitors_from, state["search_results"])):
+            results.extend(competitors)
 
         # Update state with competitors
         prompt2 = f"""Given the list of competitors below determine which are the most relevant competitors, select no more than 10, to {state['appName']} an app that {state['appDescription']}:
@@ -181,7 +184,7 @@ def create_marketing_graph() -> CompiledStateGraph:
         {results}
         """
         structured_llm = llm.with_structured_output(CompetitorList)
-        response = structured_llm.invoke(prompt2)
+        response = await structured_llm.ainvoke(prompt2)
 
         return {"competitors": response.competitors}
 
@@ -197,7 +200,7 @@ def create_marketing_graph() -> CompiledStateGraph:
         """
         llm = get_llm()
         structured_llm = llm.with_structured_output(MarketingStrategiesList)
-        response = structured_llm.invoke(prompt)
+        response = await structured_llm.ainvoke(prompt)
         # THIS CAUSES langgraph.errors.InvalidUpdateError when get_subreddits does it as well
         #state["marketing_suggestions"] = response.strategies
         #return state
@@ -216,7 +219,7 @@ def create_marketing_graph() -> CompiledStateGraph:
         """
         llm = get_llm()
         structured_llm = llm.with_structured_output(SubredditList)
-        response = structured_llm.invoke(prompt)
+        response = await structured_llm.ainvoke(prompt)
         #state["subreddits"] = response.subreddits
         #return state
         #print(f"##### Found {len(response.subreddits)} subreddits")
@@ -0,0 +1,164 @@
+"""
+Pool of warm headless browsers for browser_use agents.
+
+Launching Chromium takes seconds and hundreds of MB, so browsers are kept between
+tasks. Each task gets a new browser context (fresh cookies, storage and tabs) on a
+healthy browser, and gives it back when done. A browser is replaced after
+BROWSER_POOL_MAX_USES tasks, after a task timed out, or once it stops responding,
+and closed after BROWSER_POOL_IDLE_TIMEOUT seconds without use.
+
+Playwright objects belong to the event loop they were created on, so there is one
+pool per loop (see get_browser_pool).
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncIterator
+
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# browser_use pulls in playwright, it is only imported when a browser is needed
+if TYPE_CHECKING:
+    from browser_use import Browser
+    from browser_use.browser.context import BrowserContext
+
+
+@dataclass
+class _PooledBrowser:
+    browser: "Browser"
+    uses: int = 0
+    last_used: float = 0.0
+    # Set when a task on it failed in a way that may have left it unusable
+    broken: bool = False
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        max_size: int = settings.BROWSER_POOL_SIZE,
+        idle_timeout: float = settings.BROWSER_POOL_IDLE_TIMEOUT,
+        max_uses: int = settings.BROWSER_POOL_MAX_USES,
+        task_timeout: float = settings.BROWSER_TASK_TIMEOUT,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self.task_timeout = task_timeout
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle: list[_PooledBrowser] = []
+        self._leased = 0
+        self._reaper: asyncio.Task | None = None
+        self._closed = False
+
+    @staticmethod
+    async def _launch() -> _PooledBrowser:
+        from browser_use import Browser, BrowserConfig
+
+        browser = Browser(config=BrowserConfig(headless=True, proxy=None))
+        # Start Chromium now rather than on the first page, so a broken install fails here
+        await browser.get_playwright_browser()
+        return _PooledBrowser(browser=browser)
+
+    @staticmethod
+    async def _is_healthy(pooled: _PooledBrowser) -> bool:
+        try:
+            playwright_browser = await pooled.browser.get_playwright_browser()
+            return playwright_browser.is_connected()
+        except Exception:
+            return False
+
+    @staticmethod
+    async def _close(pooled: _PooledBrowser) -> None:
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser: {e}")
+
+    async def _take(self) -> _PooledBrowser:
+        """A healthy browser from the idle ones (most recently used first), or a new one."""
+        while self._idle:
+            pooled = self._idle.pop()
+            if await self._is_healthy(pooled):
+                return pooled
+            await self._close(pooled)
+        return await self._launch()
+
+    async def _give_back(self, pooled: _PooledBrowser) -> None:
+        pooled.uses += 1
+        pooled.last_used = time.monotonic()
+        if self._closed or pooled.broken or pooled.uses >= self.max_uses:
+            await self._close(pooled)
+        else:
+            self._idle.append(pooled)
+
+    async def _reap_idle(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(min(30.0, self.idle_timeout))
+            now = time.monotonic()
+            expired = [p for p in self._idle if now - p.last_used > self.idle_timeout]
+            for pooled in expired:
+                self._idle.remove(pooled)
+                await self._close(pooled)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator["BrowserContext"]:
+        """A new browser context on a warm browser, waiting while max_size are in use."""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_idle())
+        async with self._slots:
+            pooled = await self._take()
+            self._leased += 1
+            context = None
+            try:
+                context = await pooled.browser.new_context()
+                yield context
+            except (TimeoutError, asyncio.CancelledError):
+                # Stopped in the middle of a page, don't trust the browser
+                pooled.broken = True
+                raise
+            finally:
+                self._leased -= 1
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pooled.broken = True
+                await self._give_back(pooled)
+
+    def stats(self) -> dict[str, int]:
+        return {"max_size": self.max_size, "idle": len(self._idle), "leased": self._leased}
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            await self._close(pooled)
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, BrowserPool]" = weakref.WeakKeyDictionary()
+
+
+def get_browser_pool() -> BrowserPool:
+    """The browser pool of the running event loop."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = BrowserPool()
+    return pool
+
+
+async def close_browser_pool() -> None:
+    """Close the browsers of the running event loop's pool, if it has one."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
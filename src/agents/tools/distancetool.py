@@ -1,28 +1,112 @@
-import requests
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from functools import cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.background_loop import run_sync
+from core.executor import run_blocking
+from core.fetcher import get_fetcher
+from core.settings import settings
 from langchain_core.tools import BaseTool, tool
-from typing import Tuple
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
 class AddressInput(BaseModel):
     address1: str = Field(..., description="First address to calculate distance from")
     address2: str = Field(..., description="Second address to calculate distance to")
 
-def get_coordinates(address: str) -> Tuple[float, float]:
-    """Get latitude and longitude for an address using Nominatim API"""
-    base_url = "https://nominatim.openstreetmap.org/search"
-    params = {
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {
+    "User-Agent": "DistanceCalculator/1.0"
+}
+
+def _nominatim_params(address: str) -> dict:
+    return {
         "q": address,
         "format": "json",
         "limit": 1
     }
-    headers = {
-        "User-Agent": "DistanceCalculator/1.0"
-    }
-    
-    response = requests.get(base_url, params=params, headers=headers)
-    response.raise_for_status()
-    
-    results = response.json()
+
+EARTH_RADIUS_MILES = 3959.87433
+
+
+class GeocodeCache:
+    """
+    Coordinates of addresses in a SQLite database in WAL mode, shared by the workers.
+    Addresses Nominatim could not find are remembered too, for a shorter time.
+    """
+
+    def __init__(self, path: str, ttl: int, not_found_ttl: int):
+        self._ttl = ttl
+        self._not_found_ttl = not_found_ttl
+        self._path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocodes (
+                address TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                created_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, addresses: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+        """The cached addresses among these (normalized), None for the ones not found."""
+        now = time.time()
+        found = {}
+        for address, lat, lon, created_at in self._connection().execute(
+            f"SELECT address, lat, lon, created_at FROM geocodes WHERE address IN ({','.join('?' * len(addresses))})",
+            addresses,
+        ):
+            if lat is None:
+                if now - created_at < self._not_found_ttl:
+                    found[address] = None
+            elif now - created_at < self._ttl:
+                found[address] = (lat, lon)
+        return found
+
+    def set_many(self, coordinates: Dict[str, Optional[Tuple[float, float]]]) -> None:
+        """Cache the coordinates of these (normalized) addresses, None for the ones not found."""
+        now = time.time()
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)",
+            [(address, *(found or (None, None)), now) for address, found in coordinates.items()],
+        )
+
+
+@cache
+def get_geocode_cache() -> GeocodeCache:
+    return GeocodeCache(
+        settings.GEOCODE_CACHE_PATH,
+        ttl=settings.GEOCODE_CACHE_TTL,
+        not_found_ttl=settings.GEOCODE_NOT_FOUND_TTL,
+    )
+
+
+def normalize_address(address: str) -> str:
+    return " ".join(address.casefold().replace(",", ", ").split()).strip(" .,")
+
+
+def _parse_coordinates(address: str, results: list) -> Tuple[float, float]:
     if not results:
         raise ValueError(f"Could not find coordinates for address: {address}")
         
@@ -30,6 +114,110 @@ def get_coordinates(address: str) -> Tuple[float, float]:
     lon = float(results[0]["lon"])
     return lat, lon
 
+async def _nominatim_geocode(address: str) -> Optional[Tuple[float, float]]:
+    # Nominatim allows 1 request/s, the fetcher spaces out the requests to it
+    response = await get_fetcher().fetch(NOMINATIM_URL, params=_nominatim_params(address), headers=NOMINATIM_HEADERS)
+    results = response.json()
+    return _parse_coordinates(address, results) if results else None
+
+async def ageocode_many(addresses: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """Geocode addresses, from the cache when possible.
+
+    Each distinct address is looked up once, and the ones not cached are sent to
+    Nominatim within its rate limit.
+
+    Args:
+        addresses: Addresses to geocode
+
+    Returns:
+        Dict mapping each address to its (latitude, longitude), None if it was not found
+    """
+    normalized = {address: normalize_address(address) for address in addresses}
+    keys = list(dict.fromkeys(normalized.values()))
+    geocode_cache = get_geocode_cache()
+    # SQLite calls block, they run off the event loop
+    coordinates = await run_blocking(geocode_cache.get_many, keys) if keys else {}
+    missing = [key for key in keys if key not in coordinates]
+    if missing:
+        results = await asyncio.gather(*map(_nominatim_geocode, missing), return_exceptions=True)
+        geocoded = {}
+        for key, result in zip(missing, results):
+            if isinstance(result, Exception):
+                # Network errors are not cached, the next call retries them
+                logger.warning(f"Error geocoding {key}: {result}")
+                coordinates[key] = None
+                continue
+            geocoded[key] = coordinates[key] = result
+        if geocoded:
+            await run_blocking(geocode_cache.set_many, geocoded)
+    return {address: coordinates[key] for address, key in normalized.items()}
+
+def geocode_many(addresses: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """Blocking version of ageocode_many, for sync callers such as crew tools"""
+    return run_sync(ageocode_many(addresses))
+
+def get_coordinates(address: str) -> Tuple[float, float]:
+    """Get latitude and longitude for an address using Nominatim API"""
+    coordinates = geocode_many([address])[address]
+    if coordinates is None:
+        raise ValueError(f"Could not find coordinates for address: {address}")
+    return coordinates
+
+async def aget_coordinates(address: str) -> Tuple[float, float]:
+    """Async version of get_coordinates"""
+    coordinates = (await ageocode_many([address]))[address]
+    if coordinates is None:
+        raise ValueError(f"Could not find coordinates for address: {address}")
+    return coordinates
+
+def haversine_matrix(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """Distances in miles between every (lat, lon) row of origins and of destinations.
+
+    Args:
+        origins: Array of shape (n, 2) in degrees
+        destinations: Array of shape (m, 2) in degrees
+
+    Returns:
+        Array of shape (n, m), NaN where a coordinate is NaN
+    """
+    lat1, lon1 = np.radians(origins).T[:, :, np.newaxis]
+    lat2, lon2 = np.radians(destinations).T[:, np.newaxis, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _coordinates_array(addresses: List[str], coordinates: Dict[str, Optional[Tuple[float, float]]]) -> np.ndarray:
+    return np.array(
+        [coordinates[address] or (np.nan, np.nan) for address in addresses], dtype=float
+    ).reshape(-1, 2)
+
+async def adistance_matrix(origins: List[str], destinations: List[str]) -> np.ndarray:
+    """Distances in miles from every origin to every destination.
+
+    All addresses are geocoded in one batch, then every pair is computed at once.
+
+    Args:
+        origins: Addresses to calculate distances from
+        destinations: Addresses to calculate distances to
+
+    Returns:
+        Array of shape (len(origins), len(destinations)), NaN where an address could
+        not be geocoded
+    """
+    coordinates = await ageocode_many(origins + destinations)
+    return haversine_matrix(
+        _coordinates_array(origins, coordinates), _coordinates_array(destinations, coordinates)
+    )
+
+def distance_matrix(origins: List[str], destinations: List[str]) -> np.ndarray:
+    """Blocking version of adistance_matrix"""
+    return run_sync(adistance_matrix(origins, destinations))
+
+def _distance_between(address1: str, address2: str, coordinates: Dict[str, Optional[Tuple[float, float]]]) -> float:
+    for address in (address1, address2):
+        if coordinates[address] is None:
+            raise ValueError(f"Could not find coordinates for address: {address}")
+    return float(haversine_matrix(np.array([coordinates[address1]]), np.array([coordinates[address2]]))[0, 0])
+
 def calculate_distance(address1: str, address2: str) -> str:
     """Calculate the distance between two addresses.
     
@@ -43,24 +231,18 @@ def calculate_distance(address1: str, address2: str) -> str:
     Returns:
         str: Distance between the addresses in miles
     """
-    from math import radians, sin, cos, sqrt, atan2
-    
     try:
-        lat1, lon1 = get_coordinates(address1)
-        lat2, lon2 = get_coordinates(address2)
+        coordinates = geocode_many([address1, address2])
+        return f"{_distance_between(address1, address2, coordinates):.2f} miles"
         
-        R = 3959.87433  # Earth's radius in miles
+    except Exception as e:
+        raise ValueError(f"Error calculating distance: {str(e)}")
+
+async def acalculate_distance(address1: str, address2: str) -> str:
+    """Async version of calculate_distance"""
+    try:
+        coordinates = await ageocode_many([address1, address2])
+        return f"{_distance_between(address1, address2, coordinates):.2f} miles"
 
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        distance = R * c
-        
-        return f"{distance:.2f} miles"
-        
     except Exception as e:
         raise ValueError(f"Error calculating distance: {str(e)}")
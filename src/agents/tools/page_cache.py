@@ -0,0 +1,215 @@
+"""
+Persistent cache of scraped pages, shared by the workers of a host.
+
+Pages are stored once per content (sha256 of the HTML) as compressed HTML plus the
+compressed extracted text, so a fresh hit skips both the request and the parse. URLs
+point at their content and keep the ETag / Last-Modified of the response, which are
+used to revalidate a stale entry with a conditional GET.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from functools import cache
+from typing import Any
+from urllib.parse import urlsplit
+
+from core.settings import settings
+
+
+@dataclass
+class CachedPage:
+    url: str
+    text: str
+    metadata: dict[str, Any]
+    etag: str | None
+    last_modified: str | None
+    fresh: bool
+
+    def revalidation_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Pages in a SQLite database in WAL mode. An entry is fresh for the TTL of its domain
+    (PAGE_CACHE_DOMAIN_TTLS, matching subdomains too, else `ttl`), and the least recently
+    used contents are evicted once they take more than `max_bytes`.
+    """
+
+    # Writes between two checks of the total size
+    _EVICTION_CHECK_INTERVAL = 32
+
+    def __init__(self, path: str, ttl: int, max_bytes: int, domain_ttls: dict[str, int] | None = None):
+        self._path = path
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._domain_ttls = {domain.lower(): t for domain, t in (domain_ttls or {}).items()}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS page_contents (
+                hash TEXT PRIMARY KEY,
+                html BLOB NOT NULL,
+                text BLOB NOT NULL,
+                metadata TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS page_contents_last_used ON page_contents (last_used);
+            CREATE TABLE IF NOT EXISTS page_urls (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, pages are parsed on executor threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def ttl(self, url: str) -> int:
+        host = urlsplit(url).hostname or ""
+        while host:
+            if host in self._domain_ttls:
+                return self._domain_ttls[host]
+            host = host.partition(".")[2]
+        return self._ttl
+
+    def get(self, url: str) -> CachedPage | None:
+        conn = self._connection()
+        row = conn.execute(
+            """
+            SELECT c.hash, c.text, c.metadata, u.etag, u.last_modified, u.fetched_at
+            FROM page_urls u JOIN page_contents c ON c.hash = u.hash
+            WHERE u.url = ?
+            """,
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        content_hash, text, metadata, etag, last_modified, fetched_at = row
+        conn.execute("UPDATE page_contents SET last_used = ? WHERE hash = ?", (time.time(), content_hash))
+        return CachedPage(
+            url=url,
+            text=zlib.decompress(text).decode(),
+            metadata=json.loads(metadata),
+            etag=etag,
+            last_modified=last_modified,
+            fresh=time.time() - fetched_at < self.ttl(url),
+        )
+
+    def revalidated(self, url: str) -> None:
+        """The server answered 304 Not Modified: the entry is fresh again."""
+        self._connection().execute(
+            "UPDATE page_urls SET fetched_at = ? WHERE url = ?", (time.time(), url)
+        )
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        text: str,
+        metadata: dict[str, Any],
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        content_hash = hashlib.sha256(html.encode()).hexdigest()
+        compressed_html = zlib.compress(html.encode())
+        compressed_text = zlib.compress(text.encode())
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # The same content under several URLs (redirects, tracking parameters) is stored once
+            conn.execute(
+                """
+                INSERT INTO page_contents VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hash) DO UPDATE SET last_used = excluded.last_used
+                """,
+                (
+                    content_hash,
+                    compressed_html,
+                    compressed_text,
+                    json.dumps(metadata),
+                    len(compressed_html) + len(compressed_text),
+                    now,
+                ),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO page_urls VALUES (?, ?, ?, ?, ?)",
+                (url, content_hash, etag, last_modified, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._writes_since_check += 1
+            check = self._writes_since_check >= self._EVICTION_CHECK_INTERVAL
+            if check:
+                self._writes_since_check = 0
+        if check:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop the least recently used contents until under max_bytes."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_contents").fetchone()
+            if total > self._max_bytes:
+                # Leave some headroom so we don't evict on every check
+                excess = total - int(self._max_bytes * 0.9)
+                freed = 0
+                hashes = []
+                for content_hash, size in conn.execute(
+                    "SELECT hash, size FROM page_contents ORDER BY last_used"
+                ):
+                    hashes.append((content_hash,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                conn.executemany("DELETE FROM page_contents WHERE hash = ?", hashes)
+                conn.execute(
+                    "DELETE FROM page_urls WHERE hash NOT IN (SELECT hash FROM page_contents)"
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+@cache
+def get_page_cache() -> PageCache | None:
+    """The page cache configured by the PAGE_CACHE settings, None when disabled."""
+    if not settings.PAGE_CACHE:
+        return None
+    return PageCache(
+        settings.PAGE_CACHE_PATH,
+        ttl=settings.PAGE_CACHE_TTL,
+        max_bytes=settings.PAGE_CACHE_MAX_BYTES,
+        domain_ttls=settings.PAGE_CACHE_DOMAIN_TTLS,
+    )
@@ -1,9 +1,21 @@
+import asyncio
+import logging
+import re
+import httpx
+from functools import cache
 from typing import List
-from langchain_community.tools.tavily_search import TavilySearchResults,TavilyAnswer
-from langchain_community.document_loaders import WebBaseLoader
+from langchain_core.documents import Document
 from pydantic import BaseModel, Field
-from browser_use import ActionResult, Agent, Browser, BrowserConfig, Controller
+from langchain_core.runnables import RunnableConfig
 from agents.llmtools import get_llm
+from agents.tools.browser_pool import get_browser_pool
+from agents.tools.page_cache import get_page_cache
+from agents.tools.tavily_client import get_tavily_client
+from core.executor import run_blocking
+from core.fetcher import NOT_MODIFIED, get_fetcher
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
 
 #Another scrape to consider https://github.com/dendrite-systems/dendrite-python-sdk
 
@@ -24,60 +36,268 @@ def search_web(instructions: str, max_results: int = 3)->List[SearchResult]:
     return search_web_with_query(search_query.search_query, max_results)
 
 
-def search_web_with_query(query: str, max_results: int = 3)->List[SearchResult]:
+async def asearch_web(instructions: str, max_results: int = 3)->List[SearchResult]:
+    """ Async version of search_web """
+
+    llm = get_llm()
+    structured_llm = llm.with_structured_output(SearchQuery)
+    search_query = await structured_llm.ainvoke([instructions])
+    print("SEARCH QUERY: ", search_query.search_query)
+    return await asearch_web_with_query(search_query.search_query, max_results)
+
+
+def _to_search_results(response: dict, raw_content: bool) -> List[SearchResult]:
+    return [
+        SearchResult(
+            link=doc["url"],
+            content=(raw_content and doc.get("raw_content")) or doc["content"],
+        )
+        for doc in response.get("results", [])
+    ]
+
+
+def search_web_with_query(query: str, max_results: int = 3, raw_content: bool = False)->List[SearchResult]:
     
-    """ Retrieve docs from web search """
-
-    import os
-    tavily_search = TavilySearchResults(
-        max_results=max_results,
-        include_answer=False,
-        include_raw_content=True,
-        api_key=os.getenv("TAVILY_API_KEY")
-    )
-    # Search
-    search_docs = tavily_search.invoke(query)
-    # Check if search_docs is a string (likely an error)
-    if isinstance(search_docs, str):
-        print(f"Error in search results: {search_docs}")
+    """ Retrieve docs from web search, with the full page text as content if raw_content """
+
+    try:
+        response = get_tavily_client().search_sync(
+            query, max_results=max_results, include_raw_content=raw_content, search_depth="advanced"
+        )
+    except Exception as e:
+        print(f"Error in search results: {e}")
         return []  # Return empty list to avoid downstream errors
-   
-    return [SearchResult(link=doc["url"], content=doc["content"]) for doc in search_docs]
+    return _to_search_results(response, raw_content)
+
+
+async def asearch_web_with_query(query: str, max_results: int = 3, raw_content: bool = False)->List[SearchResult]:
+
+    """ Async version of search_web_with_query """
+
+    try:
+        response = await get_tavily_client().search(
+            query, max_results=max_results, include_raw_content=raw_content, search_depth="advanced"
+        )
+    except Exception as e:
+        print(f"Error in search results: {e}")
+        return []
+    return _to_search_results(response, raw_content)
 
 
 def search_web_get_answer(query: str)->str:
     
     """ Retrieve docs from web search and answer the query """
 
-    tavily_answer = TavilyAnswer()
+    try:
+        response = get_tavily_client().search_sync(query, include_answer=True)
+    except Exception as e:
+        print(f"Error getting web answer: {e}")
+        return ""
+    return response.get("answer") or ""
+
 
-    # Search
-    answer = tavily_answer.invoke(query)
+async def asearch_web_get_answer(query: str)->str:
 
-    return answer
+    """ Async version of search_web_get_answer """
+
+    try:
+        response = await get_tavily_client().search(query, include_answer=True)
+    except Exception as e:
+        print(f"Error getting web answer: {e}")
+        return ""
+    return response.get("answer") or ""
+
+def _html_to_document(url: str, html: str) -> Document:
+    # Same text and metadata as langchain's WebBaseLoader
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    if soup.title:
+        metadata["title"] = soup.title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html_tag := soup.find("html"):
+        metadata["language"] = html_tag.get("lang", "No language found.")
+    return Document(page_content=soup.get_text(), metadata=metadata)
+
+
+def _parse_and_cache(url: str, response: httpx.Response) -> Document:
+    doc = _html_to_document(str(response.url), response.text)
+    if page_cache := get_page_cache():
+        page_cache.put(
+            url,
+            response.text,
+            doc.page_content,
+            doc.metadata,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return doc
 
-async def scrape_web(url: str) -> str:
-    """Scrape the web page asynchronously"""
-    loader = WebBaseLoader(url)
-    # Load the page asynchronously
-    docs = []
-    async for doc in loader.alazy_load():
-        docs.append(doc)
-    #print(docs[0].page_content[:100])
-    return docs[0]
+
+async def scrape_web(url: str) -> Document:
+    """Scrape the web page asynchronously, from the page cache when it is fresh"""
+    page_cache = get_page_cache()
+    cached = await run_blocking(page_cache.get, url) if page_cache else None
+    if cached and cached.fresh:
+        return Document(page_content=cached.text, metadata=cached.metadata)
+
+    headers = cached.revalidation_headers() if cached else None
+    try:
+        response = await get_fetcher().fetch(url, headers=headers)
+    except httpx.HTTPStatusError as e:
+        # An error page (403, 404...) is an empty page rather than a failed run, as it
+        # was with the page loaders. A stale copy beats nothing.
+        logger.warning(f"Could not scrape {url}: HTTP {e.response.status_code}")
+        if cached:
+            return Document(page_content=cached.text, metadata=cached.metadata)
+        return Document(page_content="", metadata={"source": url, "status_code": e.response.status_code})
+    if cached and response.status_code == NOT_MODIFIED:
+        await run_blocking(page_cache.revalidated, url)
+        return Document(page_content=cached.text, metadata=cached.metadata)
+    # Parsing a large page takes long enough to stall the event loop
+    return await run_blocking(_parse_and_cache, url, response)
 
 async def scrape_web_agent(url: str, query: str, output_model: type[BaseModel]) -> BaseModel:
-    llm = get_llm()
     doc = await scrape_web(url)
-    structured_llm = llm.with_structured_output(output_model)
-    result = await structured_llm.ainvoke(
-        [query + "\n\n" + doc.page_content],
-        config={"temperature": 0.3}
+    return await extract_from_content(query, doc.page_content, output_model)
+
+
+# Short lines that are navigation, cookie banners and other page chrome rather than
+# content. Longer lines are content, even when they mention cookies or a copyright.
+_BOILERPLATE_MAX_LENGTH = 120
+_BOILERPLATE = re.compile(
+    r"^(skip to (main )?content|menu|search|home|log ?in|sign ?(in|up)|subscribe|share|"
+    r"(accept|manage|reject)( all)? cookies|cookies? (policy|settings|preferences)|"
+    r"(this (web)?site|we) uses? cookies\b.*|privacy policy|terms (of (use|service)|and conditions)|"
+    r"back to top|(copyright|©)( ?©)? ?\d{4}\b.*|.*\ball rights reserved\.?)$",
+    re.IGNORECASE,
+)
+
+
+@cache
+def _encoding():
+    import tiktoken
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The encoding is downloaded on first use, count approximately without it
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_tokens(text: str, max_tokens: int) -> List[str]:
+    """Split text with no paragraph breaks into pieces of max_tokens."""
+    encoding = _encoding()
+    if encoding is None:
+        size = max_tokens * 4
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def clean_content(text: str) -> str:
+    """Drop navigation and boilerplate lines, repeats of the line before and extra whitespace."""
+    lines = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line:
+            # Keep paragraph breaks, they are where chunks get cut
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if len(line) < _BOILERPLATE_MAX_LENGTH and _BOILERPLATE.match(line):
+            continue
+        # Only a line repeating the one just before: table cells ("R/R", "Jr.") repeat
+        # across rows, and dropping those would shift the rows
+        if lines and lines[-1] == line:
+            continue
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def chunk_content(text: str, max_tokens: int) -> List[str]:
+    """Cut text into chunks of at most max_tokens, at paragraph breaks when possible."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in text.split("\n\n"):
+        tokens = count_tokens(paragraph)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            chunks.extend(_split_tokens(paragraph, max_tokens))
+            continue
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def reduce_content(text: str, max_tokens: int | None = None) -> str:
+    """The content of a page or search result cleaned and cut to max_tokens."""
+    text = clean_content(text)
+    max_tokens = max_tokens or settings.LLM_CONTENT_MAX_TOKENS
+    if count_tokens(text) <= max_tokens:
+        return text
+    return chunk_content(text, max_tokens)[0]
+
+
+async def extract_from_content(
+    instructions: str,
+    content: str,
+    output_model: type[BaseModel],
+    max_tokens: int | None = None,
+    map_reduce: bool | None = None,
+) -> BaseModel:
+    """
+    Extract output_model from content with a structured LLM call, within a token budget.
+
+    Content over max_tokens is either cut to it, or with map_reduce extracted chunk by
+    chunk and the partial results combined by a last call.
+    """
+    max_tokens = max_tokens or settings.LLM_CONTENT_MAX_TOKENS
+    map_reduce = settings.LLM_CONTENT_MAP_REDUCE if map_reduce is None else map_reduce
+    structured_llm = get_llm().with_structured_output(output_model)
+
+    content = clean_content(content)
+    chunks = chunk_content(content, max_tokens) if count_tokens(content) > max_tokens else [content]
+    if len(chunks) == 1 or not map_reduce:
+        return await structured_llm.ainvoke([instructions + "\n\n" + chunks[0]])
+
+    chunks = chunks[:settings.LLM_CONTENT_MAX_CHUNKS]
+    logger.info(f"Extracting from {len(chunks)} chunks of content")
+    partials = await structured_llm.abatch(
+        [[instructions + "\n\n" + chunk] for chunk in chunks], return_exceptions=True
     )
-    return result
+    partials = [p for p in partials if not isinstance(p, Exception)]
+    if not partials:
+        raise ValueError("Extraction failed for every chunk of content")
+    if len(partials) == 1:
+        return partials[0]
+    combined = "\n\n".join(p.model_dump_json() for p in partials)
+    return await structured_llm.ainvoke([
+        f"{instructions}\n\n"
+        "The content was too long and was processed in parts. Combine these partial "
+        "results into a single result, merging duplicates:\n\n"
+        f"{combined}"
+    ])
+
+async def use_browser(query: str, output_model: type[BaseModel], max_steps: int = 10, config: RunnableConfig | None = None) -> BaseModel:
+        # browser_use pulls in playwright, only load it when a browser is needed
+        from browser_use import ActionResult, Agent, Controller
 
-async def use_browser(query: str, output_model: type[BaseModel], max_steps: int = 10) -> BaseModel:
-        llm = get_llm()
+        llm = get_llm(config)
         controller = Controller()
 
         @controller.registry.action('Done with task', param_model=output_model)
@@ -86,19 +306,17 @@ async def use_browser(query: str, output_model: type[BaseModel], max_steps: int
             result = ActionResult(is_done=True, extracted_content=params.model_dump_json())
             return result
 
-        browser_agent = Agent(
-            task=query,
-            llm=llm,
-            browser=Browser(
-                config=BrowserConfig(
-                    headless=True,
-                    proxy=None,
-                )
-            ),
-            controller=controller,
-            save_conversation_path="logs/conversation.json"
-        )
-            
-        result = await browser_agent.run(max_steps=max_steps)
+        # A fresh context on a warm browser, instead of launching one per call
+        pool = get_browser_pool()
+        async with pool.lease() as browser_context:
+            browser_agent = Agent(
+                task=query,
+                llm=llm,
+                browser_context=browser_context,
+                controller=controller,
+                save_conversation_path="logs/conversation.json"
+            )
+                
+            result = await asyncio.wait_for(browser_agent.run(max_steps=max_steps), pool.task_timeout)
         final_result = result.final_result()
         return final_result
\ No newline at end of file
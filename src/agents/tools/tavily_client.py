@@ -0,0 +1,217 @@
+"""
+Tavily search client shared by the agents and crew tools.
+
+Requests go through one pooled HTTP client per event loop (plus one for sync callers),
+responses are cached on disk for SEARCH_CACHE_TTL seconds, and identical searches
+running at the same time share a single request.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from functools import cache
+from typing import Any
+
+import httpx
+
+from core.settings import settings
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+
+class SearchCache:
+    """Tavily responses in a SQLite database in WAL mode, keyed by search parameters."""
+
+    def __init__(self, path: str, ttl: int):
+        self._path = path
+        self._ttl = ttl
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("DELETE FROM search_cache WHERE created_at < ?", (time.time() - ttl,))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        row = self._connection().execute(
+            "SELECT response FROM search_cache WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self._ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, response: dict[str, Any]) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?)",
+            (key, json.dumps(response), time.time()),
+        )
+
+
+@cache
+def get_search_cache() -> SearchCache | None:
+    if not settings.SEARCH_CACHE:
+        return None
+    return SearchCache(settings.SEARCH_CACHE_PATH, ttl=settings.SEARCH_CACHE_TTL)
+
+
+def _cache_key(payload: dict[str, Any]) -> str:
+    normalized = {**payload, "query": " ".join(payload["query"].casefold().split())}
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class TavilyClient:
+    """
+    Tavily search over pooled connections. `search` is the async API, `search_sync` the
+    one for sync callers (crew tools); both share the cache.
+    """
+
+    def __init__(self, api_key: str | None = None):
+        self._api_key = api_key
+        # httpx.AsyncClient and in-flight requests are bound to the loop they run on
+        self._async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._async_inflight: dict[tuple[int, str], asyncio.Task] = {}
+        self._sync_client: httpx.Client | None = None
+        self._sync_inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _headers(self) -> dict[str, str]:
+        api_key = self._api_key or os.getenv("TAVILY_API_KEY")
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(timeout=_TIMEOUT, limits=_LIMITS)
+            self._async_clients[loop] = client
+        return client
+
+    def _client(self) -> httpx.Client:
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(timeout=_TIMEOUT, limits=_LIMITS)
+            return self._sync_client
+
+    @staticmethod
+    def _payload(
+        query: str,
+        max_results: int,
+        include_raw_content: bool,
+        include_answer: bool,
+        search_depth: str,
+    ) -> dict[str, Any]:
+        return {
+            "query": query,
+            "max_results": max_results,
+            "include_raw_content": include_raw_content,
+            "include_answer": include_answer,
+            "search_depth": search_depth,
+        }
+
+    async def search(
+        self,
+        query: str,
+        max_results: int = 5,
+        include_raw_content: bool = False,
+        include_answer: bool = False,
+        search_depth: str = "basic",
+    ) -> dict[str, Any]:
+        """The Tavily response for the query: `results`, and `answer` if asked for."""
+        payload = self._payload(query, max_results, include_raw_content, include_answer, search_depth)
+        key = _cache_key(payload)
+        search_cache = get_search_cache()
+        if search_cache and (cached := search_cache.get(key)) is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        task = self._async_inflight.get(inflight_key)
+        if task is None:
+            # A task of its own, so a cancelled caller does not cancel the request for
+            # the other callers waiting on it
+            task = loop.create_task(self._post(payload, key))
+            self._async_inflight[inflight_key] = task
+
+            def done(task: asyncio.Task) -> None:
+                self._async_inflight.pop(inflight_key, None)
+                if not task.cancelled():
+                    # Only the waiting searches should see an error, not the loop's handler
+                    task.exception()
+
+            task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    async def _post(self, payload: dict[str, Any], key: str) -> dict[str, Any]:
+        response = await self._async_client().post(TAVILY_SEARCH_URL, json=payload, headers=self._headers())
+        response.raise_for_status()
+        result = response.json()
+        if search_cache := get_search_cache():
+            search_cache.set(key, result)
+        return result
+
+    def search_sync(
+        self,
+        query: str,
+        max_results: int = 5,
+        include_raw_content: bool = False,
+        include_answer: bool = False,
+        search_depth: str = "basic",
+    ) -> dict[str, Any]:
+        """Blocking version of search."""
+        payload = self._payload(query, max_results, include_raw_content, include_answer, search_depth)
+        key = _cache_key(payload)
+        search_cache = get_search_cache()
+        if search_cache and (cached := search_cache.get(key)) is not None:
+            return cached
+
+        with self._lock:
+            inflight = self._sync_inflight.get(key)
+            if inflight is None:
+                future = self._sync_inflight[key] = Future()
+        if inflight is not None:
+            return inflight.result()
+
+        try:
+            response = self._client().post(TAVILY_SEARCH_URL, json=payload, headers=self._headers())
+            response.raise_for_status()
+            result = response.json()
+            if search_cache:
+                search_cache.set(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._sync_inflight[key]
+
+
+@cache
+def get_tavily_client() -> TavilyClient:
+    return TavilyClient()
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from langchain_community.document_loaders import WikipediaLoader
 from agents.llmtools import get_llm
+from core.executor import run_blocking
 
 class SearchQuery(BaseModel):
     search_query: str = Field(None, description="Search query for retrieval.")
@@ -15,6 +16,16 @@ def search_wikipedia(instructions: str, max_results: int = 3):
     return search_wikipedia_with_query(search_query.search_query, max_results)
 
 
+async def asearch_wikipedia(instructions: str, max_results: int = 3):
+    """ Async version of search_wikipedia """
+
+    llm = get_llm()
+    structured_llm = llm.with_structured_output(SearchQuery)
+    search_query = await structured_llm.ainvoke([instructions])
+
+    return await asearch_wikipedia_with_query(search_query.search_query, max_results)
+
+
 def search_wikipedia_with_query(query: str, max_results: int = 3):
     
     """ Retrieve docs from wikipedia search """
@@ -30,4 +41,11 @@ def search_wikipedia_with_query(query: str, max_results: int = 3):
         ]
     )
 
-    return {"docresults": [formatted_search_docs]} 
\ No newline at end of file
+    return {"docresults": [formatted_search_docs]} 
+
+
+async def asearch_wikipedia_with_query(query: str, max_results: int = 3):
+
+    """ Async version of search_wikipedia_with_query, the wikipedia client is sync only """
+
+    return await run_blocking(search_wikipedia_with_query, query, max_results)
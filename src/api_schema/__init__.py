@@ -1,6 +1,7 @@
 from api_schema.models import AllModelEnum
 from api_schema.schema import (
     AgentInfo,
+    BatchInput,
     ChatHistory,
     ChatHistoryInput,
     ChatMessage,
@@ -15,6 +16,7 @@ from api_schema.schema import (
 
 __all__ = [
     "AgentInfo",
+    "BatchInput",
     "AllModelEnum",
     "UserInput",
     "ChatMessage",
@@ -10,9 +10,11 @@ from api_schema.models import AllModelEnum, AnthropicModelName, OpenAIModelName
 
 
 class AgentStatus(str, Enum):
+    QUEUED = "queued"
     RUNNING = "running"
     COMPLETED = "completed"
     ERROR = "error"
+    CANCELLED = "cancelled"
 
 class AgentState:
     def __init__(self):
@@ -21,6 +23,9 @@ class AgentState:
         self.last_update = datetime.utcnow()
         self.current_state = {}
         self.thread_id = ""
+        self.agent_id = ""
+        self.status_updates = []
+        self.cursor = 0
 
 class AgentInfo(BaseModel):
     """Info about an available agent."""
@@ -68,15 +73,37 @@ class UserInput(BaseModel):
     )
     model: SerializeAsAny[AllModelEnum] | None = Field(
         title="Model",
-        description="LLM Model to use for the agent.",
+        description="LLM Model to use for the agent. When not given, each agent uses its own default model.",
         default=OpenAIModelName.GPT_4O_MINI,
         examples=[OpenAIModelName.GPT_4O_MINI, AnthropicModelName.HAIKU_35],
     )
+    node_models: dict[str, SerializeAsAny[AllModelEnum]] | None = Field(
+        description=(
+            "Models to use for specific steps of the agent, by node name. Other steps use `model`. "
+            "Useful to run high-volume extraction steps on a small, fast model."
+        ),
+        default=None,
+        examples=[{"process_results": OpenAIModelName.GPT_4O_MINI, "generate_recommendations": OpenAIModelName.GPT_4O}],
+    )
     thread_id: str | None = Field(
         description="Thread ID to persist and continue a multi-turn conversation.",
         default=None,
         examples=["847c6285-8fc9-4560-a83f-4e6285809254"],
     )
+    include: list[str] | None = Field(
+        description="Only return these top-level state keys. Defaults to all of them.",
+        default=None,
+        examples=[["colleges", "recommendations"]],
+    )
+    exclude: list[str] | None = Field(
+        description="Never return these top-level state keys, e.g. large raw search results.",
+        default=None,
+        examples=[["messages", "search_results"]],
+    )
+    use_cache: bool = Field(
+        description="Reuse cached LLM responses to identical prompts. Set to false to always call the model.",
+        default=True,
+    )
 
     @model_validator(mode='after')
     def check_message_or_state(self) -> 'UserInput':
@@ -92,6 +119,31 @@ class StreamInput(UserInput):
         description="Whether to stream LLM tokens to the client.",
         default=True,
     )
+    stream_mode: Literal["updates", "messages", "values"] | None = Field(
+        description=(
+            "What each streamed event contains: `updates` the state keys changed by each step, "
+            "`messages` LLM tokens, `values` the full state after each step. Defaults to "
+            "`updates` for state-based agents and to `messages` for chat-based agents when "
+            "stream_tokens is set."
+        ),
+        default=None,
+        examples=["updates"],
+    )
+
+
+class BatchInput(BaseModel):
+    """A list of inputs to run through the same agent."""
+
+    inputs: list[UserInput] = Field(
+        description="Inputs to run, each one as it would be sent to /invoke.",
+        min_length=1,
+    )
+    max_concurrency: int = Field(
+        description="Maximum number of inputs running at the same time.",
+        default=4,
+        ge=1,
+        le=32,
+    )
 
 
 class ToolCall(TypedDict):
@@ -0,0 +1,102 @@
+"""
+A long-lived event loop in a background thread, for sync code that needs to run
+coroutines (CrewAI tools). Unlike asyncio.run, the loop outlives each call, so the
+per-loop clients and pools (core.fetcher, the Tavily client, the browser pool) are
+reused across calls, and it works from threads that already run a loop.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import threading
+from collections.abc import Awaitable, Callable, Coroutine
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    def __init__(self, name: str = "background-loop"):
+        self._name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=self._name, daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    async def _run_in(context: contextvars.Context, coro: Coroutine[Any, Any, T]) -> T:
+        # Cancelling this task (future.cancel() from the caller) cancels the inner one
+        return await asyncio.get_running_loop().create_task(coro, context=context)
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """
+        Schedule coro on the background loop. It runs in a copy of the caller's context,
+        so the run config and the LLM cache bypass follow it.
+        """
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._run_in(contextvars.copy_context(), coro), loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Run coro on the background loop and block until it is done."""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Called from the background loop itself, await the coroutine instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timed out or interrupted: don't leave the coroutine running
+            future.cancel()
+            raise
+
+    def stop(self, cleanup: Callable[[], Awaitable[Any]] | None = None, timeout: float = 10.0) -> None:
+        """Await cleanup() on the loop (to close its clients and pools), then stop it."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None:
+            return
+        if cleanup is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(cleanup(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Error cleaning up the background loop: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
+_background_loop = BackgroundLoop()
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+    """Run coro on the shared background loop from sync code and return its result."""
+    return _background_loop.run(coro, timeout)
+
+
+def stop_background_loop(cleanup: Callable[[], Awaitable[Any]] | None = None) -> None:
+    _background_loop.stop(cleanup)
@@ -0,0 +1,27 @@
+import threading
+
+
+class RunCancelled(Exception):
+    """Raised inside a run once it has been cancelled."""
+
+
+class CancellationToken:
+    """
+    Cancellation flag shared between the service and a run executing in worker threads
+    (e.g. a CrewAI crew), which cannot be interrupted like an asyncio task. The run
+    checks it between steps and tool calls.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RunCancelled("The run was cancelled")
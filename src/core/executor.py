@@ -0,0 +1,27 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from core.settings import settings
+
+T = TypeVar("T")
+
+# Shared by every blocking call made from async code, so a burst of runs cannot
+# start an unbounded number of threads (the default executor grows with the CPUs).
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="blocking-io"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function (a sync-only client, a loader) without blocking the event
+    loop. The context is copied, so the run config and the LLM cache bypass follow.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor, functools.partial(context.run, func, *args, **kwargs)
+    )
@@ -0,0 +1,182 @@
+"""
+Shared HTTP fetcher for the pages, sitemaps and APIs the agents and tools read.
+
+Connections are pooled and kept alive (HTTP/2 when the h2 package is installed). At
+most FETCH_PER_HOST_CONCURRENCY requests go to a host at a time, spaced by at least
+FETCH_HOST_MIN_INTERVAL seconds, and failed requests are retried with backoff.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from functools import cache
+from importlib.util import find_spec
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Hosts whose usage policy asks for slower requests than FETCH_HOST_MIN_INTERVAL
+HOST_MIN_INTERVALS = {
+    "nominatim.openstreetmap.org": 1.0,
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Answer to a conditional GET, for the caller to handle rather than an error
+NOT_MODIFIED = 304
+_MAX_RETRY_AFTER = 30.0
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _min_interval(host: str) -> float:
+    return HOST_MIN_INTERVALS.get(host, settings.FETCH_HOST_MIN_INTERVAL)
+
+
+def _client_kwargs() -> dict[str, Any]:
+    return {
+        "headers": DEFAULT_HEADERS,
+        "timeout": httpx.Timeout(settings.FETCH_TIMEOUT, connect=min(10.0, settings.FETCH_TIMEOUT)),
+        "limits": httpx.Limits(max_connections=settings.FETCH_MAX_CONNECTIONS, max_keepalive_connections=20),
+        "follow_redirects": True,
+        "http2": find_spec("h2") is not None,
+    }
+
+
+def _checked(response: httpx.Response) -> httpx.Response:
+    if response.status_code == NOT_MODIFIED:
+        return response
+    return response.raise_for_status()
+
+
+def _backoff(attempt: int, response: httpx.Response | None) -> float:
+    """Seconds to wait before retry number `attempt` (from 0)."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), _MAX_RETRY_AFTER)
+    return 0.5 * 2**attempt + random.uniform(0, 0.5)
+
+
+@dataclass
+class _LoopState:
+    client: httpx.AsyncClient
+    host_slots: dict[str, asyncio.Semaphore] = field(default_factory=dict)
+    host_locks: dict[str, asyncio.Lock] = field(default_factory=dict)
+    host_last_start: dict[str, float] = field(default_factory=dict)
+
+
+class Fetcher:
+    """
+    `fetch` for async code, `fetch_sync` for the sync crew tools. Both return the
+    httpx.Response (a 304 too), raising httpx errors (HTTPStatusError included) once
+    retries are exhausted.
+    """
+
+    def __init__(self):
+        # httpx.AsyncClient and asyncio primitives are bound to the loop they run on
+        self._loops: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._sync_client: httpx.Client | None = None
+        self._sync_host_slots: dict[str, threading.Semaphore] = {}
+        self._sync_host_locks: dict[str, threading.Lock] = {}
+        self._sync_host_last_start: dict[str, float] = {}
+
+    def _loop_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _LoopState(client=httpx.AsyncClient(**_client_kwargs()))
+        return state
+
+    async def _wait_turn(self, state: _LoopState, host: str) -> None:
+        """Space out the requests to a host."""
+        lock = state.host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = state.host_last_start.get(host, 0.0) + _min_interval(host) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            state.host_last_start[host] = time.monotonic()
+
+    async def fetch(self, url: str, method: str = "GET", **kwargs: Any) -> httpx.Response:
+        state = self._loop_state()
+        host = _host(url)
+        slots = state.host_slots.setdefault(host, asyncio.Semaphore(settings.FETCH_PER_HOST_CONCURRENCY))
+        async with slots:
+            for attempt in range(settings.FETCH_RETRIES + 1):
+                await self._wait_turn(state, host)
+                response = None
+                try:
+                    response = await state.client.request(method, url, **kwargs)
+                    if response.status_code not in RETRY_STATUSES or attempt == settings.FETCH_RETRIES:
+                        return _checked(response)
+                except (httpx.TransportError, httpx.HTTPStatusError):
+                    if attempt == settings.FETCH_RETRIES or (
+                        response is not None and response.status_code not in RETRY_STATUSES
+                    ):
+                        raise
+                logger.warning(f"Retrying {url} (attempt {attempt + 1}), got {response.status_code if response else 'no response'}")
+                await asyncio.sleep(_backoff(attempt, response))
+        raise AssertionError("unreachable")
+
+    def _client(self) -> httpx.Client:
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(**_client_kwargs())
+            return self._sync_client
+
+    def _wait_turn_sync(self, host: str) -> None:
+        with self._lock:
+            lock = self._sync_host_locks.setdefault(host, threading.Lock())
+        with lock:
+            wait = self._sync_host_last_start.get(host, 0.0) + _min_interval(host) - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._sync_host_last_start[host] = time.monotonic()
+
+    def fetch_sync(self, url: str, method: str = "GET", **kwargs: Any) -> httpx.Response:
+        """Blocking version of fetch."""
+        client = self._client()
+        host = _host(url)
+        with self._lock:
+            slots = self._sync_host_slots.setdefault(
+                host, threading.Semaphore(settings.FETCH_PER_HOST_CONCURRENCY)
+            )
+        with slots:
+            for attempt in range(settings.FETCH_RETRIES + 1):
+                self._wait_turn_sync(host)
+                response = None
+                try:
+                    response = client.request(method, url, **kwargs)
+                    if response.status_code not in RETRY_STATUSES or attempt == settings.FETCH_RETRIES:
+                        return _checked(response)
+                except (httpx.TransportError, httpx.HTTPStatusError):
+                    if attempt == settings.FETCH_RETRIES or (
+                        response is not None and response.status_code not in RETRY_STATUSES
+                    ):
+                        raise
+                logger.warning(f"Retrying {url} (attempt {attempt + 1}), got {response.status_code if response else 'no response'}")
+                time.sleep(_backoff(attempt, response))
+        raise AssertionError("unreachable")
+
+
+@cache
+def get_fetcher() -> Fetcher:
+    return Fetcher()
@@ -1,12 +1,5 @@
 from functools import cache
-from typing import TypeAlias
-
-from langchain_anthropic import ChatAnthropic
-from langchain_aws import ChatBedrock
-from langchain_community.chat_models import FakeListChatModel
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+from typing import TYPE_CHECKING, TypeAlias
 
 from api_schema.models import (
     AllModelEnum,
@@ -17,6 +10,7 @@ from api_schema.models import (
     GroqModelName,
     OpenAIModelName,
 )
+from core.llm_cache import get_llm_cache
 
 _MODEL_TABLE = {
     OpenAIModelName.GPT_4O_MINI: "gpt-4o-mini",
@@ -32,7 +26,16 @@ _MODEL_TABLE = {
     FakeModelName.FAKE: "fake",
 }
 
-ModelT: TypeAlias = ChatOpenAI | ChatAnthropic | ChatGoogleGenerativeAI | ChatGroq | ChatBedrock
+# Provider SDKs are only imported once a model of theirs is requested, most
+# deployments use a single provider and each SDK adds to the worker start time.
+if TYPE_CHECKING:
+    from langchain_anthropic import ChatAnthropic
+    from langchain_aws import ChatBedrock
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_groq import ChatGroq
+    from langchain_openai import ChatOpenAI
+
+ModelT: TypeAlias = "ChatOpenAI | ChatAnthropic | ChatGoogleGenerativeAI | ChatGroq | ChatBedrock"
 
 
 @cache
@@ -42,18 +45,31 @@ def get_model(model_name: AllModelEnum, /) -> ModelT:
     api_model_name = _MODEL_TABLE.get(model_name)
     if not api_model_name:
         raise ValueError(f"Unsupported model: {model_name}")
+    cache = get_llm_cache()
 
     if model_name in OpenAIModelName:
-        return ChatOpenAI(model=api_model_name, temperature=0.5, streaming=True)
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model=api_model_name, temperature=0.5, streaming=True, cache=cache)
     if model_name in AnthropicModelName:
-        return ChatAnthropic(model=api_model_name, temperature=0.5, streaming=True)
+        from langchain_anthropic import ChatAnthropic
+
+        return ChatAnthropic(model=api_model_name, temperature=0.5, streaming=True, cache=cache)
     if model_name in GoogleModelName:
-        return ChatGoogleGenerativeAI(model=api_model_name, temperature=0.5, streaming=True)
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(model=api_model_name, temperature=0.5, streaming=True, cache=cache)
     if model_name in GroqModelName:
+        from langchain_groq import ChatGroq
+
         if model_name == GroqModelName.LLAMA_GUARD_3_8B:
-            return ChatGroq(model=api_model_name, temperature=0.0)
-        return ChatGroq(model=api_model_name, temperature=0.5)
+            return ChatGroq(model=api_model_name, temperature=0.0, cache=cache)
+        return ChatGroq(model=api_model_name, temperature=0.5, cache=cache)
     if model_name in AWSModelName:
-        return ChatBedrock(model_id=api_model_name, temperature=0.5)
+        from langchain_aws import ChatBedrock
+
+        return ChatBedrock(model_id=api_model_name, temperature=0.5, cache=cache)
     if model_name in FakeModelName:
-        return FakeListChatModel(responses=["This is a test response from the fake model."])
+        from langchain_community.chat_models import FakeListChatModel
+
+        return FakeListChatModel(responses=["This is a test response from the fake model."], cache=cache)
@@ -0,0 +1,197 @@
+"""
+Persistent cache of LLM responses, shared by the workers of a host.
+
+Chat models created by core.llm.get_model and agents.llmtools.get_llm look every
+non-streaming call up here first. LangChain keys a call by the serialized prompt and
+the model configuration (model name, temperature and bound tools, i.e. the output
+schema of with_structured_output), which is what we hash.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache
+from typing import Any
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Set for the duration of a run that asked not to use the cache (UserInput.use_cache)
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def llm_cache_bypass(bypass: bool = True) -> Iterator[None]:
+    """Skip the LLM cache (no lookups, no writes) for the calls made in this context."""
+    token = _bypass.set(bypass)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def set_llm_cache_bypass(bypass: bool) -> None:
+    """Same as llm_cache_bypass for the rest of the current task."""
+    _bypass.set(bypass)
+
+
+class SqliteLLMCache(BaseCache):
+    """
+    LLM cache in a SQLite database in WAL mode. Entries expire `ttl` seconds after they
+    were written, and the least recently used ones are evicted once the cached
+    responses take more than `max_bytes`.
+    """
+
+    # Writes between two checks of the total size
+    _EVICTION_CHECK_INTERVAL = 32
+
+    def __init__(self, path: str, ttl: int, max_bytes: int):
+        self._path = path
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "bypassed": 0}
+        self._writes_since_check = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used);
+            """
+        )
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - ttl,))
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, sync model calls come from executor threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode()).hexdigest()
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += amount
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        if _bypass.get():
+            self._count("bypassed")
+            return None
+        key = self._key(prompt, llm_string)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?", (key, now - self._ttl)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        try:
+            generations = loads(row[0])
+        except Exception as e:
+            # Written by an incompatible langchain version, call the model again
+            logger.warning(f"Dropping unreadable LLM cache entry: {e}")
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+        conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if _bypass.get():
+            return
+        value = dumps(list(return_val))
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+            (self._key(prompt, llm_string), value, len(value), now, now),
+        )
+        self._count("writes")
+        with self._lock:
+            self._writes_since_check += 1
+            check = self._writes_since_check >= self._EVICTION_CHECK_INTERVAL
+            if check:
+                self._writes_since_check = 0
+        if check:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the least recently used until under max_bytes."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            evicted = conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self._ttl,)
+            ).rowcount
+            (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            if total > self._max_bytes:
+                # Walk from the least recently used entry until enough has been freed,
+                # leaving some headroom so we don't evict on every check
+                excess = total - int(self._max_bytes * 0.9)
+                freed = 0
+                keys = []
+                for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used"):
+                    keys.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                conn.executemany("DELETE FROM llm_cache WHERE key = ?", keys)
+                evicted += len(keys)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self, **kwargs: Any) -> None:
+        self._connection().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters of this worker, and the size of the shared cache."""
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        stats["entries"] = entries
+        stats["size_bytes"] = size
+        return stats
+
+
+@cache
+def get_llm_cache() -> SqliteLLMCache | None:
+    """The LLM cache configured by the LLM_CACHE settings, None when disabled."""
+    if not settings.LLM_CACHE:
+        return None
+    return SqliteLLMCache(
+        settings.LLM_CACHE_PATH,
+        ttl=settings.LLM_CACHE_TTL,
+        max_bytes=settings.LLM_CACHE_MAX_BYTES,
+    )
@@ -0,0 +1,74 @@
+"""
+Encoding of agent states, stream events and API responses.
+
+States are plain dicts holding Pydantic models (College, Persona, SearchResult...)
+and LangChain messages. Those are encoded with the compiled serializer of a cached
+TypeAdapter per type, and the surrounding structure by orjson when it is installed
+(pydantic_core otherwise). msgpack is offered to clients that ask for it.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+import pydantic_core
+from pydantic import PydanticSchemaGenerationError, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with langsmith
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack ships with langgraph-checkpoint
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+@lru_cache(maxsize=512)
+def _adapter(tp: type) -> TypeAdapter | None:
+    try:
+        return TypeAdapter(tp)
+    except PydanticSchemaGenerationError:
+        return None
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Convert an object to JSON compatible Python data, falling back to str()."""
+    adapter = _adapter(type(obj))
+    if adapter is None:
+        return pydantic_core.to_jsonable_python(obj, fallback=str)
+    try:
+        return adapter.dump_python(obj, mode="json")
+    except pydantic_core.PydanticSerializationError:
+        return pydantic_core.to_jsonable_python(obj, fallback=str)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Encode an object to JSON."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=to_jsonable, option=option)
+    return pydantic_core.to_json(obj, indent=2 if indent else None, fallback=to_jsonable)
+
+
+def dumps_str(obj: Any, indent: bool = False) -> str:
+    """Encode an object to a JSON string."""
+    return dumps(obj, indent=indent).decode()
+
+
+def packb(obj: Any) -> bytes:
+    """Encode an object to msgpack."""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(obj, default=to_jsonable)
+
+
+def wants_msgpack(accept: str | None) -> bool:
+    """Whether an Accept header asks for msgpack (and we can produce it)."""
+    if msgpack is None or not accept:
+        return False
+    return any(media_type in accept for media_type in _MSGPACK_MEDIA_TYPES)
@@ -1,4 +1,5 @@
-from typing import Annotated, Any
+from pathlib import Path
+from typing import Annotated, Any, Literal
 
 from dotenv import find_dotenv
 from pydantic import BeforeValidator, HttpUrl, SecretStr, TypeAdapter, computed_field
@@ -49,6 +50,99 @@ class Settings(BaseSettings):
 
     OPENWEATHERMAP_API_KEY: SecretStr | None = None
 
+    # Agents are imported on first use. Set to import them all in the background right
+    # after startup, so the first request to each one does not pay for it.
+    PRELOAD_AGENTS: bool = False
+
+    # Threads for the blocking calls agents cannot avoid (sync-only SDKs), per worker
+    BLOCKING_EXECUTOR_WORKERS: int = 16
+
+    # Tool outputs the college agent extracts colleges from at the same time, per run
+    # (a run can override it with configurable["extraction_concurrency"])
+    COLLEGE_EXTRACTION_CONCURRENCY: int = 4
+
+    # Token budget of the page / search content put in one extraction prompt. Longer
+    # content is cut to the budget, or with LLM_CONTENT_MAP_REDUCE extracted chunk by
+    # chunk (at most LLM_CONTENT_MAX_CHUNKS) and the partial results combined.
+    LLM_CONTENT_MAX_TOKENS: int = 12000
+    LLM_CONTENT_MAP_REDUCE: bool = False
+    LLM_CONTENT_MAX_CHUNKS: int = 8
+
+    # Directory of the SQLite databases below (*_PATH), relative paths are resolved in
+    # it rather than in whatever directory the process was started from
+    DATA_DIR: str = "data"
+
+    # Local knowledge base of the colleges the college agent found (see
+    # agents/college_finder_agent/college_store.py). Stored values are used while
+    # younger than COLLEGE_STORE_MAX_AGE (shorter for tuition and admissions numbers).
+    COLLEGE_STORE: bool = True
+    COLLEGE_STORE_PATH: str = "colleges.db"
+    COLLEGE_STORE_MAX_AGE: int = 60 * 60 * 24 * 730  # seconds
+    # Stored matches needed for ask_llm_for_colleges to answer without the LLM
+    COLLEGE_STORE_MIN_MATCHES: int = 5
+
+    # Shared page fetcher (see core/fetcher.py). Per-host limits apply per worker.
+    FETCH_TIMEOUT: float = 20.0  # seconds
+    FETCH_MAX_CONNECTIONS: int = 100
+    FETCH_PER_HOST_CONCURRENCY: int = 4
+    FETCH_HOST_MIN_INTERVAL: float = 0.25  # seconds between two requests to a host
+    FETCH_RETRIES: int = 2
+
+    # Scraped pages cached on disk (see agents/tools/page_cache.py). Pages are fresh for
+    # PAGE_CACHE_TTL seconds, or the TTL of their domain, then revalidated.
+    PAGE_CACHE: bool = True
+    PAGE_CACHE_PATH: str = "page_cache.db"
+    PAGE_CACHE_TTL: int = 60 * 60 * 24  # seconds
+    PAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    PAGE_CACHE_DOMAIN_TTLS: dict[str, int] = {
+        "wikipedia.org": 60 * 60 * 24 * 7,
+        "perfectgame.org": 60 * 60 * 24 * 3,
+    }
+
+    # Warm headless browsers for browser_use (see agents/tools/browser_pool.py), per worker
+    BROWSER_POOL_SIZE: int = 2
+    BROWSER_POOL_IDLE_TIMEOUT: float = 300.0  # seconds before an unused browser is closed
+    BROWSER_POOL_MAX_USES: int = 20  # tasks before a browser is replaced
+    BROWSER_TASK_TIMEOUT: float = 600.0  # seconds
+
+    # Geocoded addresses cached on disk (see agents/tools/distancetool.py)
+    GEOCODE_CACHE_PATH: str = "geocode_cache.db"
+    GEOCODE_CACHE_TTL: int = 60 * 60 * 24 * 90  # seconds
+    GEOCODE_NOT_FOUND_TTL: int = 60 * 60 * 24  # seconds an address not found is remembered
+
+    # Tavily search responses cached on disk (see agents/tools/tavily_client.py)
+    SEARCH_CACHE: bool = True
+    SEARCH_CACHE_PATH: str = "search_cache.db"
+    SEARCH_CACHE_TTL: int = 60 * 60 * 6  # seconds
+
+    # Persistent cache of LLM responses (see core/llm_cache.py), shared by the workers
+    LLM_CACHE: bool = True
+    LLM_CACHE_PATH: str = "llm_cache.db"
+    LLM_CACHE_TTL: int = 60 * 60 * 24 * 7  # seconds
+    LLM_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Where background runs started with /start are tracked. "sqlite" is shared by all
+    # workers on one host, "redis" by all hosts, "local" only by the current process.
+    JOB_STORE: Literal["sqlite", "redis", "local"] = "sqlite"
+    JOB_STORE_PATH: str = "jobs.db"
+    JOB_STORE_TTL: int = 60 * 60 * 24  # seconds a finished run is kept around
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # /agent/{run_id}/events: events kept per run for Last-Event-ID replay, number of
+    # runs buffered per worker, seconds between keep-alives and between job store polls
+    RUN_EVENT_BUFFER_SIZE: int = 256
+    RUN_EVENT_MAX_RUNS: int = 1000
+    RUN_EVENT_HEARTBEAT: float = 15.0
+    RUN_EVENT_POLL_INTERVAL: float = 1.0
+    # Seconds between checks for a DELETE /agent/{run_id} received by another worker
+    RUN_CANCEL_POLL_INTERVAL: float = 2.0
+
+    # Runs executing at the same time on each worker, and runs allowed to wait for a
+    # slot before new ones get a 429. Per-agent limits are set in agents/agents.py.
+    AGENT_MAX_CONCURRENCY: int = 16
+    AGENT_MAX_QUEUE: int = 64
+    AGENT_QUEUE_RETRY_AFTER: int = 10  # seconds, until run durations are known
+
     LANGCHAIN_TRACING_V2: bool = False
     LANGCHAIN_PROJECT: str = "default"
     LANGCHAIN_ENDPOINT: Annotated[str, BeforeValidator(check_str_is_http)] = (
@@ -98,6 +192,13 @@ class Settings(BaseSettings):
                 case _:
                     raise ValueError(f"Unknown provider: {provider}")
 
+        data_dir = Path(self.DATA_DIR)
+        for field in type(self).model_fields:
+            path = getattr(self, field)
+            if field.endswith("_PATH") and not Path(path).is_absolute():
+                setattr(self, field, str(data_dir / path))
+                data_dir.mkdir(parents=True, exist_ok=True)
+
     @computed_field
     @property
     def BASE_URL(self) -> str:
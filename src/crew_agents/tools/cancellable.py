@@ -0,0 +1,20 @@
+from crewai.tools import BaseTool
+from pydantic import ConfigDict
+
+from core.cancellation import CancellationToken
+
+
+class CancellableTool(BaseTool):
+    """
+    Tool that refuses to run once the run it belongs to has been cancelled.
+    Subclasses call check_cancelled() at the start of _run (crewai calls _run
+    directly, not run).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cancellation: CancellationToken | None = None
+
+    def check_cancelled(self) -> None:
+        if self.cancellation is not None:
+            self.cancellation.raise_if_cancelled()
@@ -1,6 +1,5 @@
 from typing import Optional
 from langchain.schema import HumanMessage
-from langchain_groq import ChatGroq
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
@@ -10,6 +9,8 @@ class QueryInput(BaseModel):
     temperature: float = Field(default=0.2, description="Controls randomness in the output (0.0 = deterministic, 1.0 = creative)")
 
 def get_groq_llm():
+    from langchain_groq import ChatGroq
+
     return ChatGroq(model="deepseek-r1-distill-llama-70b", temperature=0.2)
 
 class DeepSeekTool(BaseTool):
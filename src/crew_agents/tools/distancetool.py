@@ -1,6 +1,10 @@
-from agents.tools.distancetool import calculate_distance
+from typing import List
+
+import numpy as np
+
+from agents.tools.distancetool import calculate_distance, distance_matrix
 from crewai.tools import BaseTool
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class AddressInput(BaseModel):
     address1: str
@@ -12,3 +16,25 @@ class DistanceCalculatorTool(BaseTool):
 
     def _run(self, address1: str, address2: str) -> str:
         return calculate_distance(address1, address2)
+
+class DistanceMatrixInput(BaseModel):
+    origins: List[str] = Field(..., description="Addresses to calculate distances from, e.g. the homes")
+    destinations: List[str] = Field(..., description="Addresses to calculate distances to, e.g. the businesses")
+
+class DistanceMatrixTool(BaseTool):
+    name: str = "Distance Matrix Tool"
+    description: str = (
+        "Calculate the distance in miles from every origin address to every destination address in one call. "
+        "Prefer it to the Distance Calculator Tool when there are several addresses."
+    )
+    args_schema: type[BaseModel] = DistanceMatrixInput
+
+    def _run(self, origins: List[str], destinations: List[str]) -> str:
+        distances = distance_matrix(origins, destinations)
+        lines = []
+        for i, origin in enumerate(origins):
+            for j, destination in enumerate(destinations):
+                distance = distances[i, j]
+                value = "unknown (address not found)" if np.isnan(distance) else f"{distance:.2f} miles"
+                lines.append(f"{origin} -> {destination}: {value}")
+        return "\n".join(lines)
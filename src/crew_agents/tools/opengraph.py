@@ -1,9 +1,10 @@
 from typing import Dict, Optional, List, Type
-import requests
 from bs4 import BeautifulSoup
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
+from core.fetcher import get_fetcher
+
 
 class OpenGraphData(BaseModel):
     """Model for Open Graph data extracted from a webpage."""
@@ -43,11 +44,9 @@ class OpenGraphTool(BaseTool):
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
                 "Accept-Language": "en-US,en;q=0.9",
                 "Referer": "https://www.google.com/",
-                "Connection": "keep-alive",
                 "Upgrade-Insecure-Requests": "1"       
             }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            response = get_fetcher().fetch_sync(url, headers=headers)
             
             # Parse the HTML content
             soup = BeautifulSoup(response.text, "html.parser")
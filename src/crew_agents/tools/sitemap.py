@@ -1,9 +1,10 @@
 from typing import Dict, List, Type
-import requests
 from bs4 import BeautifulSoup
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
+from core.fetcher import get_fetcher
+
 
 class SitemapData(BaseModel):
     """Model for sitemap data extracted from a sitemap XML."""
@@ -33,7 +34,6 @@ class SitemapTool(BaseTool):
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
                 "Accept": "text/html,application/xml,application/xhtml+xml,application/rss+xml,application/atom+xml,*/*;q=0.9",
                 "Accept-Language": "en-US,en;q=0.9",
-                "Connection": "keep-alive",
                 "Upgrade-Insecure-Requests": "1",
                 "Sec-Fetch-Dest": "document",
                 "Sec-Fetch-Mode": "navigate",
@@ -43,10 +43,8 @@ class SitemapTool(BaseTool):
                 "DNT": "1",
             }
             
-            # Use a session to handle cookies and redirects properly
-            session = requests.Session()
-            response = session.get(url, headers=headers, timeout=10, allow_redirects=True)
-            response.raise_for_status()
+            # Pooled client, follows redirects
+            response = get_fetcher().fetch_sync(url, headers=headers)
 
             #print(f"Response content: {response.content}")
             
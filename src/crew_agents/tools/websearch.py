@@ -1,31 +1,39 @@
-from agents.tools.searchweb import scrape_web, search_web_with_query, use_browser
-from crewai.tools import BaseTool
-import asyncio  
+from agents.tools.searchweb import asearch_web_with_query, scrape_web, use_browser
+from core.background_loop import run_sync
+from crew_agents.tools.cancellable import CancellableTool
 from crew_agents.vacation_house_agent.schemas import HomeMatches
 
-class WebSearchTool(BaseTool):
+# Crew tools are sync: their coroutines run on the shared background loop, where the
+# search client, fetcher and browser pool stay warm between calls
+
+class WebSearchTool(CancellableTool):
     name: str ="Web Search Tools"
     description: str = ("Search the web for websites that match the user's query.")
 
     def _run(self, query: str) -> str:
-        return search_web_with_query(query,10)
+        self.check_cancelled()
+        return run_sync(asearch_web_with_query(query,10))
     
-class ScrapeWebTool(BaseTool):
+class ScrapeWebTool(CancellableTool):
     name: str ="Scrape Web Tool"
     description: str = ("Scrape a web page and return the text so you can extract information from it.")
     def _run(self, url: str) -> str:
-        result = asyncio.run(scrape_web(url))
+        self.check_cancelled()
+        result = run_sync(scrape_web(url))
         return result
     
 
-class HomeFinderTool(BaseTool):
+class HomeFinderTool(CancellableTool):
     name: str ="Home Finder Tool"
     description: str = ("Use a browser to search realtor.com for home listings that match the user's query.")
+    # Config of the run, for the model driving the browser
+    config: dict | None = None
     def _run(self, goal: str ) -> str:
-        result = asyncio.run(
+        self.check_cancelled()
+        result = run_sync(
             use_browser(
                 f"""Go to realtor.com and search for homes that match the user's query: <query>{goal}</query>.  
                 Use filters to narrow down the results.  
                 Return 3 results per city that most closely match the user's query, given multiple options find ones closest to the price mentioned in the query.
-                Return the link to the home not the link to the search page.""",HomeMatches,25))
+                Return the link to the home not the link to the search page.""",HomeMatches,25,self.config))
         return result
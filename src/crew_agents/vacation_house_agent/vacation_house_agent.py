@@ -14,8 +14,9 @@ from datetime import datetime
 
 
 from agents.llmtools import get_groq_llm, get_llm
+from core.cancellation import CancellationToken, RunCancelled
 from core.crew_agent import CrewAgent
-from crew_agents.tools.distancetool import DistanceCalculatorTool
+from crew_agents.tools.distancetool import DistanceCalculatorTool, DistanceMatrixTool
 from crew_agents.tools.websearch import ScrapeWebTool, WebSearchTool, HomeFinderTool
 from crew_agents.vacation_house_agent.schemas import CityInfo, ResultSummary, VacationHomes, CandidateCities, HomeMatches
 from crew_agents.tools.deepseek import DeepSeekTool
@@ -32,15 +33,36 @@ class VacationHouseAgent(CrewAgent):
         self.scrape_web_tool = ScrapeWebTool()
         self.home_finder_tool = HomeFinderTool()
         self.distance_tool = DistanceCalculatorTool()
+        self.distance_matrix_tool = DistanceMatrixTool()
         self.deepseek_tool = DeepSeekTool()
         self.status_callback = None
+        self.cancellation = None
+        self.config = None
 
     def set_status_callback(self, callback):
         """Set the callback function for status updates."""
         self.status_callback = callback
 
+    def set_config(self, config: Dict[str, Any]):
+        """Use the models requested for the run (configurable "model" and "node_models")."""
+        self.config = config
+        self.llm = get_llm(config)
+        self.home_finder_tool.config = config
+
+    def set_cancellation(self, cancellation: CancellationToken):
+        """Set the token checked by the web tools and after every agent step."""
+        self.cancellation = cancellation
+        for tool in (self.web_search_tool, self.scrape_web_tool, self.home_finder_tool):
+            tool.cancellation = cancellation
+
+    def check_cancelled(self, *args: Any) -> None:
+        """Step callback that stops the crew once the run has been cancelled."""
+        if self.cancellation is not None:
+            self.cancellation.raise_if_cancelled()
+
     def append_event_callback(self, event: Any) -> None:
         """Callback for task events that updates status via the status callback if set."""
+        self.check_cancelled()
         if self.status_callback:
             # Create a status update with timestamp and event info
             update = {
@@ -50,6 +72,12 @@ class VacationHouseAgent(CrewAgent):
             }
             self.status_callback(update)
 
+    def _llm(self, node: str):
+        """Model for one of the crew agents, which can be overridden like a graph node."""
+        if self.config is None:
+            return self.llm
+        return get_llm(self.config, node)
+
     def create_agents(self) -> List[Agent]:
         """Create and return the list of agents needed for the vacation house search."""
         return [
@@ -90,7 +118,7 @@ class VacationHouseAgent(CrewAgent):
                 """,
             backstory="""As a City Researcher, you are responsible for aggregating all the researched information
                 into a list.""",
-            llm=self.llm,
+            llm=self._llm("city_researcher"),
             tools=[self.deepseek_tool, self.web_search_tool, self.scrape_web_tool],
             verbose=True,
             allow_delegation=False
@@ -105,7 +133,7 @@ class VacationHouseAgent(CrewAgent):
                 """,
             backstory="""As a Real Estate Agent, you are responsible for finding the best vacation homes for the user.
                 You will use the web tools to find the best homes for the user.""",
-            llm=self.llm,
+            llm=self._llm("real_estate_agent"),
             tools=[self.web_search_tool, self.scrape_web_tool],
             verbose=True,
             allow_delegation=False
@@ -120,7 +148,7 @@ class VacationHouseAgent(CrewAgent):
                Also try to summarize how walkable the area is.
                 """,
             backstory="""You are local expert trying to advice a potential buyer as to how the neighborhood is.""",
-            llm=self.llm,
+            llm=self._llm("local_expert"),
             tools=[self.web_search_tool, self.scrape_web_tool],
             verbose=True,
             allow_delegation=False
@@ -201,6 +229,7 @@ class VacationHouseAgent(CrewAgent):
                 Find the best local businesses for the user based on the location of the homes they are interested in.
                 For each home find the best bars and restaurants and coffee shops in the shortest distance to the homes address.
                 Collect the full postal address of the business for distance calculations.
+                Once you have the businesses, get the distances from all the homes to all the businesses with a single Distance Matrix Tool call.
                 """,
             expected_output="""
                 Updated JSON array of ccities with the business information added to each home.  The business information should include:
@@ -213,7 +242,7 @@ class VacationHouseAgent(CrewAgent):
             context=[listings_task],
             agent=agent,
             callback=self.append_event_callback,
-            tools=[self.web_search_tool, self.scrape_web_tool, self.distance_tool]
+            tools=[self.web_search_tool, self.scrape_web_tool, self.distance_tool, self.distance_matrix_tool]
         )
     
     def summarize_task(self, agent: Agent, query: str, tasks: List[Task]) -> Task:
@@ -264,7 +293,8 @@ class VacationHouseAgent(CrewAgent):
             agents=agents,
             tasks=tasks,
             verbose=True,
-            process=Process.sequential
+            process=Process.sequential,
+            step_callback=self.check_cancelled
         )
         
         try:
@@ -285,6 +315,8 @@ class VacationHouseAgent(CrewAgent):
                 })
             
             return results
+        except RunCancelled:
+            raise
         except Exception as e:
             error_msg = f"Error running crew: {str(e)}"
             if self.status_callback:
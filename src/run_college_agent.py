@@ -1,9 +1,10 @@
 import asyncio
 from uuid import uuid4
-import json
 from dotenv import load_dotenv
 from langchain_core.runnables import RunnableConfig
 
+from core.serialization import dumps_str
+
 from agents.college_finder_agent.college_agent_schema import CollegeFinderInput, CollegeFinderState
 from agents.marketing_agent.marketing_schema import MarketingInput, MarketingPlanState
 
@@ -30,20 +31,11 @@ async def main() -> None:
     )
     # Convert the AddableValuesDict to a regular dict and then to JSON
 
-    def serialize_obj(obj):
-        if hasattr(obj, 'model_dump'):  # Handle Pydantic models
-            return obj.model_dump()
-        elif isinstance(obj, (list, tuple)):  # Handle lists/tuples
-            return [serialize_obj(item) for item in obj]
-        elif isinstance(obj, dict):  # Handle dictionaries
-            return {k: serialize_obj(v) for k, v in obj.items()}
-        return str(obj)  # Fallback to string representation
-
     # Remove messages from the result before serializing
     if "messages" in result:
         del result["messages"]
 
-    json_result = json.dumps(dict(result), default=serialize_obj,indent=2)
+    json_result = dumps_str(dict(result), indent=True)
     print("RESULT in JSON:")
     print(json_result)
 
@@ -0,0 +1,36 @@
+"""
+Import a college dataset into the college agent's knowledge base (COLLEGE_STORE_PATH).
+
+    python run_college_import.py colleges.csv [more.parquet ...]
+
+Columns are College fields: name (required), location, description, acceptance_rate,
+tuition, enrollment, dorm_percentage, sat_scores, programs (a JSON list, or names
+separated by ; or |) and url. Other columns are ignored.
+"""
+
+import argparse
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.college_finder_agent.college_store import CollegeStore  # noqa: E402
+from core.settings import settings  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="CSV or Parquet files")
+    parser.add_argument("--source", help="recorded as the source of the imported values (default: the file name)")
+    args = parser.parse_args()
+
+    store = CollegeStore(settings.COLLEGE_STORE_PATH, max_age=settings.COLLEGE_STORE_MAX_AGE)
+    for path in args.files:
+        start = time.perf_counter()
+        count = store.import_file(path, args.source)
+        print(f"{path}: imported {count} colleges in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
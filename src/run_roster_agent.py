@@ -1,10 +1,11 @@
 import asyncio
 import os
 from uuid import uuid4
-import json
 from dotenv import find_dotenv, load_dotenv
 from langchain_core.runnables import RunnableConfig
 
+from core.serialization import dumps_str
+
 from agents.college_finder_agent.team_roster_agent import create_team_roster_graph, RosterAgentInput
 
 
@@ -31,17 +32,8 @@ async def main() -> None:
         config=RunnableConfig(configurable={"thread_id": uuid4()}),
     )
 
-    def serialize_obj(obj):
-        if hasattr(obj, 'model_dump'):  # Handle Pydantic models
-            return obj.model_dump()
-        elif isinstance(obj, (list, tuple)):  # Handle lists/tuples
-            return [serialize_obj(item) for item in obj]
-        elif isinstance(obj, dict):  # Handle dictionaries
-            return {k: serialize_obj(v) for k, v in obj.items()}
-        return str(obj)  # Fallback to string representation
-
     # Convert result to JSON
-    json_result = json.dumps(dict(result), default=serialize_obj, indent=2)
+    json_result = dumps_str(dict(result), indent=True)
     print("\nRESULT in JSON:")
     print(json_result)
 
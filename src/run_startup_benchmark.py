@@ -0,0 +1,77 @@
+"""
+Measure the worker cold start: importing the service app, then loading each agent for
+the first time. Every measurement runs in a fresh interpreter, as a new uvicorn worker
+(or a reload) would.
+
+    python run_startup_benchmark.py [--repeat 5]
+
+Add `-X importtime` to a single `python -c "import service"` to see which modules
+dominate.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents import all_agents  # noqa: E402
+
+SRC_DIR = Path(__file__).parent
+
+IMPORT_APP = "import service"
+LOAD_AGENT = "from agents import all_agents; all_agents[{agent_id!r}].graph"
+
+TIMED = """
+import time
+{setup}
+setup_done = time.perf_counter()
+{code}
+print(time.perf_counter() - setup_done)
+"""
+
+
+def time_in_fresh_interpreter(code: str, setup: str = "") -> float:
+    """Seconds taken by `code` in a new interpreter, after running `setup`."""
+    output = subprocess.run(
+        [sys.executable, "-c", TIMED.format(setup=setup, code=code)],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def report(label: str, timings: list[float]) -> None:
+    print(
+        f"{label:<40} median {statistics.median(timings) * 1000:8.0f} ms"
+        f"   min {min(timings) * 1000:8.0f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    args = parser.parse_args()
+
+    report("import service (app ready)", [time_in_fresh_interpreter(IMPORT_APP) for _ in range(args.repeat)])
+    for agent_id in all_agents:
+        # Loaded after the app, as on the first request to that agent
+        try:
+            timings = [
+                time_in_fresh_interpreter(LOAD_AGENT.format(agent_id=agent_id), setup=IMPORT_APP)
+                for _ in range(args.repeat)
+            ]
+        except subprocess.CalledProcessError as e:
+            print(f"first use of {agent_id:<27} failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        report(f"first use of {agent_id}", timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+
+from core import settings
+
+
+class QueueFullError(Exception):
+    """Raised when a run cannot even be queued. Maps to 429 with Retry-After."""
+
+    def __init__(self, agent_id: str, retry_after: int):
+        super().__init__(f"Too many runs of {agent_id} waiting, retry in {retry_after}s")
+        self.agent_id = agent_id
+        self.retry_after = retry_after
+
+
+class _AgentLimit:
+    def __init__(self, max_concurrency: int | None, max_queue: int | None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiting = 0
+        # Moving average of the run duration, to estimate Retry-After
+        self.avg_duration: float | None = None
+
+    def has_capacity(self) -> bool:
+        return self.max_concurrency is None or self.running < self.max_concurrency
+
+    def record_duration(self, seconds: float) -> None:
+        if self.avg_duration is None:
+            self.avg_duration = seconds
+        else:
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * seconds
+
+
+class Ticket:
+    """
+    A place in the run queue. Use it as an async context manager around the run: entering
+    waits for a slot, exiting gives the slot back.
+    """
+
+    def __init__(self, controller: "AdmissionController", agent_id: str):
+        self._controller = controller
+        self.agent_id = agent_id
+        self.granted = False
+        self.granted_at: float | None = None
+        self.released = False
+
+    @property
+    def position(self) -> int:
+        """1-based position in the queue, 0 once the run holds a slot."""
+        return self._controller.position(self)
+
+    async def positions(self) -> AsyncGenerator[int, None]:
+        """Yield the queue position every time it changes, until the run gets a slot."""
+        reported = None
+        try:
+            while not self.granted:
+                moved = self._controller.moved
+                if self.position != reported:
+                    reported = self.position
+                    yield reported
+                    continue
+                await moved.wait()
+        except BaseException:
+            # Cancelled (or the consumer gave up) while waiting: leave the queue
+            self.release()
+            raise
+
+    async def acquire(self) -> None:
+        """Wait for a slot."""
+        async for _ in self.positions():
+            pass
+
+    def release(self) -> None:
+        self._controller.release(self)
+
+    async def __aenter__(self) -> "Ticket":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """
+    Caps the number of runs executing at the same time on this worker, globally and per
+    agent, and queues the rest in FIFO order. A run of an agent at its own cap does not
+    hold back queued runs of other agents. When the queue is full, new runs are refused
+    with an estimate of when to retry.
+    """
+
+    def __init__(
+        self,
+        agent_limits: dict[str, tuple[int | None, int | None]],
+        max_concurrency: int = settings.AGENT_MAX_CONCURRENCY,
+        max_queue: int = settings.AGENT_MAX_QUEUE,
+        retry_after: int = settings.AGENT_QUEUE_RETRY_AFTER,
+    ):
+        self._limits = {
+            agent_id: _AgentLimit(concurrency, queue)
+            for agent_id, (concurrency, queue) in agent_limits.items()
+        }
+        self._global = _AgentLimit(max_concurrency, max_queue)
+        self._default_retry_after = retry_after
+        self._waiting: deque[Ticket] = deque()
+        # Set and replaced every time the queue moves, waiters re-check their ticket
+        self.moved = asyncio.Event()
+
+    def _limit(self, agent_id: str) -> _AgentLimit:
+        if agent_id not in self._limits:
+            self._limits[agent_id] = _AgentLimit(None, None)
+        return self._limits[agent_id]
+
+    def enqueue(self, agent_id: str) -> Ticket:
+        """Take a place in the queue, or raise QueueFullError if there is none left."""
+        limit = self._limit(agent_id)
+        must_wait = not (limit.has_capacity() and self._global.has_capacity())
+        for bound in (limit, self._global):
+            if must_wait and bound.max_queue is not None and bound.waiting >= bound.max_queue:
+                raise QueueFullError(agent_id, self._retry_after(limit))
+        ticket = Ticket(self, agent_id)
+        self._waiting.append(ticket)
+        limit.waiting += 1
+        self._global.waiting += 1
+        self._dispatch()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        if ticket.granted or ticket.released:
+            return 0
+        return self._waiting.index(ticket) + 1
+
+    def release(self, ticket: Ticket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        limit = self._limit(ticket.agent_id)
+        if ticket.granted:
+            limit.running -= 1
+            self._global.running -= 1
+            duration = time.monotonic() - ticket.granted_at
+            limit.record_duration(duration)
+        else:
+            self._waiting.remove(ticket)
+            limit.waiting -= 1
+            self._global.waiting -= 1
+        self._dispatch()
+
+    def stats(self) -> dict[str, dict[str, int | None]]:
+        """Running and waiting runs, globally and per agent."""
+        return {
+            agent_id: {
+                "running": limit.running,
+                "waiting": limit.waiting,
+                "max_concurrency": limit.max_concurrency,
+                "max_queue": limit.max_queue,
+            }
+            for agent_id, limit in [("*", self._global), *self._limits.items()]
+        }
+
+    def _dispatch(self) -> None:
+        for ticket in list(self._waiting):
+            if not self._global.has_capacity():
+                break
+            limit = self._limit(ticket.agent_id)
+            if not limit.has_capacity():
+                continue
+            self._waiting.remove(ticket)
+            limit.waiting -= 1
+            self._global.waiting -= 1
+            limit.running += 1
+            self._global.running += 1
+            ticket.granted = True
+            ticket.granted_at = time.monotonic()
+        self.moved.set()
+        self.moved = asyncio.Event()
+
+    def _retry_after(self, limit: _AgentLimit) -> int:
+        """Rough time until the queue of an agent has room again."""
+        if limit.avg_duration is None:
+            return self._default_retry_after
+        concurrency = limit.max_concurrency or self._global.max_concurrency
+        return max(1, math.ceil(limit.avg_duration * (limit.waiting + 1) / concurrency))
@@ -0,0 +1,170 @@
+import asyncio
+import json
+from collections import OrderedDict, deque
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+
+from api_schema import AgentStatus
+from core import settings
+from core.serialization import dumps_str
+from service.job_store import JobStore
+
+FINISHED_STATUSES = {AgentStatus.COMPLETED.value, AgentStatus.ERROR.value, AgentStatus.CANCELLED.value}
+
+
+@dataclass
+class RunEvent:
+    seq: int
+    event: str
+    data: str  # JSON
+
+    def is_final(self) -> bool:
+        return self.event == "status" and json.loads(self.data)["status"] in FINISHED_STATUSES
+
+
+@dataclass
+class _Channel:
+    events: deque[RunEvent]
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    finished: bool = False
+
+
+def format_sse(data: str, event: str | None = None, seq: int | None = None) -> str:
+    """Format one Server-Sent Events frame."""
+    frame = ""
+    if seq is not None:
+        frame += f"id: {seq}\n"
+    if event is not None:
+        frame += f"event: {event}\n"
+    return frame + f"data: {data}\n\n"
+
+
+class RunEventBus:
+    """
+    Fan-out of the job store writes made by this worker to /agent/{run_id}/events
+    subscribers. The last `buffer_size` events of each run are kept in a ring buffer
+    so a client that reconnects with Last-Event-ID can be replayed what it missed.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = settings.RUN_EVENT_BUFFER_SIZE,
+        max_runs: int = settings.RUN_EVENT_MAX_RUNS,
+    ):
+        self._buffer_size = buffer_size
+        self._max_runs = max_runs
+        self._channels: OrderedDict[str, _Channel] = OrderedDict()
+
+    def open(self, run_id: str) -> _Channel:
+        """Start buffering events of a run that executes on this worker."""
+        channel = self._channels.get(run_id)
+        if channel is None:
+            channel = _Channel(events=deque(maxlen=self._buffer_size))
+            self._channels[run_id] = channel
+            self._evict()
+        return channel
+
+    def publish(self, run_id: str, seq: int, event: str, data: str) -> None:
+        channel = self.open(run_id)
+        run_event = RunEvent(seq=seq, event=event, data=data)
+        channel.events.append(run_event)
+        channel.finished = channel.finished or run_event.is_final()
+        # Wake up everyone waiting on this run, later waiters get a fresh event
+        channel.changed.set()
+        channel.changed = asyncio.Event()
+
+    def _evict(self) -> None:
+        while len(self._channels) > self._max_runs:
+            # Prefer dropping the oldest finished run; drop the oldest one otherwise
+            victim = next((k for k, c in self._channels.items() if c.finished), None)
+            self._channels.pop(victim or next(iter(self._channels)))
+
+    def is_local(self, run_id: str) -> bool:
+        """Whether the run publishes its events on this worker."""
+        return run_id in self._channels
+
+    def covers(self, run_id: str, cursor: int) -> bool:
+        """Whether every event after `cursor` is still in the ring buffer."""
+        channel = self._channels.get(run_id)
+        if channel is None:
+            return False
+        return not channel.events or channel.events[0].seq <= cursor + 1
+
+    async def subscribe(
+        self, run_id: str, cursor: int, heartbeat: float
+    ) -> AsyncGenerator[RunEvent | None, None]:
+        """
+        Yield the events after `cursor`, then new ones as they are published, until the
+        run finishes. Yields None when nothing happened for `heartbeat` seconds. Returns
+        early if the subscriber fell behind the ring buffer.
+        """
+        while True:
+            channel = self._channels.get(run_id)
+            if channel is None or not self.covers(run_id, cursor):
+                return
+            changed = channel.changed
+            for run_event in list(channel.events):
+                if run_event.seq <= cursor:
+                    continue
+                cursor = run_event.seq
+                yield run_event
+                if run_event.is_final():
+                    return
+            if channel.finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+async def run_event_stream(
+    run_id: str,
+    cursor: int,
+    job_store: JobStore,
+    bus: RunEventBus,
+    heartbeat: float = settings.RUN_EVENT_HEARTBEAT,
+    poll_interval: float = settings.RUN_EVENT_POLL_INTERVAL,
+) -> AsyncGenerator[str, None]:
+    """
+    SSE frames for /agent/{run_id}/events.
+
+    Runs executing on this worker are followed through the event bus. When the client
+    is too far behind for the ring buffer, or the run executes on another worker, the
+    missing part is read from the job store instead.
+    """
+    idle = 0.0
+    while True:
+        if bus.covers(run_id, cursor):
+            async for run_event in bus.subscribe(run_id, cursor, heartbeat):
+                if run_event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                cursor = run_event.seq
+                yield format_sse(run_event.data, run_event.event, run_event.seq)
+                if run_event.is_final():
+                    return
+
+        agent_state = await job_store.get_run(run_id, since=cursor)
+        if agent_state is None:
+            yield format_sse(json.dumps({"detail": "Agent not found"}), "error")
+            return
+        if agent_state.cursor > cursor:
+            # Catch up in one go. Only the last frame carries the id, so a client that
+            # drops in the middle of it replays the whole catch-up.
+            frames = [(dumps_str(u), "update") for u in agent_state.status_updates]
+            if agent_state.current_state != {}:
+                frames.append((dumps_str(agent_state.current_state), "state"))
+            frames.append((json.dumps({"status": agent_state.status.value}), "status"))
+            for i, (data, event) in enumerate(frames):
+                yield format_sse(data, event, agent_state.cursor if i == len(frames) - 1 else None)
+            cursor = agent_state.cursor
+            idle = 0.0
+        if agent_state.status.value in FINISHED_STATUSES:
+            return
+        if not bus.is_local(run_id):
+            if idle >= heartbeat:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
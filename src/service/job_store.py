@@ -0,0 +1,708 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from api_schema import AgentState, AgentStatus
+from core import settings
+from core.serialization import dumps_str
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # only JOB_STORE=redis needs the redis package
+    class WatchError(Exception):
+        """Raised by a LocalRedis transaction when a watched key changed, as with redis."""
+
+logger = logging.getLogger(__name__)
+
+# Expired runs are purged when a SqliteJobStore is opened, then at most this often
+# (seconds) as new runs are created
+PURGE_INTERVAL = 10 * 60
+
+# Key used to store a current_state that is not a dict (e.g. the raw result of a crew run)
+SCALAR_STATE_KEY = "__value__"
+
+
+def _utcnow() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _split_state(current_state: Any) -> dict[str, str]:
+    """Serialize a state into one JSON payload per top-level key."""
+    if isinstance(current_state, dict):
+        return {str(key): dumps_str(value) for key, value in current_state.items()}
+    return {SCALAR_STATE_KEY: dumps_str(current_state)}
+
+
+def _join_state(payloads: dict[str, str]) -> Any:
+    if SCALAR_STATE_KEY in payloads:
+        return json.loads(payloads[SCALAR_STATE_KEY])
+    return {key: json.loads(payload) for key, payload in payloads.items()}
+
+
+def _join_state_json(payloads: dict[str, str]) -> str:
+    """Same as _join_state but straight to JSON, without decoding the payloads again."""
+    if SCALAR_STATE_KEY in payloads:
+        return payloads[SCALAR_STATE_KEY]
+    return "{" + ", ".join(f"{json.dumps(key)}: {payload}" for key, payload in payloads.items()) + "}"
+
+
+def _is_selected(key: str, include: list[str] | None, exclude: list[str] | None) -> bool:
+    if key == SCALAR_STATE_KEY:
+        return True
+    return (include is None or key in include) and not (exclude and key in exclude)
+
+
+# Called after every write with (run_id, seq, event, data as JSON). event is one of
+# "update" (a status update), "state" (the changed top-level state keys) or "status".
+JobListener = Callable[[str, int, str, str], None]
+
+
+class JobStore(ABC):
+    """
+    Storage for background runs started with /start.
+
+    Every uvicorn worker opens its own handle on the same backing store, so a run
+    started on one worker can be polled from any other one.
+
+    Each run has a sequence number that is bumped by every status update and every
+    state change. Status updates and top-level state keys remember the sequence number
+    they were written at, so readers can ask for everything that changed after a cursor.
+    """
+
+    def __init__(self):
+        # Digests of the last state written per run, so unchanged keys are not rewritten.
+        # Only the worker executing a run writes its state, so this can stay in memory.
+        self._state_digests: dict[str, dict[str, str]] = {}
+        self._listeners: list[JobListener] = []
+
+    def add_listener(self, listener: JobListener) -> None:
+        """Get notified of every write made through this handle (i.e. by this worker)."""
+        self._listeners.append(listener)
+
+    def _notify(self, run_id: str, seq: int, event: str, data: str) -> None:
+        for listener in self._listeners:
+            try:
+                listener(run_id, seq, event, data)
+            except Exception as e:
+                logger.error(f"Job store listener failed: {e}")
+
+    def _diff_state(self, run_id: str, current_state: Any) -> tuple[dict[str, str], list[str]]:
+        """Return the changed payloads and the removed keys since the last write."""
+        payloads = _split_state(current_state)
+        digests = {key: hashlib.sha1(p.encode()).hexdigest() for key, p in payloads.items()}
+        previous = self._state_digests.get(run_id, {})
+        self._state_digests[run_id] = digests
+        changed = {key: payloads[key] for key, digest in digests.items() if previous.get(key) != digest}
+        removed = [key for key in previous if key not in digests]
+        return changed, removed
+
+    def _forget(self, run_id: str, status: AgentStatus) -> None:
+        if status not in (AgentStatus.QUEUED, AgentStatus.RUNNING):
+            self._state_digests.pop(run_id, None)
+
+    @abstractmethod
+    async def create_run(self, run_id: str, agent_state: AgentState) -> None:
+        """Record a new run."""
+
+    @abstractmethod
+    async def set_status(self, run_id: str, status: AgentStatus) -> int:
+        """Update the status of a run. Returns the new sequence number."""
+
+    @abstractmethod
+    async def set_current_state(self, run_id: str, current_state: Any) -> int | None:
+        """
+        Replace the latest state (or final result) of a run, only rewriting the
+        top-level keys that changed. Returns the new sequence number, or None if
+        nothing changed.
+        """
+
+    @abstractmethod
+    async def append_status_update(self, run_id: str, update: Any) -> int:
+        """Append an entry to the status updates of a run. Returns its sequence number."""
+
+    @abstractmethod
+    async def exists(self, run_id: str) -> bool:
+        """Whether the run is known."""
+
+    @abstractmethod
+    async def request_cancel(self, run_id: str) -> AgentStatus | None:
+        """
+        Flag a run for cancellation, for whichever worker executes it to pick up.
+        Returns the status of the run, or None if it is unknown.
+        """
+
+    @abstractmethod
+    async def is_cancel_requested(self, run_id: str) -> bool:
+        """Whether the run was flagged with request_cancel."""
+
+    @abstractmethod
+    async def get_run(
+        self,
+        run_id: str,
+        since: int | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+    ) -> AgentState | None:
+        """
+        Return the run, or None if it is unknown or has expired.
+
+        With `since`, only the status updates and top-level state keys written after
+        that sequence number are returned. `cursor` on the result is the sequence
+        number to pass as `since` on the next call. `include` and `exclude` select
+        the top-level state keys to read, the others are never loaded.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class SqliteJobStore(JobStore):
+    """Job store backed by a SQLite database in WAL mode, shared by all local workers."""
+
+    def __init__(self, path: str, ttl: int = settings.JOB_STORE_TTL):
+        super().__init__()
+        self._path = path
+        self._ttl = ttl
+        self._last_purge = time.monotonic()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                agent_id TEXT NOT NULL,
+                thread_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                last_update TEXT NOT NULL,
+                seq INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS status_updates (
+                run_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (run_id, seq)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS run_state (
+                run_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (run_id, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS run_cancels (
+                run_id TEXT PRIMARY KEY
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS runs_last_update ON runs (last_update);
+            """
+        )
+        self._purge_expired(ttl)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread: WAL lets readers proceed while another
+        # worker or thread holds the write lock.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self, run_id: str, fn) -> int:
+        """Run `fn(conn, seq)` in a write transaction after taking the next sequence number."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE runs SET seq = seq + 1, last_update = ? WHERE run_id = ?",
+                (_utcnow(), run_id),
+            )
+            row = conn.execute("SELECT seq FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            seq = row[0] if row else 0
+            if row:
+                fn(conn, seq)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return seq
+
+    def _purge_expired(self, ttl: int) -> None:
+        cutoff = (datetime.utcnow() - timedelta(seconds=ttl)).isoformat()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = "(SELECT run_id FROM runs WHERE last_update < ?)"
+            conn.execute(f"DELETE FROM status_updates WHERE run_id IN {expired}", (cutoff,))
+            conn.execute(f"DELETE FROM run_state WHERE run_id IN {expired}", (cutoff,))
+            conn.execute(f"DELETE FROM run_cancels WHERE run_id IN {expired}", (cutoff,))
+            conn.execute("DELETE FROM runs WHERE last_update < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _create_run(self, run_id: str, agent_state: AgentState) -> None:
+        # A worker lives for days, purging only when it starts would keep every run
+        if time.monotonic() - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = time.monotonic()
+            self._purge_expired(self._ttl)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, 0)",
+            (
+                run_id,
+                agent_state.agent_id,
+                agent_state.thread_id,
+                agent_state.status.value,
+                agent_state.start_time.isoformat(),
+                agent_state.last_update.isoformat(),
+            ),
+        )
+        conn.execute("COMMIT")
+
+    async def create_run(self, run_id: str, agent_state: AgentState) -> None:
+        await asyncio.to_thread(self._create_run, run_id, agent_state)
+        await self.set_current_state(run_id, agent_state.current_state)
+
+    async def set_status(self, run_id: str, status: AgentStatus) -> int:
+        self._forget(run_id, status)
+        seq = await asyncio.to_thread(
+            self._write,
+            run_id,
+            lambda conn, seq: conn.execute(
+                "UPDATE runs SET status = ? WHERE run_id = ?", (status.value, run_id)
+            ),
+        )
+        self._notify(run_id, seq, "status", json.dumps({"status": status.value}))
+        return seq
+
+    async def set_current_state(self, run_id: str, current_state: Any) -> int | None:
+        changed, removed = self._diff_state(run_id, current_state)
+        if not changed and not removed:
+            return None
+
+        def write(conn: sqlite3.Connection, seq: int) -> None:
+            conn.executemany(
+                "INSERT OR REPLACE INTO run_state VALUES (?, ?, ?, ?)",
+                [(run_id, key, seq, payload) for key, payload in changed.items()],
+            )
+            conn.executemany(
+                "DELETE FROM run_state WHERE run_id = ? AND key = ?",
+                [(run_id, key) for key in removed],
+            )
+
+        seq = await asyncio.to_thread(self._write, run_id, write)
+        self._notify(run_id, seq, "state", _join_state_json(changed))
+        return seq
+
+    async def append_status_update(self, run_id: str, update: Any) -> int:
+        payload = dumps_str(update)
+        seq = await asyncio.to_thread(
+            self._write,
+            run_id,
+            lambda conn, seq: conn.execute(
+                "INSERT INTO status_updates VALUES (?, ?, ?)", (run_id, seq, payload)
+            ),
+        )
+        self._notify(run_id, seq, "update", payload)
+        return seq
+
+    def _exists(self, run_id: str) -> bool:
+        row = self._connection().execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,))
+        return row.fetchone() is not None
+
+    async def exists(self, run_id: str) -> bool:
+        return await asyncio.to_thread(self._exists, run_id)
+
+    def _request_cancel(self, run_id: str) -> AgentStatus | None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT status FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row:
+                conn.execute("INSERT OR IGNORE INTO run_cancels VALUES (?)", (run_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return AgentStatus(row[0]) if row else None
+
+    async def request_cancel(self, run_id: str) -> AgentStatus | None:
+        return await asyncio.to_thread(self._request_cancel, run_id)
+
+    def _is_cancel_requested(self, run_id: str) -> bool:
+        row = self._connection().execute("SELECT 1 FROM run_cancels WHERE run_id = ?", (run_id,))
+        return row.fetchone() is not None
+
+    async def is_cancel_requested(self, run_id: str) -> bool:
+        return await asyncio.to_thread(self._is_cancel_requested, run_id)
+
+    def _get_run(
+        self, run_id: str, since: int | None, include: list[str] | None, exclude: list[str] | None
+    ) -> AgentState | None:
+        conn = self._connection()
+        after = since or 0
+        key_filter, key_params = "", []
+        if include is not None:
+            key_filter += f" AND key IN ({', '.join('?' * len(include + [SCALAR_STATE_KEY]))})"
+            key_params += include + [SCALAR_STATE_KEY]
+        if exclude:
+            key_filter += f" AND key NOT IN ({', '.join('?' * len(exclude))})"
+            key_params += exclude
+        # A read transaction gives a consistent snapshot of the run across the three tables
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(
+                "SELECT agent_id, thread_id, status, start_time, last_update, seq "
+                "FROM runs WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            state_rows = conn.execute(
+                "SELECT key, payload FROM run_state WHERE run_id = ? AND seq > ?" + key_filter,
+                (run_id, after, *key_params),
+            ).fetchall()
+            updates = conn.execute(
+                "SELECT payload FROM status_updates WHERE run_id = ? AND seq > ? ORDER BY seq",
+                (run_id, after),
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+
+        agent_state = AgentState()
+        agent_state.agent_id, agent_state.thread_id = row[0], row[1]
+        agent_state.status = AgentStatus(row[2])
+        agent_state.start_time = datetime.fromisoformat(row[3])
+        agent_state.last_update = datetime.fromisoformat(row[4])
+        agent_state.cursor = row[5]
+        agent_state.current_state = _join_state(dict(state_rows))
+        agent_state.status_updates = [json.loads(payload) for (payload,) in updates]
+        return agent_state
+
+    async def get_run(
+        self,
+        run_id: str,
+        since: int | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+    ) -> AgentState | None:
+        return await asyncio.to_thread(self._get_run, run_id, since, include, exclude)
+
+    async def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+class LocalRedis:
+    """
+    Minimal in-process stand-in for the subset of the redis.asyncio client used by
+    RedisJobStore. Only visible to the current process, meant for development and tests.
+    """
+
+    def __init__(self):
+        self._hashes: dict[str, dict[str, str]] = defaultdict(dict)
+        self._sorted_sets: dict[str, dict[str, float]] = defaultdict(dict)
+        # Bumped by every write to a key, for WATCH
+        self._versions: dict[str, int] = defaultdict(int)
+
+    def pipeline(self, transaction: bool = True) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+    async def hset(self, name: str, mapping: dict[str, str]) -> int:
+        self._versions[name] += 1
+        self._hashes[name].update(mapping)
+        return len(mapping)
+
+    async def hget(self, name: str, key: str) -> str | None:
+        return self._hashes.get(name, {}).get(key)
+
+    async def hgetall(self, name: str) -> dict[str, str]:
+        return dict(self._hashes.get(name, {}))
+
+    async def hmget(self, name: str, keys: list[str]) -> list[str | None]:
+        values = self._hashes.get(name, {})
+        return [values.get(key) for key in keys]
+
+    async def hdel(self, name: str, *keys: str) -> int:
+        self._versions[name] += 1
+        values = self._hashes.get(name, {})
+        return sum(values.pop(key, None) is not None for key in keys)
+
+    async def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        self._versions[name] += 1
+        value = int(self._hashes[name].get(key, 0)) + amount
+        self._hashes[name][key] = str(value)
+        return value
+
+    async def zadd(self, name: str, mapping: dict[str, float]) -> int:
+        self._versions[name] += 1
+        self._sorted_sets[name].update(mapping)
+        return len(mapping)
+
+    async def zrangebyscore(self, name: str, min: str, max: str) -> list[str]:
+        # Only the "(<score>" .. "+inf" form used by RedisJobStore is supported
+        lower = float(min.lstrip("("))
+        members = sorted(self._sorted_sets.get(name, {}).items(), key=lambda item: item[1])
+        return [member for member, score in members if score > lower]
+
+    async def exists(self, *names: str) -> int:
+        return sum(name in self._hashes or name in self._sorted_sets for name in names)
+
+    async def expire(self, name: str, seconds: int) -> bool:
+        # Keys live as long as the process, which is all a local stand-in needs.
+        return name in self._hashes or name in self._sorted_sets
+
+    async def aclose(self) -> None:
+        pass
+
+
+class LocalPipeline:
+    """
+    Transactions of LocalRedis, with the semantics of a redis.asyncio pipeline: after
+    watch() commands run right away, after multi() (or without watch) they are queued
+    and execute() runs them all at once, or raises WatchError if a watched key changed.
+    """
+
+    def __init__(self, client: LocalRedis):
+        self._client = client
+        self._watched: dict[str, int] = {}
+        self._commands: list[tuple[Callable, tuple, dict]] = []
+        self._immediate = False
+
+    async def __aenter__(self) -> "LocalPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.reset()
+
+    async def reset(self) -> None:
+        self._watched, self._commands, self._immediate = {}, [], False
+
+    async def watch(self, *names: str) -> None:
+        self._watched.update({name: self._client._versions[name] for name in names})
+        self._immediate = True
+
+    def multi(self) -> None:
+        self._immediate = False
+
+    def __getattr__(self, name: str) -> Any:
+        command = getattr(self._client, name)
+        if self._immediate:
+            return command
+
+        def queue(*args, **kwargs) -> "LocalPipeline":
+            self._commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list[Any]:
+        watched, commands = self._watched, self._commands
+        await self.reset()
+        if any(self._client._versions[name] != version for name, version in watched.items()):
+            raise WatchError("Watched variable changed.")
+        # LocalRedis commands never suspend, nothing runs in between
+        return [await command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+# Fields a run hash has once create_run wrote it, set_status and friends on an unknown
+# or expired run leave a partial hash behind
+_RUN_FIELDS = ("agent_id", "thread_id", "status", "start_time", "last_update", "seq")
+
+
+class RedisJobStore(JobStore):
+    """
+    Job store on top of a redis.asyncio compatible client (created with
+    decode_responses=True). Each run is a hash, its state a hash of top-level keys
+    plus a hash of the sequence numbers they were written at, and its status
+    updates a sorted set scored by sequence number.
+    """
+
+    def __init__(self, client: Any, ttl: int = settings.JOB_STORE_TTL, prefix: str = "agent-run"):
+        super().__init__()
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def _keys(self, run_id: str) -> tuple[str, str, str, str]:
+        base = f"{self._prefix}:{run_id}"
+        return base, f"{base}:state", f"{base}:state-seq", f"{base}:updates"
+
+    async def _write(self, run_id: str, write: Callable[[Any, int], None]) -> int:
+        """
+        Bump the sequence number of a run and queue write(pipeline, seq) in the same
+        MULTI/EXEC, so a reader never sees a cursor ahead of what was written at it.
+        """
+        run_key = self._keys(run_id)[0]
+        async with self._client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(run_key)
+                    seq = int(await pipe.hget(run_key, "seq") or 0) + 1
+                    pipe.multi()
+                    pipe.hset(run_key, mapping={"seq": str(seq), "last_update": _utcnow()})
+                    write(pipe, seq)
+                    for key in self._keys(run_id):
+                        pipe.expire(key, self._ttl)
+                    await pipe.execute()
+                    return seq
+                except WatchError:
+                    # Another write to the run got in between, take the next seq
+                    continue
+
+    async def _expire(self, run_id: str) -> None:
+        for key in self._keys(run_id):
+            await self._client.expire(key, self._ttl)
+
+    async def create_run(self, run_id: str, agent_state: AgentState) -> None:
+        await self._client.hset(
+            self._keys(run_id)[0],
+            mapping={
+                "agent_id": agent_state.agent_id,
+                "thread_id": agent_state.thread_id,
+                "status": agent_state.status.value,
+                "start_time": agent_state.start_time.isoformat(),
+                "last_update": agent_state.last_update.isoformat(),
+                "seq": "0",
+            },
+        )
+        # Set even when no state is written, that write would have set it
+        await self._expire(run_id)
+        await self.set_current_state(run_id, agent_state.current_state)
+
+    async def set_status(self, run_id: str, status: AgentStatus) -> int:
+        self._forget(run_id, status)
+        run_key = self._keys(run_id)[0]
+        seq = await self._write(run_id, lambda pipe, seq: pipe.hset(run_key, mapping={"status": status.value}))
+        self._notify(run_id, seq, "status", json.dumps({"status": status.value}))
+        return seq
+
+    async def set_current_state(self, run_id: str, current_state: Any) -> int | None:
+        _, state_key, state_seq_key, _ = self._keys(run_id)
+        changed, removed = self._diff_state(run_id, current_state)
+        if not changed and not removed:
+            return None
+
+        def write(pipe: Any, seq: int) -> None:
+            if changed:
+                pipe.hset(state_key, mapping=changed)
+                pipe.hset(state_seq_key, mapping={key: str(seq) for key in changed})
+            if removed:
+                pipe.hdel(state_key, *removed)
+                pipe.hdel(state_seq_key, *removed)
+
+        seq = await self._write(run_id, write)
+        self._notify(run_id, seq, "state", _join_state_json(changed))
+        return seq
+
+    async def append_status_update(self, run_id: str, update: Any) -> int:
+        payload = dumps_str(update)
+        updates_key = self._keys(run_id)[3]
+        # Members of a sorted set must be unique, so the payload is prefixed by its seq
+        seq = await self._write(
+            run_id, lambda pipe, seq: pipe.zadd(updates_key, mapping={f"{seq}|{payload}": seq})
+        )
+        self._notify(run_id, seq, "update", payload)
+        return seq
+
+    async def exists(self, run_id: str) -> bool:
+        [agent_id] = await self._client.hmget(self._keys(run_id)[0], ["agent_id"])
+        return agent_id is not None
+
+    async def request_cancel(self, run_id: str) -> AgentStatus | None:
+        run_key = self._keys(run_id)[0]
+        agent_id, status = await self._client.hmget(run_key, ["agent_id", "status"])
+        if agent_id is None:
+            return None
+        await self._client.hset(run_key, mapping={"cancel_requested": "1"})
+        return AgentStatus(status)
+
+    async def is_cancel_requested(self, run_id: str) -> bool:
+        [flag] = await self._client.hmget(self._keys(run_id)[0], ["cancel_requested"])
+        return flag is not None
+
+    async def get_run(
+        self,
+        run_id: str,
+        since: int | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+    ) -> AgentState | None:
+        run_key, state_key, state_seq_key, updates_key = self._keys(run_id)
+        after = since or 0
+        # Every write bumps the run hash in the same transaction, watching it makes
+        # the reads below one consistent snapshot, whose seq is the cursor
+        async with self._client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(run_key)
+                    key_seqs = await pipe.hgetall(state_seq_key)
+                    keys = [
+                        key
+                        for key, seq in key_seqs.items()
+                        if int(seq) > after and _is_selected(key, include, exclude)
+                    ]
+                    pipe.multi()
+                    pipe.hgetall(run_key)
+                    pipe.zrangebyscore(updates_key, f"({after}", "+inf")
+                    if keys:
+                        pipe.hmget(state_key, keys)
+                    fields, updates, *payloads = await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+        if any(field not in fields for field in _RUN_FIELDS):
+            return None
+        payloads = payloads[0] if payloads else []
+
+        agent_state = AgentState()
+        agent_state.agent_id = fields["agent_id"]
+        agent_state.thread_id = fields["thread_id"]
+        agent_state.status = AgentStatus(fields["status"])
+        agent_state.start_time = datetime.fromisoformat(fields["start_time"])
+        agent_state.last_update = datetime.fromisoformat(fields["last_update"])
+        agent_state.cursor = int(fields["seq"])
+        agent_state.current_state = _join_state(
+            {key: payload for key, payload in zip(keys, payloads) if payload is not None}
+        )
+        agent_state.status_updates = [json.loads(member.split("|", 1)[1]) for member in updates]
+        return agent_state
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_job_store() -> JobStore:
+    """Create the job store configured by the JOB_STORE setting."""
+    match settings.JOB_STORE:
+        case "sqlite":
+            return SqliteJobStore(settings.JOB_STORE_PATH)
+        case "redis":
+            try:
+                from redis.asyncio import Redis
+            except ImportError as e:
+                raise ImportError("JOB_STORE=redis requires the `redis` package") from e
+            return RedisJobStore(Redis.from_url(settings.REDIS_URL, decode_responses=True))
+        case "local":
+            return RedisJobStore(LocalRedis())
+        case _:
+            raise ValueError(f"Unknown job store: {settings.JOB_STORE}")
@@ -5,20 +5,17 @@ import traceback
 import warnings
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from typing import Annotated, Any, Dict
 from uuid import UUID, uuid4
 from enum import Enum
 from datetime import datetime
 from fastapi import BackgroundTasks
-from threading import Lock
-from copy import deepcopy
-import time
 import asyncio
-from asyncio import Lock as AsyncLock
 from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
 from langchain_core._api import LangChainBetaWarning
@@ -28,8 +25,28 @@ from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph.state import CompiledStateGraph
 from langsmith import Client as LangsmithClient
 
-from agents import DEFAULT_AGENT, get_agent, get_all_agent_info, all_agents
+from agents import (
+    DEFAULT_AGENT,
+    all_agents,
+    get_agent,
+    get_agent_limits,
+    get_all_agent_info,
+    load_all_agents,
+    set_checkpointer,
+)
+from agents.tools.browser_pool import close_browser_pool
 from core import settings
+from core.background_loop import stop_background_loop
+from core.cancellation import CancellationToken, RunCancelled
+from core.llm_cache import get_llm_cache, set_llm_cache_bypass
+from core.serialization import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    dumps,
+    dumps_str,
+    packb,
+    wants_msgpack,
+)
 from api_schema import (
     ChatHistory,
     ChatHistoryInput,
@@ -41,10 +58,15 @@ from api_schema import (
     UserInput,
     AgentStatus,
     AgentState,
+    BatchInput,
 )
+from service.admission import AdmissionController, QueueFullError, Ticket
+from service.events import FINISHED_STATUSES, RunEventBus, run_event_stream
+from service.job_store import JobStore, create_job_store
 from service.utils import (
     convert_message_content_to_string,
     langchain_to_chat_message,
+    project_state,
     remove_tool_calls,
 )
 
@@ -65,16 +87,57 @@ def verify_bearer(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
 
 
+# Background runs started with /start, shared by all workers (see service/job_store.py)
+job_store: JobStore | None = None
+# Live events of the runs executing on this worker, for /agent/{run_id}/events
+run_events = RunEventBus()
+# Concurrency caps and run queue of this worker
+admission = AdmissionController(get_agent_limits())
+
+
+@dataclass
+class _ActiveRun:
+    task: asyncio.Task
+    cancellation: CancellationToken
+    ticket: Ticket
+    # Crew runs execute in a thread, cancelling their task would not stop them
+    interruptible: bool
+
+
+# Background runs executing (or queued) on this worker, for DELETE /agent/{run_id}
+active_runs: dict[str, _ActiveRun] = {}
+
+
+def _cancel_local_run(run_id: str) -> bool:
+    """Cancel a run of this worker. Returns False if it does not run here."""
+    active_run = active_runs.get(run_id)
+    if active_run is None:
+        return False
+    active_run.cancellation.cancel()
+    if active_run.interruptible or not active_run.ticket.granted:
+        active_run.task.cancel()
+    return True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    global job_store
     # Construct agent with Sqlite checkpointer
     # TODO: It's probably dangerous to share the same checkpointer on multiple agents
     async with AsyncSqliteSaver.from_conn_string("checkpoints.db") as saver:
-        agents = get_all_agent_info()
-        for a in agents:
-            agent = get_agent(a.key)
-            agent.checkpointer = saver
-        yield
+        # Agents get it when they are first used
+        set_checkpointer(saver)
+        if settings.PRELOAD_AGENTS:
+            asyncio.get_running_loop().run_in_executor(None, load_all_agents)
+        job_store = create_job_store()
+        job_store.add_listener(run_events.publish)
+        try:
+            yield
+        finally:
+            await close_browser_pool()
+            # Crew tools' loop, with its own browser pool
+            await asyncio.to_thread(stop_background_loop, close_browser_pool)
+            await job_store.close()
     # context manager will clean up the AsyncSqliteSaver on exit
 
 
@@ -105,20 +168,84 @@ async def info() -> ServiceMetadata:
 
 
 def _parse_input(user_input: UserInput) -> tuple[dict[str, Any], UUID]:
+    # Applies to the LLM calls made by the current task and the ones it starts
+    set_llm_cache_bypass(not user_input.use_cache)
     run_id = uuid4()
     thread_id = user_input.thread_id or str(uuid4())
     kwargs = {
         "input": user_input.state if hasattr(user_input, 'state') else {"messages": [HumanMessage(content=user_input.message)]},
         "config": RunnableConfig(
-            configurable={"thread_id": thread_id, "model": user_input.model,"max_concurrency": 10}, run_id=run_id
+            configurable={
+                "thread_id": thread_id,
+                # Only a model the client asked for: the agents' own default (and its
+                # temperature) applies otherwise
+                "model": user_input.model if "model" in user_input.model_fields_set else None,
+                "node_models": user_input.node_models,
+                "max_concurrency": 10,
+            },
+            run_id=run_id,
         ),
     }
     return kwargs, run_id
 
 
+def _crew_input(user_input: UserInput, kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Input data for CrewAgent.run from the UserInput."""
+    if hasattr(user_input, 'state') and user_input.state:
+        return user_input.state
+    elif hasattr(user_input, 'message') and user_input.message:
+        return {"messages": user_input.message}
+    return kwargs.get("input", {})
+
+
+def _format_output(response: Any, user_input: UserInput, run_id: UUID) -> Any:
+    """Final output of a run: the last message for chat agents, the state otherwise."""
+    response = project_state(response, user_input.include, user_input.exclude)
+
+    # If response contains messages, format as ChatMessage
+    if isinstance(response, dict) and "messages" in response:
+        output = langchain_to_chat_message(response["messages"][-1])
+        output.run_id = str(run_id)
+        return output
+
+    # Otherwise return the raw state
+    return response
+
+
+def _resolve_agent(agent_id: str) -> Any:
+    """The agent, or 404 for an unknown agent_id."""
+    try:
+        return get_agent(agent_id)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Agent {agent_id} not found")
+
+
+def _admit(agent_id: str) -> Ticket:
+    """Take a place in the run queue of an agent, answer 429 when the queue is full."""
+    try:
+        return admission.enqueue(agent_id)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _encode_response(content: Any, accept: str | None) -> Response:
+    """Encode a response as msgpack if the client asks for it, as JSON otherwise."""
+    if wants_msgpack(accept):
+        return Response(packb(content), media_type=MSGPACK_MEDIA_TYPE)
+    return Response(dumps(content), media_type=JSON_MEDIA_TYPE)
+
+
 @router.post("/{agent_id}/invoke")
 @router.post("/invoke")
-async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> Any:
+async def invoke(
+    user_input: UserInput,
+    agent_id: str = DEFAULT_AGENT,
+    accept: Annotated[str | None, Header()] = None,
+) -> Any:
     """
     Invoke an agent with user input to retrieve a final response.
 
@@ -128,58 +255,72 @@ async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> Any:
     
     For state-based agents like marketing_agent, pass the initial state in the state field.
     For chat-based agents, pass the message in the message field.
+    Use include/exclude to select the state keys returned.
+    Send `Accept: application/msgpack` to get the response as msgpack.
+    Answers 429 with Retry-After when too many runs of the agent are already waiting.
     """
-    agent: CompiledStateGraph = get_agent(agent_id)
+    agent: CompiledStateGraph = _resolve_agent(agent_id)
     kwargs, run_id = _parse_input(user_input)
+    ticket = _admit(agent_id)
     try:
-        response = await agent.ainvoke(**kwargs)
-        
-        # If response contains messages, format as ChatMessage
-        if isinstance(response, dict) and "messages" in response:
-            output = langchain_to_chat_message(response["messages"][-1])
-            output.run_id = str(run_id)
-            return output
-            
-        # Otherwise return the raw state
-        return response
+        async with ticket:
+            response = await agent.ainvoke(**kwargs)
+        return _encode_response(_format_output(response, user_input, run_id), accept)
     except Exception as e:
         logger.error(f"An exception occurred: {e}")
         raise HTTPException(status_code=500, detail="Unexpected error")
 
 
+def _stream_mode(user_input: StreamInput) -> str:
+    if user_input.stream_mode:
+        return user_input.stream_mode
+    if user_input.state is None and user_input.stream_tokens:
+        return "messages"
+    return "updates"
+
+
 async def message_generator(
-    user_input: StreamInput, agent_id: str = DEFAULT_AGENT
+    user_input: StreamInput, agent_id: str = DEFAULT_AGENT, ticket: Ticket | None = None
 ) -> AsyncGenerator[str, None]:
     """
     Generate a stream of messages from the agent.
 
     This is the workhorse method for the /stream endpoint.
-    For state-based agents, it will stream state updates and final state.
-    For chat-based agents, it streams messages and tokens.
+    In `updates` mode (the default for state-based agents) each event holds only the
+    state keys written by one step, in `values` mode the full state after each step.
+    In `messages` mode LLM tokens are streamed as they are generated.
+    State events only carry the keys selected by include/exclude.
+    While the run waits for a slot, `queued` events report its queue position.
     """
-    agent: CompiledStateGraph = get_agent(agent_id)
-    kwargs, run_id = _parse_input(user_input)
-
-    #print("KWARGS", kwargs)
-
-    def serialize_obj(obj):
-        if hasattr(obj, 'model_dump'):  # Handle Pydantic models
-            return obj.model_dump()
-        elif isinstance(obj, (list, tuple)):  # Handle lists/tuples
-            return [serialize_obj(item) for item in obj]
-        elif isinstance(obj, dict):  # Handle dictionaries
-            return {k: serialize_obj(v) for k, v in obj.items()}
-        return str(obj)  # Fallback to string representation
+    stream_mode = _stream_mode(user_input)
+    events = None
 
     try:
-        async for event in agent.astream(**kwargs, stream_mode="values"):
-            print("EVENT", event)
-
-            # Stream the event data
-            if isinstance(event, dict):
+        # Inside the try so the ticket is given back when they fail
+        agent: CompiledStateGraph = get_agent(agent_id)
+        kwargs, run_id = _parse_input(user_input)
+        ticket = ticket or admission.enqueue(agent_id)
+        async for position in ticket.positions():
+            yield f"data: {dumps_str({'type': 'queued', 'position': position})}\n\n"
+
+        events = agent.astream(**kwargs, stream_mode=stream_mode)
+        async for event in events:
+            if stream_mode == "messages":
+                # (message chunk, metadata) for every token generated by an LLM
+                message, _ = event
+                content = convert_message_content_to_string(remove_tool_calls(message.content))
+                if content:
+                    yield f"data: {dumps_str({'type': 'token', 'content': content})}\n\n"
+            elif stream_mode == "updates":
+                # {node: the state keys it wrote}, nothing for nodes that wrote nothing
+                for update in event.values():
+                    update = project_state(update, user_input.include, user_input.exclude)
+                    if isinstance(update, dict) and update:
+                        yield f"data: {dumps_str(update)}\n\n"
+            elif isinstance(event, dict):
                 # Convert to JSON and yield as SSE data
-                #print("EVENT IS DICT", event)
-                yield f"data: {json.dumps(event, default=serialize_obj)}\n\n"
+                event = project_state(event, user_input.include, user_input.exclude)
+                yield f"data: {dumps_str(event)}\n\n"
             else:
                 # Convert non-dict events to string representation
                 yield f"data: {str(event)}\n\n"
@@ -192,6 +333,13 @@ async def message_generator(
         error_msg = {"type": "error", "content": "An error occurred while processing your request"}
         yield f"data: {json.dumps(error_msg)}\n\n"
         yield "data: [DONE]\n\n"
+    finally:
+        # When the client disconnects we are closed at a yield, with the graph still
+        # suspended in astream: close it now rather than whenever it is collected.
+        if events is not None:
+            await events.aclose()
+        if ticket is not None:
+            ticket.release()
 
 
 def _sse_response_example() -> dict[int, Any]:
@@ -221,10 +369,79 @@ async def stream(user_input: StreamInput, agent_id: str = DEFAULT_AGENT) -> Stre
     is also attached to all messages for recording feedback.
 
     Set `stream_tokens=false` to return intermediate messages but not token-by-token.
+    Set `stream_mode` to choose between per-step state deltas (`updates`), LLM tokens
+    (`messages`) and full state snapshots (`values`).
+    Answers 429 with Retry-After when too many runs of the agent are already waiting.
     """
     logger.info(f"Streaming response for user input: {user_input}")
+    # An unknown agent is a 404 rather than an error event, and takes no slot
+    _resolve_agent(agent_id)
+    ticket = _admit(agent_id)
+    return StreamingResponse(
+        message_generator(user_input, agent_id, ticket),
+        media_type="text/event-stream",
+    )
+
+
+async def batch_generator(batch: BatchInput, agent_id: str) -> AsyncGenerator[str, None]:
+    """
+    Run every input of a batch, at most batch.max_concurrency at a time, and yield
+    each result as soon as it is ready. A failing input is reported as an error
+    for that index only.
+    """
+    semaphore = asyncio.Semaphore(batch.max_concurrency)
+    is_crew = all_agents[agent_id].type == "CREW"
+
+    async def run_one(index: int, user_input: UserInput) -> dict[str, Any]:
+        kwargs, run_id = _parse_input(user_input)
+        async with semaphore:
+            try:
+                agent = get_agent(agent_id)
+                # Batch items share the agent limits with every other run
+                async with admission.enqueue(agent_id):
+                    if is_crew:
+                        # Models requested for the run, as in /start
+                        if hasattr(agent, 'set_config'):
+                            agent.set_config(kwargs["config"])
+                        response = await asyncio.to_thread(agent.run, _crew_input(user_input, kwargs))
+                    else:
+                        response = await agent.ainvoke(**kwargs)
+                return {
+                    "index": index,
+                    "run_id": str(run_id),
+                    "status": AgentStatus.COMPLETED,
+                    "result": _format_output(response, user_input, run_id),
+                }
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {e}", exc_info=True)
+                return {"index": index, "run_id": str(run_id), "status": AgentStatus.ERROR, "error": str(e)}
+
+    tasks = [asyncio.create_task(run_one(i, user_input)) for i, user_input in enumerate(batch.inputs)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield f"data: {dumps_str(await next_result)}\n\n"
+        yield "data: [DONE]\n\n"
+    finally:
+        # The client went away: don't keep running the rest of the batch
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/{agent_id}/batch", response_class=StreamingResponse)
+@router.post("/batch", response_class=StreamingResponse)
+async def batch(batch_input: BatchInput, agent_id: str = DEFAULT_AGENT) -> StreamingResponse:
+    """
+    Run an agent over a list of inputs with bounded concurrency.
+
+    Results are streamed as Server-Sent Events in completion order, each one with the
+    `index` of its input, a `status` and either the `result` (as /invoke would return
+    it) or the `error`. Items run within the agent concurrency limits, an item that
+    finds the agent queue full fails. The stream ends with `[DONE]`.
+    """
+    # An unknown agent is a 404, not an error in the middle of the stream
+    _resolve_agent(agent_id)
     return StreamingResponse(
-        message_generator(user_input, agent_id),
+        batch_generator(batch_input, agent_id),
         media_type="text/event-stream",
     )
 
@@ -273,50 +490,108 @@ def history(input: ChatHistoryInput) -> ChatHistory:
         raise HTTPException(status_code=500, detail="Unexpected error")
 
 
+@router.get("/queue")
+async def queue_status() -> dict:
+    """Runs executing and waiting on this worker, in total ("*") and per agent."""
+    return admission.stats()
+
+
+@router.get("/llm-cache")
+async def llm_cache_stats() -> dict:
+    """Hits and misses of the LLM response cache on this worker, and its total size."""
+    llm_cache = get_llm_cache()
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **await asyncio.to_thread(llm_cache.stats)}
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "ok"}
 
 
-# Add these after existing imports
-running_agents: Dict[str, AgentState] = {}
-agents_lock = AsyncLock()
-
-# Add these new endpoints
 @router.post("/{agent_id}/start")
 async def start_agent(
     background_tasks: BackgroundTasks,
     user_input: UserInput,
     agent_id: str = DEFAULT_AGENT
 ) -> dict:
-    """Start an agent running in the background"""
-    agent = get_agent(agent_id)
+    """
+    Start an agent running in the background.
+
+    When the agent is at its concurrency limit the run is queued: its status is
+    `queued` and status updates report its queue position until it starts. Answers
+    429 with Retry-After when the queue is full. Stop the run with DELETE /agent/{run_id}.
+    """
+    agent = _resolve_agent(agent_id)
+    agent_type = all_agents[agent_id].type
     kwargs, run_id = _parse_input(user_input)
+    ticket = _admit(agent_id)
     thread_id = kwargs["config"]["configurable"]["thread_id"]
+    run_key = str(run_id)
 
     # Create new agent state tracker
     agent_state = AgentState()
     agent_state.thread_id = thread_id
-    agent_state.status_updates = []
-    
-    async with agents_lock:
-        running_agents[str(run_id)] = agent_state
-    
+    agent_state.agent_id = agent_id
+    if not ticket.granted:
+        agent_state.status = AgentStatus.QUEUED
+    queue_position = ticket.position
+    run_events.open(run_key)
+    try:
+        await job_store.create_run(run_key, agent_state)
+    except BaseException:
+        # The run never started, don't keep its slot
+        ticket.release()
+        raise
+
+    cancellation = CancellationToken()
+    if hasattr(agent, 'set_cancellation'):
+        agent.set_cancellation(cancellation)
+
+    async def watch_cancel_requests() -> None:
+        """Pick up a cancellation requested through another worker."""
+        while not await job_store.is_cancel_requested(run_key):
+            await asyncio.sleep(settings.RUN_CANCEL_POLL_INTERVAL)
+        _cancel_local_run(run_key)
+
+    async def run_admitted(runner) -> None:
+        """Wait for a slot, then run the agent and give the slot back."""
+        active_runs[run_key] = _ActiveRun(
+            task=asyncio.current_task(),
+            cancellation=cancellation,
+            ticket=ticket,
+            interruptible=agent_type == "LANGGRAPH",
+        )
+        watcher = asyncio.create_task(watch_cancel_requests())
+        try:
+            if not ticket.granted:
+                async for position in ticket.positions():
+                    await job_store.append_status_update(
+                        run_key, {"status": AgentStatus.QUEUED.value, "queue_position": position}
+                    )
+                await job_store.set_status(run_key, AgentStatus.RUNNING)
+            await runner()
+        except (asyncio.CancelledError, RunCancelled):
+            logger.info(f"Run {run_key} cancelled")
+            await job_store.set_status(run_key, AgentStatus.CANCELLED)
+        finally:
+            watcher.cancel()
+            active_runs.pop(run_key, None)
+            ticket.release()
+
     async def run_langgraph_agent():
         try:
             async for event in agent.astream(**kwargs, stream_mode="values"):
-                # Create a new state update
-                async with agents_lock:
-                    agent_state.current_state = event
-                    agent_state.last_update = datetime.utcnow()
-            
-            async with agents_lock:
-                agent_state.status = AgentStatus.COMPLETED
+                # Keys excluded at start are never stored, so never encoded either
+                event = project_state(event, user_input.include, user_input.exclude)
+                await job_store.set_current_state(run_key, event)
+
+            await job_store.set_status(run_key, AgentStatus.COMPLETED)
         except Exception as e:
             logger.error(f"Agent error: {e}\nTraceback: {traceback.format_exc()}")
-            async with agents_lock:
-                agent_state.status = AgentStatus.ERROR
+            await job_store.set_status(run_key, AgentStatus.ERROR)
 
     async def run_crew_agent():
         try:
@@ -333,13 +608,9 @@ async def start_agent(
                         try:
                             # Use asyncio.wait_for instead of timeout
                             update = await asyncio.wait_for(status_queue.get(), timeout=0.1)
-                            async with agents_lock:
-                                if not hasattr(agent_state, 'status_updates'):
-                                    agent_state.status_updates = []
-                                agent_state.status_updates.append(update)
-                                agent_state.last_update = datetime.utcnow()
-                                if 'output' in update:
-                                    agent_state.current_state = update['output']
+                            await job_store.append_status_update(run_key, update)
+                            if 'output' in update:
+                                await job_store.set_current_state(run_key, update['output'])
                             status_queue.task_done()
                         except asyncio.TimeoutError:
                             continue
@@ -366,27 +637,19 @@ async def start_agent(
             processor_task = asyncio.create_task(process_status_updates())
             
             # Get input data from the UserInput
-            input_data = {}
-            if hasattr(user_input, 'state') and user_input.state:
-                input_data = user_input.state
-            elif hasattr(user_input, 'message') and user_input.message:
-                input_data = {"messages": user_input.message}
-            else:
-                input_data = kwargs.get("input", {})
+            input_data = _crew_input(user_input, kwargs)
 
             # Set up the status callback on the agent if it supports it
             if hasattr(agent, 'set_status_callback'):
                 agent.set_status_callback(status_callback)
+            # Models requested for the run
+            if hasattr(agent, 'set_config'):
+                agent.set_config(kwargs["config"])
 
             try:
                 # Run the agent with proper thread pool executor
                 with ThreadPoolExecutor() as pool:
                     result = await loop.run_in_executor(pool, agent.run, input_data)
-                
-                async with agents_lock:
-                    # Store the raw result as the current state
-                    agent_state.current_state = result
-                    agent_state.status = AgentStatus.COMPLETED
             finally:
                 # Cancel and wait for the processor task
                 should_stop = True
@@ -396,65 +659,112 @@ async def start_agent(
                 except asyncio.CancelledError:
                     pass
 
+            # Store the raw result as the current state
+            await job_store.set_current_state(run_key, result)
+            await job_store.set_status(run_key, AgentStatus.COMPLETED)
+
+        except RunCancelled:
+            raise
         except Exception as e:
             logger.error(f"Agent error: {e}\nTraceback: {traceback.format_exc()}")
-            async with agents_lock:
-                agent_state.status = AgentStatus.ERROR
-                agent_state.current_state = str(e)
+            await job_store.set_current_state(run_key, str(e))
+            await job_store.set_status(run_key, AgentStatus.ERROR)
 
     # Check agent type and run appropriate function
-    agent_type = all_agents[agent_id].type
     if agent_type == "LANGGRAPH":
-        background_tasks.add_task(run_langgraph_agent)
+        background_tasks.add_task(run_admitted, run_langgraph_agent)
     else:  # CREW agent
-        background_tasks.add_task(run_crew_agent)
+        background_tasks.add_task(run_admitted, run_crew_agent)
     
     return {
-        "run_id": str(run_id),
+        "run_id": run_key,
         "thread_id": thread_id,
-        "status": "started",
+        "status": "queued" if queue_position else "started",
+        "queue_position": queue_position,
         "agent_type": agent_type
     }
 
 @router.get("/agent/{run_id}/status")
-async def get_agent_status(run_id: str) -> dict:
-    """Get the current status of a running agent"""
-    start_time = time.time()
-    print(f"\nStarting get_agent_status for run_id: {run_id}")
-    
-    # Take a quick snapshot of the state with the lock
-    lock_start = time.time()
-    async with agents_lock:
-        if run_id not in running_agents:
-            lock_end = time.time()
-            print(f"Running agents keys: {list(running_agents.keys())}")
-            print(f"Lock held for {(lock_end - lock_start)*1000:.2f}ms - Agent not found")
-            raise HTTPException(
-                status_code=404,
-                detail="Agent not found. The run_id may be invalid or the agent has completed."
-            )
-        # Create a deep copy while holding the lock to prevent state changes during read
-        agent_state = deepcopy(running_agents[run_id])
-        lock_end = time.time()
-        print(f"Lock held for {(lock_end - lock_start)*1000:.2f}ms")
-    
-    # Process the copied state without holding the lock
-    process_start = time.time()
-    response = {
+async def get_agent_status(
+    run_id: str,
+    since: int | None = None,
+    include: Annotated[list[str] | None, Query()] = None,
+    exclude: Annotated[list[str] | None, Query()] = None,
+    accept: Annotated[str | None, Header()] = None,
+) -> Response:
+    """
+    Get the current status of a running agent.
+
+    Every response carries a `cursor`. Pass it back as `since` to only receive the
+    status updates and top-level state keys that changed after that response.
+    Repeat `include`/`exclude` to select the state keys returned.
+    Send `Accept: application/msgpack` to get the response as msgpack.
+    """
+    agent_state = await job_store.get_run(run_id, since=since, include=include, exclude=exclude)
+    if agent_state is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Agent not found. The run_id may be invalid or the agent has completed."
+        )
+
+    return _encode_response({
         "run_id": run_id,
         "thread_id": agent_state.thread_id,
         "status": agent_state.status,
         "start_time": agent_state.start_time,
         "last_update": agent_state.last_update,
         "current_state": agent_state.current_state,
-        "status_updates": getattr(agent_state, 'status_updates', [])
-    }
-    process_end = time.time()
-    print(f"Response processing took {(process_end - process_start)*1000:.2f}ms")
-    
-    end_time = time.time()
-    print(f"Total get_agent_status time: {(end_time - start_time)*1000:.2f}ms\n")
-    return response
+        "status_updates": agent_state.status_updates,
+        "cursor": agent_state.cursor,
+        "since": since,
+    }, accept)
+
+@router.get(
+    "/agent/{run_id}/events", response_class=StreamingResponse, responses=_sse_response_example()
+)
+async def get_agent_events(
+    run_id: str,
+    since: int | None = None,
+    last_event_id: Annotated[int | None, Header()] = None,
+) -> StreamingResponse:
+    """
+    Follow a run started with /start as Server-Sent Events.
+
+    Events are `update` (a status update), `state` (the top-level state keys that
+    changed) and `status` (the run finished). Each event id is the run cursor, so
+    EventSource clients resume where they left off through the Last-Event-ID header
+    after a disconnect. `since` does the same for clients that cannot set headers.
+    """
+    if not run_events.is_local(run_id) and not await job_store.exists(run_id):
+        raise HTTPException(
+            status_code=404,
+            detail="Agent not found. The run_id may be invalid or the agent has completed."
+        )
+    cursor = last_event_id if last_event_id is not None else since or 0
+    return StreamingResponse(
+        run_event_stream(run_id, cursor, job_store, run_events),
+        media_type="text/event-stream",
+    )
+
+@router.delete("/agent/{run_id}")
+async def cancel_agent(run_id: str) -> dict:
+    """
+    Cancel a run started with /start.
+
+    Queued and LangGraph runs stop right away, crew runs at their next step or tool
+    call. The run then gets the `cancelled` status. A run executing on another worker
+    is stopped within RUN_CANCEL_POLL_INTERVAL seconds.
+    """
+    run_status = await job_store.request_cancel(run_id)
+    if run_status is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Agent not found. The run_id may be invalid or the agent has completed."
+        )
+    if run_status.value in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"The run is already {run_status.value}")
+    _cancel_local_run(run_id)
+    return {"run_id": run_id, "status": "cancelling"}
 
 # This is for browser use logs
 @router.get("/logs")
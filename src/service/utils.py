@@ -1,3 +1,5 @@
+from typing import Any
+
 from langchain_core.messages import (
     AIMessage,
     BaseMessage,
@@ -74,3 +76,14 @@ def remove_tool_calls(content: str | list[str | dict]) -> str | list[str | dict]
         for content_item in content
         if isinstance(content_item, str) or content_item["type"] != "tool_use"
     ]
+
+
+def project_state(state: Any, include: list[str] | None = None, exclude: list[str] | None = None) -> Any:
+    """Keep only the `include` top-level keys of a state and drop the `exclude` ones."""
+    if not isinstance(state, dict) or (include is None and not exclude):
+        return state
+    return {
+        key: value
+        for key, value in state.items()
+        if (include is None or key in include) and not (exclude and key in exclude)
+    }
@@ -0,0 +1,127 @@
+from agents.college_finder_agent.college_agent_schema import (
+    College,
+    college_name_key,
+    college_name_keys,
+    colleges_reducer,
+    merge_college,
+    same_college,
+)
+
+
+def college(name: str, **fields) -> College:
+    values = dict(
+        location="",
+        description="",
+        acceptance_rate=None,
+        tuition=None,
+        enrollment=None,
+        dorm_percentage=None,
+        sat_scores=None,
+        url=None,
+    )
+    values.update(fields)
+    return College(name=name, **values)
+
+
+def test_name_keys_normalize_case_punctuation_and_aliases():
+    assert college_name_keys("The University of Virginia") == ["university of virginia"]
+    assert college_name_keys("UVA") == ["university of virginia"]
+    assert college_name_keys("Texas A&M University") == ["texas a and m university"]
+
+
+def test_acronym_in_parentheses_is_a_key():
+    assert college_name_keys("Rensselaer Polytechnic Institute (RPI)") == [
+        "rensselaer polytechnic institute",
+        "rpi",
+    ]
+    assert college_name_keys("Texas A&M University (TAMU)") == ["texas a and m university", "tamu"]
+
+
+def test_only_initials_of_the_name_are_keys():
+    assert college_name_keys("Some College (Georgia Tech)") == ["some college"]
+    assert college_name_keys("University of Maryland (UVA)") == ["university of maryland"]
+
+
+def test_aliases_only_apply_to_the_whole_name():
+    assert college_name_key("MIT") == "massachusetts institute of technology"
+    assert college_name_key("MIT Sloan School of Management") == "mit sloan school of management"
+    # Shared by several colleges
+    assert college_name_key("USC") == "usc"
+    assert college_name_key("Penn") == "penn"
+
+
+def test_places_in_parentheses_are_not_keys():
+    assert college_name_keys("Miami University (Ohio)") == ["miami university"]
+    assert college_name_keys("Miami University (OH)") == ["miami university"]
+    assert college_name_keys("Wesleyan College (Middletown)") == ["wesleyan college"]
+
+
+def test_name_without_letters_has_no_keys():
+    assert college_name_keys("") == []
+    assert college_name_keys("()") == []
+
+
+def test_merge_keeps_values_and_unions_programs():
+    existing = college("UVA", tuition="$20,000", programs=["Law"])
+    update = college("University of Virginia", tuition=None, url="https://virginia.edu", programs=["Law", "Nursing"])
+    merged = merge_college(existing, update)
+    assert merged.name == "University of Virginia"
+    assert merged.tuition == "$20,000"
+    assert merged.url == "https://virginia.edu"
+    assert merged.programs == ["Law", "Nursing"]
+
+
+def test_reducer_merges_aliases_and_keeps_order():
+    current = [college("University of Virginia"), college("Virginia Tech")]
+    update = [college("UVA", tuition="$20,000"), college("William & Mary")]
+    result = colleges_reducer(current, update)
+    assert [c.name for c in result] == ["University of Virginia", "Virginia Tech", "William & Mary"]
+    assert result[0].tuition == "$20,000"
+
+
+def test_same_college():
+    assert same_college("UVA", "The University of Virginia")
+    assert same_college("RPI", "Rensselaer Polytechnic Institute (RPI)")
+    assert same_college("Rensselaer Polytechnic Institute (RPI)", "RPI")
+    assert not same_college("Michigan State University (MSU)", "Mississippi State University (MSU)")
+    assert not same_college("", "")
+
+
+def test_reducer_does_not_merge_colleges_sharing_an_acronym():
+    result = colleges_reducer(
+        [], [college("Michigan State University (MSU)"), college("Mississippi State University (MSU)")]
+    )
+    assert [c.name for c in result] == ["Michigan State University (MSU)", "Mississippi State University (MSU)"]
+
+
+def test_reducer_does_not_merge_on_ambiguous_aliases():
+    current = [college("University of Southern California", location="Los Angeles, CA")]
+    result = colleges_reducer(current, [college("University of South Carolina (USC)", location="Columbia, SC")])
+    assert [(c.name, c.location) for c in result] == [
+        ("University of Southern California", "Los Angeles, CA"),
+        ("University of South Carolina (USC)", "Columbia, SC"),
+    ]
+
+
+def test_reducer_merges_a_bare_acronym_once():
+    update = [
+        college("MSU", tuition="$15,000"),
+        college("Michigan State University (MSU)"),
+        college("Mississippi State University (MSU)"),
+        college("MSU", url="https://msu.edu"),
+    ]
+    result = colleges_reducer([], update)
+    assert [c.name for c in result] == ["Michigan State University (MSU)", "Mississippi State University (MSU)"]
+    assert result[0].tuition == "$15,000"
+    assert result[0].url == "https://msu.edu"
+    assert result[1].tuition is None
+
+
+def test_reducer_does_not_merge_colleges_sharing_a_place():
+    result = colleges_reducer([], [college("Miami University (Ohio)"), college("Ohio State University (Ohio)")])
+    assert len(result) == 2
+
+
+def test_reducer_ignores_no_update():
+    current = [college("Virginia Tech")]
+    assert colleges_reducer(current, None) is current
@@ -0,0 +1,137 @@
+import math
+
+import pytest
+
+from agents.college_finder_agent.college_agent_schema import College
+from agents.college_finder_agent.college_ranking import (
+    criterion_number,
+    matches_criteria,
+    parse_count,
+    parse_money,
+    parse_percentage,
+    parse_sat,
+    parse_sat_certainty,
+    rank_colleges,
+)
+
+
+def college(name: str, **fields) -> College:
+    values = dict(
+        location="",
+        description="",
+        acceptance_rate=None,
+        tuition=None,
+        enrollment=None,
+        dorm_percentage=None,
+        sat_scores=None,
+        url=None,
+    )
+    values.update(fields)
+    return College(name=name, **values)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("$57,986 per year (2023-2024)", 57986),
+        ("In-state: $15,000; out-of-state $45k", 15000),
+        ("58000", 58000),
+        ("2023", math.nan),
+        (None, math.nan),
+    ],
+)
+def test_parse_money(text, expected):
+    assert parse_money(text) == pytest.approx(expected, nan_ok=True)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("19%", 19),
+        ("19.2 percent in 2023", 19.2),
+        ("0.19", 19),
+        ("About 1 in 5", 20),
+        ("45", 45),
+        ("", math.nan),
+    ],
+)
+def test_parse_percentage(text, expected):
+    assert parse_percentage(text) == pytest.approx(expected, nan_ok=True)
+
+
+def test_parse_count():
+    assert parse_count("about 17k undergraduates") == 17000
+    assert parse_count("17,000 (2023)") == 17000
+
+
+@pytest.mark.parametrize(
+    "text, expected, certain",
+    [
+        ("1400-1550", 1475, True),
+        ("1400 to 1550", 1475, True),
+        ("Average 1,480", 1480, True),
+        ("Average SAT: 1510 (Math 770, Reading 740)", 1510, True),
+        ("Math 680-780, EBRW 650-740", 1425, False),
+        ("25th percentile 1330, 75th 1500", 1415, False),
+        ("SAT 1,380–1,520 (2023-2024)", 1450, True),
+        ("ACT 30-34", math.nan, False),
+    ],
+)
+def test_parse_sat(text, expected, certain):
+    assert parse_sat_certainty(text) == (pytest.approx(expected, nan_ok=True), certain)
+    assert parse_sat(text) == pytest.approx(expected, nan_ok=True)
+
+
+def test_criterion_number():
+    assert criterion_number(30000) == 30000
+    assert criterion_number("$30,000") == 30000
+    assert criterion_number("20%") == 20
+    assert criterion_number("Not specified") is None
+    assert criterion_number(None) is None
+
+
+def test_unknown_values_never_exclude():
+    colleges = [college("Unknown")]
+    criteria = {"max_tuition": 1000, "min_acceptance_rate": 90, "sat_score": 1000}
+    assert matches_criteria(colleges, criteria).tolist() == [True]
+
+
+def test_known_values_breaking_a_criterion_exclude():
+    colleges = [
+        college("Expensive", tuition="$60,000"),
+        college("Selective", acceptance_rate="5%"),
+        college("Far SAT", sat_scores="1000-1100"),
+        college("Fits", tuition="$20,000", acceptance_rate="50%", sat_scores="1400-1500"),
+    ]
+    criteria = {"max_tuition": 30000, "min_acceptance_rate": 10, "sat_score": 1450}
+    assert matches_criteria(colleges, criteria).tolist() == [False, False, False, True]
+
+
+def test_min_acceptance_rate_is_a_percentage():
+    colleges = [college("Selective", acceptance_rate="4%"), college("Open", acceptance_rate="0.5%")]
+    assert matches_criteria(colleges, {"min_acceptance_rate": 1}).tolist() == [True, False]
+
+
+def test_estimated_sat_does_not_exclude():
+    colleges = [college("Sections", sat_scores="Math 500-550, EBRW 500-550")]
+    assert matches_criteria(colleges, {"sat_score": 1500}).tolist() == [True]
+
+
+def test_rank_puts_best_fits_first():
+    colleges = [
+        college("Boston", location="Boston, MA", tuition="$25,000"),
+        college("Charlottesville", location="Charlottesville, VA", programs=["Computer Science"]),
+        college("Blacksburg", location="Blacksburg, VA", programs=["Agriculture"]),
+        college("Over budget", location="Richmond, VA", tuition="$60,000", programs=["Computer Science"]),
+    ]
+    criteria = {"major": "Computer Science", "location_preference": "Virginia", "max_tuition": 30000}
+    ranked = rank_colleges(colleges, criteria)
+    assert [c.name for c in ranked] == ["Charlottesville", "Blacksburg", "Boston"]
+    assert [c.name for c in rank_colleges(colleges, criteria, top_k=1)] == ["Charlottesville"]
+
+
+def test_rank_without_criteria_keeps_order():
+    colleges = [college("A"), college("B"), college("C")]
+    criteria = {"major": "Any", "location_preference": "Any", "max_tuition": "Not specified"}
+    assert [c.name for c in rank_colleges(colleges, criteria)] == ["A", "B", "C"]
+    assert rank_colleges([], criteria) == []
@@ -0,0 +1,119 @@
+import sqlite3
+import time
+
+import pytest
+
+from agents.college_finder_agent.college_agent_schema import College
+from agents.college_finder_agent.college_store import CollegeStore
+
+YEAR = 60 * 60 * 24 * 365
+
+
+def college(name: str, **fields) -> College:
+    values = dict(
+        location="",
+        description="",
+        acceptance_rate=None,
+        tuition=None,
+        enrollment=None,
+        dorm_percentage=None,
+        sat_scores=None,
+        url=None,
+    )
+    values.update(fields)
+    return College(name=name, **values)
+
+
+@pytest.fixture
+def store(tmp_path) -> CollegeStore:
+    return CollegeStore(str(tmp_path / "colleges.db"), max_age=2 * YEAR)
+
+
+def test_save_and_get_by_alias(store):
+    assert store.save(college("University of Virginia (UVA)", tuition="$20,000", programs=["Law"]))
+    stored = store.get("UVA")
+    assert stored.tuition == "$20,000"
+    assert stored.programs == ["Law"]
+    assert store.get("Virginia Tech") is None
+
+
+def test_save_merges_fields(store):
+    store.save(college("University of Virginia", tuition="$20,000"))
+    store.save(college("UVA", enrollment="17,000", description="Public"))
+    stored = store.get("University of Virginia")
+    assert (stored.tuition, stored.enrollment, stored.description) == ("$20,000", "17,000", "Public")
+
+
+def test_acronyms_do_not_merge_records(store):
+    store.save(college("Michigan State University (MSU)", location="East Lansing, MI", tuition="$15,000"))
+    store.save(college("Mississippi State University (MSU)", location="Starkville, MS"))
+    store.save(college("University of South Carolina (USC)", location="Columbia, SC"))
+    michigan = store.get("Michigan State University")
+    assert (michigan.location, michigan.tuition) == ("East Lansing, MI", "$15,000")
+    mississippi = store.get("Mississippi State University (MSU)")
+    assert (mississippi.location, mississippi.tuition) == ("Starkville, MS", None)
+    assert store.get("University of Southern California") is None
+    # An acronym is not the key of a record
+    assert store.get("MSU") is None
+    assert store.get("USC") is None
+
+
+def test_records_keyed_by_alias_are_dropped(tmp_path):
+    path = str(tmp_path / "colleges.db")
+    CollegeStore(path, max_age=YEAR).save(college("Reed College"))
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE college_names (name_key TEXT PRIMARY KEY, key TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    store = CollegeStore(path, max_age=YEAR)
+    assert store.get("Reed College") is None
+    assert store.save(college("Reed College"))
+    assert CollegeStore(path, max_age=YEAR).get("Reed College").name == "Reed College"
+
+
+def test_save_skips_colleges_without_a_name(store):
+    assert store.save(college("")) is False
+    assert store.save(college("()")) is False
+    assert store.save_many([college(""), college("Reed College")]) == 1
+
+
+def test_stale_fields_are_dropped_unless_asked(store, monkeypatch):
+    store.save(college("Reed College", tuition="$60,000", url="https://reed.edu"))
+    # Tuition is kept for 180 days, the url for COLLEGE_STORE_MAX_AGE
+    later = time.time() + YEAR
+    monkeypatch.setattr(time, "time", lambda: later)
+    stored = store.get("Reed College")
+    assert stored.tuition is None
+    assert stored.url == "https://reed.edu"
+    assert store.get("Reed College", fresh_only=False).tuition == "$60,000"
+
+
+def test_search_needs_every_word(store):
+    store.save(college("Reed College", location="Portland, OR", description="Liberal arts college"))
+    store.save(college("Caltech", location="Pasadena, CA", description="Science and engineering"))
+    store.save(college("Lewis & Clark College", location="Portland, OR", description="Liberal arts and science"))
+    names = [c.name for c in store.search("liberal arts science colleges in Oregon")]
+    assert names == ["Lewis & Clark College"]
+    assert {c.name for c in store.search("liberal arts colleges in Oregon")} == {"Reed College", "Lewis & Clark College"}
+
+
+def test_search_excludes_and_limits(store):
+    for name in ("Reed College", "Lewis & Clark College", "Willamette University"):
+        store.save(college(name, location="Portland, OR"))
+    assert len(store.search("oregon", limit=2)) == 2
+    names = [c.name for c in store.search("oregon", exclude=["Reed College"])]
+    assert "Reed College" not in names and len(names) == 2
+    assert store.search("the best colleges") == []
+
+
+def test_import_csv(store, tmp_path):
+    path = tmp_path / "colleges.csv"
+    path.write_text(
+        "name,location,tuition,programs,extra\n"
+        'Reed College,"Portland, OR",$60k,Physics;Biology,x\n'
+        ",nowhere,,,\n"
+        'Virginia Tech,"Blacksburg, VA",$15k,"[""Engineering""]",y\n'
+    )
+    assert store.import_file(str(path)) == 2
+    assert store.get("Reed College").programs == ["Physics", "Biology"]
+    assert store.get("Virginia Tech").programs == ["Engineering"]
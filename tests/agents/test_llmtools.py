@@ -0,0 +1,34 @@
+from agents.llmtools import get_llm
+from api_schema import UserInput
+from api_schema.models import OpenAIModelName
+from service.service import _parse_input
+
+
+def configurable(user_input: UserInput) -> dict:
+    kwargs, _ = _parse_input(user_input)
+    return kwargs["config"]["configurable"]
+
+
+def test_run_without_a_model_uses_the_agents_default():
+    config = configurable(UserInput(message="hi"))
+    assert config["model"] is None
+    llm = get_llm({"configurable": config})
+    assert llm.temperature == 0.3
+    assert not llm.streaming
+
+
+def test_run_with_a_model_uses_it():
+    config = configurable(UserInput(message="hi", model=OpenAIModelName.GPT_4O))
+    assert config["model"] == OpenAIModelName.GPT_4O
+    assert get_llm({"configurable": config}).model_name == "gpt-4o"
+
+
+def test_node_models_win_over_the_run_model():
+    config = {
+        "configurable": {
+            "model": OpenAIModelName.GPT_4O,
+            "node_models": {"extract": OpenAIModelName.GPT_4O_MINI},
+        }
+    }
+    assert get_llm(config, "extract").model_name == "gpt-4o-mini"
+    assert get_llm(config, "summarize").model_name == "gpt-4o"
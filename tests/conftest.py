@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Settings are read at import: keep the tests off the on-disk caches and the network
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake-openai-key")
+for cache in ("LLM_CACHE", "SEARCH_CACHE", "PAGE_CACHE", "COLLEGE_STORE"):
+    os.environ.setdefault(cache, "false")
+# Databases the tests do open go to a scratch directory, not the working directory
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="lg-agents-tests-"))
@@ -0,0 +1,84 @@
+import json
+from datetime import datetime
+
+import msgpack
+import pytest
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+from core import serialization
+from core.serialization import dumps, dumps_str, packb, to_jsonable, wants_msgpack
+
+
+class Item(BaseModel):
+    name: str
+    tags: list[str] = []
+
+
+class Opaque:
+    def __str__(self) -> str:
+        return "opaque"
+
+
+def test_to_jsonable():
+    assert to_jsonable(Item(name="MIT")) == {"name": "MIT", "tags": []}
+    assert to_jsonable(datetime(2024, 1, 2, 3, 4, 5)) == "2024-01-02T03:04:05"
+    assert to_jsonable(Opaque()) == "opaque"
+
+
+def test_dumps_nested_state():
+    state = {
+        "colleges": [Item(name="MIT", tags=["tech"])],
+        "messages": [AIMessage(content="hello")],
+        "when": datetime(2024, 1, 2),
+        1: Opaque(),
+    }
+    decoded = json.loads(dumps(state))
+    assert decoded["colleges"] == [{"name": "MIT", "tags": ["tech"]}]
+    assert decoded["messages"][0]["content"] == "hello"
+    assert decoded["messages"][0]["type"] == "ai"
+    assert decoded["when"] == "2024-01-02T00:00:00"
+    assert decoded["1"] == "opaque"
+
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    state = {"colleges": [Item(name="MIT")], "other": Opaque()}
+    assert json.loads(dumps(state)) == {"colleges": [{"name": "MIT", "tags": []}], "other": "opaque"}
+    assert dumps({"a": 1}, indent=True) == b'{\n  "a": 1\n}'
+
+
+def test_dumps_str():
+    assert json.loads(dumps_str({"a": [Item(name="MIT")]})) == {"a": [{"name": "MIT", "tags": []}]}
+    assert "\n" in dumps_str({"a": 1}, indent=True)
+
+
+def test_packb():
+    state = {"colleges": [Item(name="MIT")], "count": 1}
+    assert msgpack.unpackb(packb(state)) == {"colleges": [{"name": "MIT", "tags": []}], "count": 1}
+
+
+def test_packb_without_msgpack(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+    with pytest.raises(RuntimeError):
+        packb({})
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        ("application/msgpack", True),
+        ("application/x-msgpack, application/json;q=0.5", True),
+        ("application/json", False),
+        ("*/*", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_wants_msgpack(accept, expected):
+    assert wants_msgpack(accept) is expected
+
+
+def test_wants_msgpack_without_msgpack(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+    assert not wants_msgpack("application/msgpack")
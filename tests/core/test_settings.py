@@ -0,0 +1,13 @@
+from pathlib import Path
+
+from core.settings import Settings
+
+
+def test_relative_database_paths_are_in_the_data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    absolute = str(tmp_path / "elsewhere" / "jobs.db")
+    settings = Settings(DATA_DIR=str(data_dir), JOB_STORE_PATH=absolute, LLM_CACHE_PATH="cache/llm.db")
+    assert settings.JOB_STORE_PATH == absolute
+    assert Path(settings.LLM_CACHE_PATH) == data_dir / "cache" / "llm.db"
+    assert Path(settings.COLLEGE_STORE_PATH) == data_dir / "colleges.db"
+    assert data_dir.is_dir()
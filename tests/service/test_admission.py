@@ -0,0 +1,134 @@
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from agents import all_agents
+from agents.agents import Agent
+from api_schema import AgentState
+from service import service
+from service.admission import AdmissionController, QueueFullError
+
+
+class FailingGraph:
+    """A LangGraph agent whose runs fail as soon as they start."""
+
+    async def astream(self, **kwargs):
+        raise RuntimeError("boom")
+        yield
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController({}, max_concurrency=2, max_queue=2)
+    monkeypatch.setattr(service, "admission", controller)
+    return controller
+
+
+@pytest.fixture
+def failing_agent(monkeypatch):
+    agent = Agent(description="Fails.", path="tests:failing", type="LANGGRAPH")
+    agent._graph = FailingGraph()
+    monkeypatch.setitem(all_agents, "failing-agent", agent)
+    return agent
+
+
+@pytest_asyncio.fixture
+async def client():
+    transport = httpx.ASGITransport(app=service.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def running(admission: AdmissionController, agent_id: str = "*") -> int:
+    return admission.stats()[agent_id]["running"] + admission.stats()[agent_id]["waiting"]
+
+
+@pytest.mark.asyncio
+async def test_queue_is_fifo_and_release_admits_the_next():
+    controller = AdmissionController({"a": (1, None)}, max_concurrency=10, max_queue=10)
+    first = controller.enqueue("a")
+    second = controller.enqueue("a")
+    assert first.granted and not second.granted
+    assert second.position == 1
+    first.release()
+    assert second.granted
+    second.release()
+    assert controller.stats()["a"]["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_raises_with_retry_after():
+    controller = AdmissionController({}, max_concurrency=1, max_queue=1, retry_after=7)
+    controller.enqueue("a")
+    controller.enqueue("a")
+    with pytest.raises(QueueFullError) as error:
+        controller.enqueue("a")
+    assert error.value.retry_after == 7
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    controller = AdmissionController({}, max_concurrency=1, max_queue=5)
+    holder = controller.enqueue("a")
+    waiter = controller.enqueue("a")
+    task = asyncio.create_task(waiter.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert controller.stats()["*"]["waiting"] == 0
+    holder.release()
+    assert controller.stats()["*"]["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_answers_429_when_the_queue_is_full(client, admission, failing_agent):
+    tickets = [admission.enqueue("failing-agent") for _ in range(4)]
+    response = await client.post("/failing-agent/stream", json={"message": "hi"})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    for ticket in tickets:
+        ticket.release()
+
+
+@pytest.mark.asyncio
+async def test_stream_of_unknown_agent_takes_no_slot(client, admission):
+    response = await client.post("/nope/stream", json={"message": "hi"})
+    assert response.status_code == 404
+    assert running(admission) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_gives_its_slot_back(client, admission, failing_agent):
+    response = await client.post("/failing-agent/stream", json={"message": "hi"})
+    assert response.status_code == 200
+    assert '"type": "error"' in response.text or '"type":"error"' in response.text
+    assert running(admission) == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_input_error_gives_its_slot_back(client, admission, failing_agent, monkeypatch):
+    def bad_input(user_input):
+        raise ValueError("bad input")
+
+    monkeypatch.setattr(service, "_parse_input", bad_input)
+    for _ in range(5):
+        await client.post("/failing-agent/stream", json={"message": "hi"})
+    assert running(admission) == 0
+
+
+class BrokenJobStore:
+    async def create_run(self, run_id: str, agent_state: AgentState) -> None:
+        raise ConnectionError("job store down")
+
+
+@pytest.mark.asyncio
+async def test_start_gives_its_slot_back_when_the_run_cannot_be_created(
+    client, admission, failing_agent, monkeypatch
+):
+    monkeypatch.setattr(service, "job_store", BrokenJobStore())
+    response = await client.post("/failing-agent/start", json={"message": "hi"})
+    assert response.status_code == 500
+    assert running(admission) == 0
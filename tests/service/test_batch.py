@@ -0,0 +1,68 @@
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from agents import all_agents
+from agents.agents import Agent
+from service import service
+from service.admission import AdmissionController
+
+
+class FakeCrew:
+    """A crew agent recording the config it is given."""
+
+    configs = []
+
+    def set_config(self, config):
+        self.configs.append(config)
+
+    def run(self, input_data):
+        return {"echo": input_data}
+
+
+@pytest.fixture(autouse=True)
+def admission(monkeypatch):
+    monkeypatch.setattr(service, "admission", AdmissionController({}, max_concurrency=4, max_queue=4))
+
+
+@pytest.fixture
+def crew_agent(monkeypatch):
+    agent = Agent(description="Echoes.", path="tests:crew", type="CREW")
+    agent._graph = FakeCrew
+    monkeypatch.setitem(all_agents, "crew-agent", agent)
+    FakeCrew.configs = []
+    return agent
+
+
+@pytest_asyncio.fixture
+async def client():
+    transport = httpx.ASGITransport(app=service.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def events(response: httpx.Response) -> list:
+    lines = [line.removeprefix("data: ") for line in response.text.splitlines() if line.startswith("data: ")]
+    return [json.loads(line) for line in lines if line != "[DONE]"]
+
+
+@pytest.mark.asyncio
+async def test_batch_of_unknown_agent_is_a_404(client):
+    response = await client.post("/missing-agent/batch", json={"inputs": [{"message": "hi"}]})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_crew_items_use_the_requested_model(client, crew_agent):
+    response = await client.post(
+        "/crew-agent/batch",
+        json={"inputs": [{"message": "a", "model": "gpt-4o"}, {"message": "b"}]},
+    )
+    assert response.status_code == 200
+    results = sorted(events(response), key=lambda result: result["index"])
+    assert [result["status"] for result in results] == ["completed", "completed"]
+    assert results[0]["result"] == {"echo": {"messages": "a"}}
+    models = sorted(str(config["configurable"]["model"]) for config in FakeCrew.configs)
+    assert models == ["None", "gpt-4o"]
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from api_schema import AgentState, AgentStatus
+from service.job_store import LocalRedis, RedisJobStore, SqliteJobStore
+
+
+@pytest_asyncio.fixture(params=["sqlite", "redis"])
+async def store(request, tmp_path):
+    if request.param == "sqlite":
+        job_store = SqliteJobStore(str(tmp_path / "jobs.db"))
+    else:
+        job_store = RedisJobStore(LocalRedis())
+    yield job_store
+    await job_store.close()
+
+
+def _new_run(current_state=None) -> AgentState:
+    agent_state = AgentState()
+    agent_state.agent_id = "college-agent"
+    agent_state.thread_id = "thread-1"
+    agent_state.current_state = current_state if current_state is not None else {}
+    return agent_state
+
+
+@pytest.mark.asyncio
+async def test_get_run_unknown(store):
+    assert await store.get_run("missing") is None
+    assert not await store.exists("missing")
+
+
+@pytest.mark.asyncio
+async def test_get_run_full(store):
+    await store.create_run("r1", _new_run({"a": 1, "b": [1, 2]}))
+    await store.append_status_update("r1", {"step": "search"})
+    await store.set_status("r1", AgentStatus.COMPLETED)
+
+    run = await store.get_run("r1")
+    assert await store.exists("r1")
+    assert run.agent_id == "college-agent"
+    assert run.thread_id == "thread-1"
+    assert run.status == AgentStatus.COMPLETED
+    assert run.current_state == {"a": 1, "b": [1, 2]}
+    assert run.status_updates == [{"step": "search"}]
+    assert run.cursor == 3
+
+
+@pytest.mark.asyncio
+async def test_get_run_since_cursor(store):
+    await store.create_run("r1", _new_run({"a": 1, "b": 1}))
+    cursor = (await store.get_run("r1")).cursor
+
+    await store.append_status_update("r1", "first")
+    # Only the changed key is rewritten
+    await store.set_current_state("r1", {"a": 1, "b": 2})
+    run = await store.get_run("r1", since=cursor)
+    assert run.current_state == {"b": 2}
+    assert run.status_updates == ["first"]
+    assert run.cursor == cursor + 2
+
+    run = await store.get_run("r1", since=run.cursor)
+    assert run.current_state == {}
+    assert run.status_updates == []
+
+
+@pytest.mark.asyncio
+async def test_set_current_state_unchanged(store):
+    await store.create_run("r1", _new_run({"a": 1}))
+    assert await store.set_current_state("r1", {"a": 1}) is None
+    assert await store.set_current_state("r1", {}) is not None
+    assert (await store.get_run("r1")).current_state == {}
+
+
+@pytest.mark.asyncio
+async def test_get_run_include_exclude(store):
+    await store.create_run("r1", _new_run({"a": 1, "b": 2, "c": 3}))
+    assert (await store.get_run("r1", include=["a", "c"])).current_state == {"a": 1, "c": 3}
+    assert (await store.get_run("r1", exclude=["b"])).current_state == {"a": 1, "c": 3}
+    assert (await store.get_run("r1", include=["a"], exclude=["a"])).current_state == {}
+
+
+@pytest.mark.asyncio
+async def test_scalar_state(store):
+    await store.create_run("r1", _new_run())
+    await store.set_current_state("r1", "final answer")
+    assert (await store.get_run("r1", include=["a"])).current_state == "final answer"
+
+
+@pytest.mark.asyncio
+async def test_request_cancel(store):
+    assert await store.request_cancel("missing") is None
+    await store.create_run("r1", _new_run())
+    assert not await store.is_cancel_requested("r1")
+    assert await store.request_cancel("r1") == AgentStatus.RUNNING
+    assert await store.is_cancel_requested("r1")
+
+
+@pytest.mark.asyncio
+async def test_listener_notified(store):
+    events = []
+    store.add_listener(lambda run_id, seq, event, data: events.append((run_id, seq, event, data)))
+    await store.create_run("r1", _new_run({"a": 1}))
+    await store.set_status("r1", AgentStatus.COMPLETED)
+    assert events == [("r1", 1, "state", '{"a": 1}'), ("r1", 2, "status", '{"status": "completed"}')]
+
+
+@pytest.mark.asyncio
+async def test_redis_partial_run_is_unknown():
+    # Writes to an expired run recreate its hash with only the fields they touch
+    store = RedisJobStore(LocalRedis())
+    await store.set_status("expired", AgentStatus.ERROR)
+    await store.append_status_update("expired", "late update")
+    assert await store.get_run("expired") is None
+    assert not await store.exists("expired")
+    assert await store.request_cancel("expired") is None
+
+
+class RacingRedis(LocalRedis):
+    """Lands another write to run "r1" in the middle of the first transaction reading `racing_key`."""
+
+    def __init__(self, racing_key: str, write):
+        super().__init__()
+        self._racing_key = racing_key
+        self._write = write
+
+    async def _race(self, name: str) -> None:
+        if name == self._racing_key and self._write:
+            write, self._write = self._write, None
+            await write()
+
+    async def hget(self, name: str, key: str) -> str | None:
+        value = await super().hget(name, key)
+        await self._race(name)
+        return value
+
+    async def hgetall(self, name: str) -> dict[str, str]:
+        values = await super().hgetall(name)
+        await self._race(name)
+        return values
+
+
+@pytest.mark.asyncio
+async def test_redis_write_retries_when_another_one_gets_in():
+    client = RacingRedis("agent-run:r1", lambda: store.append_status_update("r1", "racing"))
+    store = RedisJobStore(client)
+    await store.create_run("r1", _new_run())
+    assert await store.append_status_update("r1", "first") == 2
+    run = await store.get_run("r1")
+    assert run.status_updates == ["racing", "first"]
+    assert run.cursor == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_get_run_is_a_snapshot():
+    client = RacingRedis("agent-run:r1:state-seq", lambda: store.set_current_state("r1", {"a": 2, "b": 1}))
+    store = RedisJobStore(client)
+    await store.create_run("r1", _new_run({"a": 1}))
+    run = await store.get_run("r1", since=0)
+    # The reads started before the write are retried, the cursor matches the state
+    assert run.current_state == {"a": 2, "b": 1}
+    assert run.cursor == 2
+    assert (await store.get_run("r1", since=run.cursor)).current_state == {}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_purges_expired_runs_while_running(tmp_path, monkeypatch):
+    store = SqliteJobStore(str(tmp_path / "jobs.db"), ttl=60)
+    old_run = _new_run()
+    old_run.last_update = datetime.utcnow() - timedelta(hours=1)
+    await store.create_run("old", old_run)
+    await store.create_run("r1", _new_run())
+    assert await store.exists("old")
+
+    monkeypatch.setattr("service.job_store.PURGE_INTERVAL", 0)
+    await store.create_run("r2", _new_run())
+    assert not await store.exists("old")
+    assert await store.exists("r1")
+    await store.close()
+
+
+class ExpiringRedis(LocalRedis):
+    def __init__(self):
+        super().__init__()
+        self.ttls = {}
+
+    async def expire(self, name: str, seconds: int) -> bool:
+        self.ttls[name] = seconds
+        return await super().expire(name, seconds)
+
+
+@pytest.mark.asyncio
+async def test_redis_run_without_state_expires():
+    client = ExpiringRedis()
+    await RedisJobStore(client, ttl=60).create_run("r1", _new_run())
+    assert client.ttls["agent-run:r1"] == 60
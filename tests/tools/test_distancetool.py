@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pytest
+
+from agents.tools import distancetool
+from agents.tools.distancetool import GeocodeCache, ageocode_many, haversine_matrix, normalize_address
+
+NEW_YORK = (40.7128, -74.0060)
+LOS_ANGELES = (34.0522, -118.2437)
+LONDON = (51.5074, -0.1278)
+
+
+def test_haversine_matrix_distances():
+    distances = haversine_matrix(np.array([NEW_YORK, LOS_ANGELES]), np.array([LOS_ANGELES, LONDON]))
+    assert distances.shape == (2, 2)
+    assert distances[0, 0] == pytest.approx(2445, rel=0.01)
+    assert distances[0, 1] == pytest.approx(3461, rel=0.01)
+    assert distances[1, 1] == pytest.approx(5440, rel=0.01)
+
+
+def test_haversine_matrix_same_point_and_symmetry():
+    points = np.array([NEW_YORK, LOS_ANGELES, LONDON])
+    distances = haversine_matrix(points, points)
+    assert np.allclose(np.diag(distances), 0)
+    assert np.allclose(distances, distances.T)
+
+
+def test_haversine_matrix_nan_for_unknown_coordinates():
+    distances = haversine_matrix(np.array([NEW_YORK, (np.nan, np.nan)]), np.array([LONDON]))
+    assert not np.isnan(distances[0, 0])
+    assert np.isnan(distances[1, 0])
+
+
+def test_normalize_address():
+    assert normalize_address("  123 Main St,  Springfield ") == normalize_address("123 main st, springfield")
+
+
+class ThreadRecordingCache(GeocodeCache):
+    """A geocode cache remembering the threads it is called from."""
+
+    def __init__(self, path: str):
+        super().__init__(path, ttl=3600, not_found_ttl=3600)
+        self.threads = set()
+
+    def get_many(self, addresses):
+        self.threads.add(threading.get_ident())
+        return super().get_many(addresses)
+
+    def set_many(self, coordinates):
+        self.threads.add(threading.get_ident())
+        return super().set_many(coordinates)
+
+
+@pytest.mark.asyncio
+async def test_ageocode_many_caches_off_the_event_loop(tmp_path, monkeypatch):
+    geocode_cache = ThreadRecordingCache(str(tmp_path / "geocode.db"))
+    lookups = []
+
+    async def nominatim_geocode(address):
+        lookups.append(address)
+        if address == "offline":
+            raise ConnectionError("offline")
+        return {"new york, ny": NEW_YORK}.get(address)
+
+    monkeypatch.setattr(distancetool, "get_geocode_cache", lambda: geocode_cache)
+    monkeypatch.setattr(distancetool, "_nominatim_geocode", nominatim_geocode)
+
+    addresses = ["New York,NY", "new york, ny", "Atlantis", "offline"]
+    expected = {"New York,NY": NEW_YORK, "new york, ny": NEW_YORK, "Atlantis": None, "offline": None}
+    assert await ageocode_many(addresses) == expected
+    assert sorted(lookups) == ["atlantis", "new york, ny", "offline"]
+    # Found and not found addresses are cached, network errors are retried
+    assert await ageocode_many(addresses) == expected
+    assert sorted(lookups) == ["atlantis", "new york, ny", "offline", "offline"]
+    assert threading.get_ident() not in geocode_cache.threads
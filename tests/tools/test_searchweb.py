@@ -0,0 +1,80 @@
+import httpx
+import pytest
+
+from agents.tools import searchweb
+from core import fetcher
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """Serve pages from a dict, any other URL is a 404."""
+    content = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) in content:
+            return httpx.Response(200, html=content[str(request.url)])
+        return httpx.Response(404, text="Not found")
+
+    client_kwargs = fetcher._client_kwargs
+    monkeypatch.setattr(
+        fetcher, "_client_kwargs", lambda: {**client_kwargs(), "transport": httpx.MockTransport(handler)}
+    )
+    monkeypatch.setattr(fetcher.settings, "FETCH_HOST_MIN_INTERVAL", 0.0)
+    monkeypatch.setattr(searchweb, "get_fetcher", fetcher.Fetcher)
+    monkeypatch.setattr(searchweb, "get_page_cache", lambda: None)
+    return content
+
+
+@pytest.mark.asyncio
+async def test_scrape_web_reads_the_page_text(pages):
+    pages["https://example.com/roster"] = "<html><head><title>Roster</title></head><body><p>95 mph</p></body></html>"
+    doc = await searchweb.scrape_web("https://example.com/roster")
+    assert "95 mph" in doc.page_content
+    assert doc.metadata["title"] == "Roster"
+
+
+@pytest.mark.asyncio
+async def test_scrape_web_returns_an_empty_page_on_http_errors(pages):
+    doc = await searchweb.scrape_web("https://example.com/missing")
+    assert doc.page_content == ""
+    assert doc.metadata == {"source": "https://example.com/missing", "status_code": 404}
+
+
+def test_clean_content_drops_page_chrome():
+    text = "\n".join(
+        [
+            "Skip to content",
+            "Menu",
+            "Accept all cookies",
+            "We use cookies to improve your experience.",
+            "Reed College is a liberal arts college in Portland, Oregon.",
+            "© 2024 Reed College",
+            "Copyright 2024 Reed College. All rights reserved.",
+        ]
+    )
+    assert searchweb.clean_content(text) == "Reed College is a liberal arts college in Portland, Oregon."
+
+
+def test_clean_content_keeps_content_mentioning_cookies_or_copyright():
+    lines = [
+        "The bakery program teaches students to make cookies, cakes and breads.",
+        "Copyright law is one of the focus areas of the law school clinic.",
+        "Students learn how browsers store cookies and how the cookie policy of a site "
+        "is enforced in practice, as part of the web security course taught every fall.",
+        "The museum holds © marked works from the 1920s, all rights reserved by their estates, "
+        "and shows them to students of the art history program.",
+    ]
+    assert searchweb.clean_content("\n".join(lines)) == "\n".join(lines)
+
+
+def test_clean_content_collapses_consecutive_repeats():
+    assert searchweb.clean_content("Home\nAdmissions\nAdmissions\n\nAdmissions") == "Admissions\n\nAdmissions"
+
+
+def test_clean_content_keeps_repeated_table_cells():
+    roster = "\n".join([
+        "1", "John Smith", "RHP", "R/R", "Jr.",
+        "2", "Mike Jones", "RHP", "R/R", "Jr.",
+        "3", "Sam Lee", "LHP", "R/R", "So.",
+    ])
+    assert searchweb.clean_content(roster) == roster
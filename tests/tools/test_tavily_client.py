@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from agents.tools import tavily_client
+from agents.tools.tavily_client import TavilyClient
+
+
+@pytest_asyncio.fixture
+async def tavily(monkeypatch):
+    """A client whose requests wait for `release` and are recorded in `requests`."""
+    monkeypatch.setattr(tavily_client, "get_search_cache", lambda: None)
+    client = TavilyClient(api_key="test")
+    client.requests = []
+    client.release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        client.requests.append(json.loads(request.content))
+        await client.release.wait()
+        return httpx.Response(200, json={"results": [{"url": "https://example.com", "content": "x"}]})
+
+    client._async_clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+@pytest.mark.asyncio
+async def test_identical_searches_share_one_request(tavily):
+    searches = [asyncio.create_task(tavily.search("colleges in Ohio")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    tavily.release.set()
+    results = await asyncio.gather(*searches)
+    assert len(tavily.requests) == 1
+    assert all(result == results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_others(tavily):
+    first = asyncio.create_task(tavily.search("colleges in Ohio"))
+    second = asyncio.create_task(tavily.search("colleges in Ohio"))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    await asyncio.sleep(0)
+    tavily.release.set()
+    assert (await second)["results"][0]["url"] == "https://example.com"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_basic_search_depth_by_default(tavily):
+    tavily.release.set()
+    await tavily.search("colleges in Ohio", include_answer=True)
+    assert tavily.requests[0]["search_depth"] == "basic"